@@ -3,10 +3,165 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import queue
 import time
-import pandas as pd
-from typing import Dict, List, Optional
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# Seções do edital: o cabeçalho vem da página inicial; as demais exigem abrir abas
+SECTIONS = ('header', 'items', 'history', 'contracts')
+
+# Seções extraídas quando o chamador não escolhe
+DEFAULT_SECTIONS = frozenset({'header', 'items'})
+
+# Chave de cada seção de lista no resultado
+SECTION_KEYS = {
+    'items': 'itens',
+    'history': 'historico',
+    'contracts': 'contratos_empenhos'
+}
+
+
+class LazyEditalData(Mapping):
+    """
+    Resultado da extração que só carrega as seções caras quando acessadas
+    
+    Funciona como um dict somente leitura; acessar uma chave ainda não carregada
+    (ex.: 'historico') dispara a extração daquela aba no navegador.
+    """
+    
+    def __init__(self, data: Dict, loaders: Dict[str, Callable[[], List[Dict]]]):
+        self._data = data
+        self._loaders = loaders
+    
+    def __getitem__(self, key):
+        if key not in self._data and key in self._loaders:
+            self._data[key] = self._loaders.pop(key)()
+        return self._data[key]
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._data)
+        yield from [key for key in list(self._loaders) if key not in self._data]
+    
+    def __len__(self) -> int:
+        return len(self._data) + len(self._loaders)
+    
+    def __repr__(self) -> str:
+        pending = ', '.join(self._loaders)
+        return f"LazyEditalData({self._data!r}, pendentes=[{pending}])"
+    
+    def is_loaded(self, key: str) -> bool:
+        """Indica se a chave já foi extraída"""
+        return key in self._data
+    
+    def loaded(self) -> Dict:
+        """Retorna um dict apenas com o que já foi extraído, sem disparar novas extrações"""
+        return dict(self._data)
+
+
+class ExtractionResult(NamedTuple):
+    """Resultado de uma URL em extract_many"""
+    url: str
+    data: Optional[Dict]  # None quando todas as tentativas falharam
+    error: Optional[str]
+    attempts: int
+
+
+class ItemRow(NamedTuple):
+    """Linha da tabela de itens"""
+    numero: str
+    descricao: str
+    quantidade: str
+    valor_unitario: str
+    valor_total: str
+
+
+class HistoryRow(NamedTuple):
+    """Linha da tabela de histórico"""
+    evento: str
+    data_hora: str
+
+
+class ContractRow(NamedTuple):
+    """Linha da tabela de contratos/empenhos"""
+    numero: str
+    data_assinatura: str
+    vigencia: str
+    id_contrato_pncp: str
+    valor_global: str
+
+
+class DataTableReader:
+    """
+    Lê a ngx-datatable visível página a página
+    
+    Cada página é lida com uma única chamada de script (todas as linhas e células
+    de uma vez) e a paginação segue o botão btn-next-page da própria tabela.
+    """
+    
+    # Retorna as células (texto do span ou do rótulo) de cada linha da tabela visível
+    READ_PAGE_SCRIPT = """
+        const table = Array.from(document.querySelectorAll('ngx-datatable'))
+            .find(t => t.offsetParent !== null);
+        if (!table) { return null; }
+        return Array.from(table.querySelectorAll('datatable-body-row')).map(row =>
+            Array.from(row.querySelectorAll('datatable-body-cell')).map(cell => {
+                const label = cell.querySelector('.datatable-body-cell-label') || cell;
+                const span = label.querySelector('span');
+                const text = span ? span.innerText.trim() : '';
+                return text || label.innerText.trim();
+            })
+        );
+    """
+    
+    # Clica no botão de próxima página visível; retorna false se não houver ou estiver desabilitado
+    NEXT_PAGE_SCRIPT = """
+        const button = Array.from(document.querySelectorAll('[id="btn-next-page"]'))
+            .find(b => b.offsetParent !== null);
+        if (!button || button.disabled || button.hasAttribute('disabled')) { return false; }
+        button.click();
+        return true;
+    """
+    
+    def __init__(self, driver, timeout: int = 10, max_pages: int = 1000):
+        self.driver = driver
+        self.timeout = timeout
+        self.max_pages = max_pages
+    
+    def read_page(self) -> Optional[List[List[str]]]:
+        """Lê a página atual da tabela visível (None se não houver tabela visível)"""
+        return self.driver.execute_script(self.READ_PAGE_SCRIPT)
+    
+    def _wait_rows(self, previous: Optional[List[List[str]]] = None) -> List[List[str]]:
+        """Aguarda a tabela ter linhas diferentes da página anterior"""
+        def rows_ready(driver):
+            rows = self.read_page()
+            return rows if rows and rows != previous else False
+        
+        try:
+            return WebDriverWait(self.driver, self.timeout, poll_frequency=0.2).until(rows_ready)
+        except TimeoutException:
+            return []
+    
+    def read_all(self, row_type) -> List:
+        """Lê todas as páginas e converte cada linha no tipo informado"""
+        fields = len(row_type._fields)
+        rows = []
+        page = self._wait_rows()
+        
+        for _ in range(self.max_pages):
+            rows.extend(row_type(*cells[:fields]) for cells in page if len(cells) >= fields)
+            
+            if not self.driver.execute_script(self.NEXT_PAGE_SCRIPT):
+                break
+            page = self._wait_rows(previous=page)
+            if not page:
+                break
+        
+        return rows
+
 
 class EditalPNCPExtractor:
     def __init__(self, headless: bool = True, timeout: int = 10):
@@ -17,6 +172,7 @@ class EditalPNCPExtractor:
             headless: Se True, executa o navegador em modo headless
             timeout: Tempo limite para aguardar elementos (segundos)
         """
+        self.headless = headless
         self.timeout = timeout
         self.driver = self._setup_driver(headless)
         self.wait = WebDriverWait(self.driver, timeout)
@@ -33,54 +189,189 @@ class EditalPNCPExtractor:
         
         return webdriver.Chrome(options=options)
     
-    def extract_edital_data(self, url: str) -> Dict:
+    def extract_edital_data(self, url: str, sections: Optional[Iterable[str]] = None,
+                            lazy: bool = True) -> Mapping:
         """
-        Extrai dados completos de um edital do PNCP
+        Extrai dados de um edital do PNCP
         
         Args:
             url: URL do edital no PNCP
+            sections: Seções extraídas na hora ('header', 'items', 'history', 'contracts').
+                Padrão: DEFAULT_SECTIONS (cabeçalho e itens)
+            lazy: Se True, as seções não pedidas ficam disponíveis no resultado e só são
+                extraídas quando acessadas; se False, são omitidas
             
         Returns:
-            Dict com todos os dados extraídos do edital
+            LazyEditalData com os dados do edital (dict vazio em caso de erro)
         """
+        sections = self._validate_sections(sections)
+        
         try:
-            self.driver.get(url)
-            
-            # Aguarda o carregamento da página - elemento principal correto
-            self.wait.until(EC.presence_of_element_located((By.ID, "main-content")))
-            
-            edital_data = {}
-            
-            # Extrai informações básicas
-            edital_data.update(self._extract_basic_info())
-            
-            # Extrai cronograma
-            edital_data.update(self._extract_timeline())
-            
-            # Extrai identificação
-            edital_data.update(self._extract_identification())
-            
-            # Extrai objeto
-            edital_data['objeto'] = self._extract_object()
-            
-            # Extrai valor
-            edital_data['valor_total_estimado'] = self._extract_total_value()
-            
-            # Extrai itens
-            edital_data['itens'] = self._extract_items()
-            
-            # Extrai histórico
-            edital_data['historico'] = self._extract_history()
-            
-            # Extrai contratos/empenhos
-            edital_data['contratos_empenhos'] = self._extract_contracts()
-            
-            return edital_data
+            return self._extract(url, sections, lazy)
             
         except Exception as e:
             print(f"Erro ao extrair dados do edital: {str(e)}")
             return {}
     
+    def extract_many(self, urls: Iterable[str], sections: Optional[Iterable[str]] = None,
+                     workers: int = 3, retries: int = 2,
+                     max_in_flight: Optional[int] = None) -> Iterator[ExtractionResult]:
+        """
+        Extrai vários editais com um pool de navegadores, entregando os resultados conforme terminam
+        
+        Args:
+            urls: URLs dos editais (pode ser um gerador; é consumido aos poucos)
+            sections: Seções extraídas de cada edital (ver extract_edital_data)
+            workers: Número de navegadores no pool (este extrator é um deles)
+            retries: Novas tentativas por URL após uma falha
+            max_in_flight: Máximo de URLs em andamento ou aguardando (padrão: 2 x workers)
+            
+        Yields:
+            ExtractionResult por URL, na ordem de conclusão. Os dados são dicts simples,
+            só com as seções pedidas, para não depender do navegador depois de entregues
+        """
+        sections = self._validate_sections(sections)
+        max_in_flight = max_in_flight or workers * 2
+        
+        # Pool de extratores: cada um tem seu próprio navegador e é usado por uma thread por vez
+        pool = queue.Queue()
+        pool.put(self)
+        extra_extractors = []
+        
+        def task(url: str) -> ExtractionResult:
+            extractor = pool.get()
+            try:
+                return extractor._extract_with_retry(url, sections, retries)
+            finally:
+                pool.put(extractor)
+        
+        try:
+            for _ in range(workers - 1):
+                extractor = type(self)(headless=self.headless, timeout=self.timeout)
+                extra_extractors.append(extractor)
+                pool.put(extractor)
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = set()
+                try:
+                    for url in urls:
+                        pending.add(executor.submit(task, url))
+                        # Limita a memória: só pega novas URLs quando há espaço
+                        while len(pending) >= max_in_flight:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                yield future.result()
+                    
+                    while pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                finally:
+                    # Consumidor parou antes do fim: descarta o que ainda não começou
+                    for future in pending:
+                        future.cancel()
+        finally:
+            for extractor in extra_extractors:
+                extractor.close()
+    
+    def _extract_with_retry(self, url: str, sections: set, retries: int) -> ExtractionResult:
+        """Extrai uma URL tentando novamente em caso de falha (reiniciando o navegador se caiu)"""
+        error = None
+        for attempt in range(1, retries + 2):
+            try:
+                data = self._extract(url, sections, lazy=False)
+                return ExtractionResult(url, data.loaded(), None, attempt)
+            except Exception as e:
+                error = str(e)
+                print(f"Erro ao extrair {url} (tentativa {attempt}/{retries + 1}): {error}")
+                self._ensure_driver_alive()
+                time.sleep(attempt)
+        return ExtractionResult(url, None, error, retries + 1)
+    
+    def _ensure_driver_alive(self):
+        """Recria o navegador se a sessão anterior morreu"""
+        try:
+            self.driver.current_url
+        except WebDriverException:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+            self.driver = self._setup_driver(self.headless)
+            self.wait = WebDriverWait(self.driver, self.timeout)
+    
+    @staticmethod
+    def _validate_sections(sections: Optional[Iterable[str]]) -> set:
+        """Normaliza e valida as seções pedidas"""
+        sections = set(DEFAULT_SECTIONS if sections is None else sections)
+        unknown = sections - set(SECTIONS)
+        if unknown:
+            raise ValueError(f"Seções desconhecidas: {', '.join(sorted(unknown))}")
+        return sections
+    
+    def _extract(self, url: str, sections: set, lazy: bool) -> LazyEditalData:
+        """Extrai as seções pedidas; erros de navegação são propagados ao chamador"""
+        self._load_page(url)
+        
+        edital_data = {}
+        
+        if 'header' in sections:
+            edital_data.update(self._extract_header())
+        
+        loaders = {}
+        for section, key in SECTION_KEYS.items():
+            if section in sections:
+                edital_data[key] = self._extract_section(section)
+            elif lazy:
+                loaders[key] = self._section_loader(url, section)
+        
+        return LazyEditalData(edital_data, loaders)
+    
+    def _load_page(self, url: str):
+        """Abre a página do edital e aguarda o conteúdo principal"""
+        self.driver.get(url)
+        
+        # Aguarda o carregamento da página - elemento principal correto
+        self.wait.until(EC.presence_of_element_located((By.ID, "main-content")))
+    
+    def _extract_header(self) -> Dict:
+        """Extrai os campos da página inicial do edital (sem trocar de aba)"""
+        header = {}
+        
+        # Extrai informações básicas
+        header.update(self._extract_basic_info())
+        
+        # Extrai cronograma
+        header.update(self._extract_timeline())
+        
+        # Extrai identificação
+        header.update(self._extract_identification())
+        
+        # Extrai objeto
+        header['objeto'] = self._extract_object()
+        
+        # Extrai valor
+        header['valor_total_estimado'] = self._extract_total_value()
+        
+        return header
+    
+    def _extract_section(self, section: str) -> List[Dict]:
+        """Extrai uma seção de lista (itens, histórico ou contratos/empenhos)"""
+        extractors = {
+            'items': self._extract_items,
+            'history': self._extract_history,
+            'contracts': self._extract_contracts
+        }
+        return extractors[section]()
+    
+    def _section_loader(self, url: str, section: str) -> Callable[[], List[Dict]]:
+        """Cria a função que extrai a seção sob demanda, voltando à página do edital se preciso"""
+        def load() -> List[Dict]:
+            if self.driver.current_url.rstrip('/') != url.rstrip('/'):
+                self._load_page(url)
+            return self._extract_section(section)
+        return load
+    
     def _extract_basic_info(self) -> Dict:
         """Extrai informações básicas do edital"""
         basic_info = {}
@@ -167,172 +458,34 @@ class EditalPNCPExtractor:
             return "Não informado"
     
     def _extract_items(self) -> List[Dict]:
-        """Extrai os itens do edital"""
-        items = []
-        
-        try:
-            # Verifica se a aba de itens está ativa, se não, clica nela
-            items_tab = self.driver.find_element(By.XPATH, "//span[text()='Itens']/parent::button")
-            if 'is-active' not in items_tab.get_attribute('class'):
-                items_tab.click()
-                time.sleep(2)
-            
-            # Aguarda a tabela de itens carregar - estrutura correta do DOM
-            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "datatable-body-row")))
-            
-            # Extrai todas as linhas da tabela de itens
-            rows = self.driver.find_elements(By.CSS_SELECTOR, "datatable-body-row")
-            
-            for row in rows:
-                try:
-                    # Busca as células usando a estrutura correta do DOM
-                    cells = row.find_elements(By.CSS_SELECTOR, "datatable-body-cell .datatable-body-cell-label span")
-                    
-                    if len(cells) >= 5:
-                        item = {
-                            'numero': cells[0].text.strip(),
-                            'descricao': cells[1].text.strip(),
-                            'quantidade': cells[2].text.strip(),
-                            'valor_unitario': cells[3].text.strip(),
-                            'valor_total': cells[4].text.strip()
-                        }
-                        items.append(item)
-                except Exception as e:
-                    print(f"Erro ao extrair item: {str(e)}")
-                    continue
-            
-            # Tenta navegar pelas páginas se houver mais itens
-            items.extend(self._extract_items_pagination())
-            
-        except Exception as e:
-            print(f"Erro ao extrair itens: {str(e)}")
-        
-        return items
-    
-    def _extract_items_pagination(self) -> List[Dict]:
-        """Extrai itens das páginas seguintes"""
-        additional_items = []
-        
-        try:
-            # Verifica se há botão de próxima página - ID correto do DOM
-            next_button = self.driver.find_element(By.ID, "btn-next-page")
-            
-            while not next_button.get_attribute('disabled'):
-                next_button.click()
-                time.sleep(2)
-                
-                # Aguarda nova página carregar
-                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "datatable-body-row")))
-                
-                # Extrai itens da página atual
-                rows = self.driver.find_elements(By.CSS_SELECTOR, "datatable-body-row")
-                
-                for row in rows:
-                    try:
-                        cells = row.find_elements(By.CSS_SELECTOR, "datatable-body-cell .datatable-body-cell-label span")
-                        if len(cells) >= 5:
-                            item = {
-                                'numero': cells[0].text.strip(),
-                                'descricao': cells[1].text.strip(),
-                                'quantidade': cells[2].text.strip(),
-                                'valor_unitario': cells[3].text.strip(),
-                                'valor_total': cells[4].text.strip()
-                            }
-                            additional_items.append(item)
-                    except Exception as e:
-                        continue
-                
-                # Atualiza referência do botão
-                next_button = self.driver.find_element(By.ID, "btn-next-page")
-                
-        except (NoSuchElementException, TimeoutException):
-            pass  # Não há mais páginas
-        
-        return additional_items
+        """Extrai os itens do edital (todas as páginas)"""
+        return self._extract_tab_rows('Itens', ItemRow, 'itens')
     
     def _extract_history(self) -> List[Dict]:
-        """Extrai o histórico do edital"""
-        history = []
-        
-        try:
-            # Clica na aba de histórico
-            history_tab = self.driver.find_element(By.XPATH, "//span[text()='Histórico']/parent::button")
-            history_tab.click()
-            time.sleep(2)
-            
-            # Aguarda a tabela carregar
-            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "datatable-body-row")))
-            
-            rows = self.driver.find_elements(By.CSS_SELECTOR, "datatable-body-row")
-            
-            for row in rows:
-                try:
-                    cells = row.find_elements(By.CSS_SELECTOR, "datatable-body-cell .datatable-body-cell-label span")
-                    if len(cells) >= 2:
-                        event = {
-                            'evento': cells[0].text.strip(),
-                            'data_hora': cells[1].text.strip() if cells[1].text.strip() else 
-                                       row.find_elements(By.CSS_SELECTOR, "datatable-body-cell .datatable-body-cell-label")[1].text.strip()
-                        }
-                        history.append(event)
-                except Exception as e:
-                    continue
-                    
-        except Exception as e:
-            print(f"Erro ao extrair histórico: {str(e)}")
-        
-        return history
+        """Extrai o histórico do edital (todas as páginas)"""
+        return self._extract_tab_rows('Histórico', HistoryRow, 'histórico')
     
     def _extract_contracts(self) -> List[Dict]:
-        """Extrai contratos/empenhos"""
-        contracts = []
-        
-        try:
-            # Clica na aba de contratos/empenhos
-            contracts_tab = self.driver.find_element(By.XPATH, "//span[text()='Contratos/Empenhos']/parent::button")
-            contracts_tab.click()
-            time.sleep(2)
-            
-            # Aguarda a tabela carregar
-            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "datatable-body-row")))
-            
-            rows = self.driver.find_elements(By.CSS_SELECTOR, "datatable-body-row")
-            
-            for row in rows:
-                try:
-                    cells = row.find_elements(By.CSS_SELECTOR, "datatable-body-cell .datatable-body-cell-label")
-                    if len(cells) >= 5:
-                        # Extrai texto considerando diferentes estruturas
-                        contract = {
-                            'numero': self._get_cell_text(cells[0]),
-                            'data_assinatura': self._get_cell_text(cells[1]),
-                            'vigencia': self._get_cell_text(cells[2]),
-                            'id_contrato_pncp': self._get_cell_text(cells[3]),
-                            'valor_global': self._get_cell_text(cells[4])
-                        }
-                        contracts.append(contract)
-                except Exception as e:
-                    continue
-                    
-        except Exception as e:
-            print(f"Erro ao extrair contratos: {str(e)}")
-        
-        return contracts
+        """Extrai contratos/empenhos (todas as páginas)"""
+        return self._extract_tab_rows('Contratos/Empenhos', ContractRow, 'contratos')
     
-    def _get_cell_text(self, cell_element) -> str:
-        """Extrai texto de uma célula, tratando diferentes estruturas"""
+    def _extract_tab_rows(self, tab_label: str, row_type, description: str) -> List[Dict]:
+        """Abre a aba e lê todas as páginas da sua tabela"""
         try:
-            # Tenta pegar span primeiro
-            span = cell_element.find_element(By.TAG_NAME, "span")
-            return span.text.strip()
-        except NoSuchElementException:
-            # Se não tem span, pega o texto direto
-            return cell_element.text.strip()
-    
-   
-            
+            reader = DataTableReader(self.driver, self.timeout)
+            self._open_tab(tab_label)
+            return [row._asdict() for row in reader.read_all(row_type)]
         except Exception as e:
-            print(f"Erro ao salvar arquivo Excel: {str(e)}")
+            print(f"Erro ao extrair {description}: {str(e)}")
+            return []
+    
+    def _open_tab(self, tab_label: str):
+        """Ativa a aba pelo rótulo, se ainda não estiver ativa"""
+        tab_xpath = f"//span[text()='{tab_label}']/parent::button"
+        tab = self.driver.find_element(By.XPATH, tab_xpath)
+        if 'is-active' not in (tab.get_attribute('class') or ''):
+            tab.click()
+            self.wait.until(lambda driver: 'is-active' in (driver.find_element(By.XPATH, tab_xpath).get_attribute('class') or ''))
     
     def close(self):
         """Fecha o navegador"""
@@ -353,10 +506,10 @@ if __name__ == '__main__':
     # URL do edital (substitua pela URL real)
     edital_url = "https://pncp.gov.br/editais/12075748000132/2025/7"
     
-    # Usa o extrator
+    # Usa o extrator (histórico e contratos só são extraídos se acessados)
     with EditalPNCPExtractor(headless=False) as extractor:
         print("Extraindo dados do edital...")
-        data = extractor.extract_edital_data(edital_url)
+        data = extractor.extract_edital_data(edital_url, sections={'header', 'items'})
         
         if data:
             print("\nDados extraídos com sucesso!")
@@ -365,9 +518,9 @@ if __name__ == '__main__':
             print(f"Total de itens: {len(data.get('itens', []))}")
       
             
-            # Exibe amostra dos dados
+            # Exibe amostra dos dados já extraídos
             print("\n--- Amostra dos dados extraídos ---")
-            for key, value in data.items():
+            for key, value in data.loaded().items():
                 if isinstance(value, list):
                     print(f"{key}: {len(value)} registros")
                 else:
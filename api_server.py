@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+API HTTP/JSON somente leitura sobre o banco de licitações, com cache de respostas e ETag
+"""
+
+import argparse
+import base64
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from config import config
+from database.database_config import DatabaseManager
+
+# Filtros aceitos em /licitacoes: {parâmetro: coluna da view licitacoes}
+LICITACAO_FILTERS = {
+    'pncp': 'id_contratacao_pncp',
+    'orgao': 'orgao',
+    'modalidade': 'modalidade',
+    'situacao': 'situacao',
+    'local': 'local',
+}
+
+
+class ApiError(Exception):
+    """Erro de requisição devolvido ao cliente com o status HTTP"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _encode_cursor(record):
+    """Cursor opaco com a chave de paginação (data_captura, id) do último registro da página"""
+    raw = json.dumps([record.data_captura, record.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        data_captura, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return data_captura, int(row_id)
+    except (ValueError, TypeError):
+        raise ApiError(400, "Cursor inválido")
+
+
+def _int_param(params, name, default, maximum=None):
+    value = params.get(name, [None])[0]
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(400, f"Parâmetro {name} deve ser inteiro")
+    if value < 1:
+        raise ApiError(400, f"Parâmetro {name} deve ser positivo")
+    return min(value, maximum) if maximum else value
+
+
+def _page(records, limit):
+    """Página de até `limit` registros e o cursor da próxima (None na última)"""
+    rows = list(itertools.islice(records, limit + 1))
+    proximo = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {'dados': [row._asdict() for row in rows[:limit]], 'proximo': proximo}
+
+
+class LicitacoesApi:
+    """Rotas da API: cada uma recebe os parâmetros da query string e devolve um objeto serializável"""
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+        self.routes = [
+            (('licitacoes',), self.licitacoes),
+            (('licitacoes', None), self.licitacao),
+            (('licitacoes', None, 'itens'), self.itens),
+            (('licitacoes', None, 'editais'), self.editais),
+            (('busca',), self.busca),
+            (('estatisticas',), self.estatisticas),
+        ]
+
+    def resolve(self, path):
+        """Rota e argumentos do caminho (None nos segmentos variáveis do padrão)"""
+        parts = tuple(part for part in path.split('/') if part)
+        for pattern, handler in self.routes:
+            if len(pattern) == len(parts) and all(p is None or p == part for p, part in zip(pattern, parts)):
+                return handler, [part for p, part in zip(pattern, parts) if p is None]
+        raise ApiError(404, f"Rota inexistente: {path}")
+
+    @staticmethod
+    def _page_args(params):
+        limit = _int_param(params, 'limite', config.API_PAGE_SIZE, config.API_MAX_PAGE_SIZE)
+        after = _decode_cursor(params['cursor'][0]) if 'cursor' in params else None
+        return limit, after
+
+    def _licitacao_id(self, value):
+        try:
+            licitacao_id = int(value)
+        except ValueError:
+            raise ApiError(400, "ID da licitação deve ser inteiro")
+        if next(self.db.iter_licitacoes(['id'], [('id', '=', licitacao_id)]), None) is None:
+            raise ApiError(404, f"Licitação {licitacao_id} não encontrada")
+        return licitacao_id
+
+    def licitacoes(self, params):
+        """GET /licitacoes?limite=&cursor=&orgao=&modalidade=&situacao=&local=&pncp="""
+        limit, after = self._page_args(params)
+        where = [(coluna, '=', params[nome][0]) for nome, coluna in LICITACAO_FILTERS.items() if nome in params]
+        return _page(self.db.iter_licitacoes(where=where, batch_size=limit + 1, after=after), limit)
+
+    def licitacao(self, params, licitacao_id):
+        """GET /licitacoes/<id>"""
+        licitacao_id = self._licitacao_id(licitacao_id)
+        return next(self.db.iter_licitacoes(where=[('id', '=', licitacao_id)]))._asdict()
+
+    def itens(self, params, licitacao_id):
+        """GET /licitacoes/<id>/itens?limite=&cursor="""
+        licitacao_id = self._licitacao_id(licitacao_id)
+        limit, after = self._page_args(params)
+        return _page(self.db.iter_itens_by_licitacao(licitacao_id, batch_size=limit + 1, after=after), limit)
+
+    def editais(self, params, licitacao_id):
+        """GET /licitacoes/<id>/editais?limite=&cursor="""
+        licitacao_id = self._licitacao_id(licitacao_id)
+        limit, after = self._page_args(params)
+        return _page(self.db.iter_editais_by_licitacao(licitacao_id, batch_size=limit + 1, after=after), limit)
+
+    def busca(self, params):
+        """GET /busca?q=&limite= (objeto das licitações e texto dos editais, por relevância)"""
+        termo = params.get('q', [''])[0].strip()
+        if not termo:
+            raise ApiError(400, "Informe o termo em q")
+        limit = _int_param(params, 'limite', config.API_PAGE_SIZE, config.API_MAX_PAGE_SIZE)
+        return {'dados': [dict(row) for row in self.db.search_text(termo, limit)]}
+
+    def estatisticas(self, params):
+        """GET /estatisticas?por=orgao|modalidade|dia&limite="""
+        resultado = {'totais': self.db.get_database_stats()}
+        if 'por' in params:
+            dimensao = params['por'][0]
+            if dimensao not in self.db.STATS_DIMENSIONS:
+                raise ApiError(400, f"Dimensão inválida: {dimensao}")
+            limit = _int_param(params, 'limite', None, config.API_MAX_PAGE_SIZE)
+            resultado[dimensao] = [
+                {'chave': chave, 'licitacoes': licitacoes, 'itens': itens, 'valor_estimado': valor}
+                for chave, licitacoes, itens, valor in self.db.get_estatisticas_por(dimensao, limit)
+            ]
+        return resultado
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Atende GET com ETag pela versão dos dados; as demais operações são recusadas (API somente leitura)"""
+
+    server_version = 'LicitacoesApi/1.0'
+
+    def _send(self, status, body=b'', etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            # O cliente pode guardar a resposta, mas deve revalidar com If-None-Match
+            self.send_header('Cache-Control', 'no-cache')
+        if body:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_error(self, status, mensagem):
+        self._send(status, json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8'))
+
+    def do_GET(self):
+        api, cache = self.server.api, self.server.cache
+        versao = api.db.get_versao_dados()
+        etag = f'"{versao}"'
+
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self._send(304, etag=etag)
+            return
+
+        key = ('api', self.path)
+        body = cache.get(key, versao)
+        if body is None:
+            url = urlsplit(self.path)
+            try:
+                handler, args = api.resolve(url.path)
+                resultado = handler(parse_qs(url.query), *args)
+            except ApiError as e:
+                self._send_error(e.status, str(e))
+                return
+            except ValueError as e:
+                self._send_error(400, str(e))
+                return
+            except Exception as e:
+                print(f"Erro ao atender {self.path}: {e}")
+                self._send_error(500, "Erro interno")
+                return
+            body = json.dumps(resultado, ensure_ascii=False, default=str).encode('utf-8')
+            cache.put(key, versao, body)
+        self._send(200, body, etag)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        self._send_error(405, "API somente leitura")
+
+    do_PUT = do_DELETE = do_PATCH = do_POST
+
+
+class ApiServer(HTTPServer):
+    """
+    Servidor com um número fixo de threads de atendimento.
+
+    Cada thread reaproveita a sua conexão somente leitura do DatabaseManager entre as requisições,
+    em vez de abrir uma conexão por requisição como o ThreadingHTTPServer faria.
+    """
+
+    def __init__(self, address, api=None, workers=None):
+        self.api = api or LicitacoesApi()
+        # Respostas serializadas no mesmo cache das consultas do DatabaseManager (invalidado a cada escrita)
+        self.cache = self.api.db.query_cache
+        # Antes do bind: se a porta estiver ocupada, o server_close chamado pelo socketserver já encontra o executor
+        self.executor = ThreadPoolExecutor(max_workers=workers or config.API_WORKERS)
+        super().__init__(address, ApiRequestHandler)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def serve(host=None, port=None, workers=None):
+    """Sobe a API até Ctrl+C"""
+    server = ApiServer((host or config.API_HOST, port or config.API_PORT), workers=workers)
+    print(f"API de licitações em http://{server.server_address[0]}:{server.server_address[1]} (Ctrl+C para parar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nAPI encerrada")
+    finally:
+        server.server_close()
+        print(f"Cache: {server.cache.hits} acertos, {server.cache.misses} faltas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP/JSON somente leitura do banco de licitações")
+    parser.add_argument('--host', help="Endereço de escuta (padrão: API_HOST)")
+    parser.add_argument('--porta', type=int, help="Porta (padrão: API_PORT)")
+    parser.add_argument('--workers', type=int, help="Threads de atendimento (padrão: API_WORKERS)")
+    args = parser.parse_args()
+
+    serve(args.host, args.porta, args.workers)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Arquivamento das licitações encerradas em bancos por ano e compactação do banco ativo
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+
+from config import config
+from database.database_config import DatabaseManager
+
+
+def _size_mb(path):
+    """Tamanho do banco somado ao WAL, em MB"""
+    total = sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+    return total / 1024 / 1024
+
+
+def vacuum(db=None, max_pages=None):
+    """Devolve ao disco parte das páginas livres do banco ativo (agendável, ex.: cron a cada hora)"""
+    db = db or DatabaseManager()
+    max_pages = config.VACUUM_MAX_PAGES if max_pages is None else max_pages
+    freed = db.incremental_vacuum(max_pages)
+    print(f"{freed} páginas livres devolvidas ao disco")
+    return freed
+
+
+def arquivar(dias=None, limite=None, batch_size=None):
+    """Move as licitações encerradas para os bancos de arquivo do seu ano e compacta o banco ativo"""
+    dias = config.ARCHIVE_AFTER_DAYS if dias is None else dias
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+    db = DatabaseManager()
+    started = time.monotonic()
+    size_before = _size_mb(db.db_path)
+
+    candidates = db.get_licitacoes_para_arquivar(dias, config.REFRESH_CLOSED_SITUATIONS, limite)
+    por_ano = defaultdict(list)
+    for licitacao_id, ano in candidates:
+        por_ano[ano].append(licitacao_id)
+    print(f"{len(candidates)} licitações encerradas para arquivar "
+          f"({', '.join(f'{ano}: {len(ids)}' for ano, ids in sorted(por_ano.items())) or 'nenhuma'})")
+
+    moved = 0
+    for ano, ids in sorted(por_ano.items()):
+        for i in range(0, len(ids), batch_size):
+            moved += db.arquivar_licitacoes(ano, ids[i:i + batch_size], config.ARCHIVE_COMPRESS_MIN_BYTES)
+
+    if moved:
+        vacuum(db)
+    elapsed = time.monotonic() - started
+    print(f"{moved} licitações arquivadas em {elapsed:.1f}s; banco ativo: "
+          f"{size_before:.1f} MB -> {_size_mb(db.db_path):.1f} MB")
+    return moved
+
+
+def listar():
+    """Mostra o banco ativo e os bancos de arquivo com o número de licitações"""
+    db = DatabaseManager()
+    cursor = db.get_history_connection().cursor()
+    cursor.execute('SELECT COALESCE(arquivo, \'ativo\'), COUNT(*) FROM licitacoes_historico GROUP BY arquivo')
+    counts = dict(cursor.fetchall())
+
+    print(f"Ativo: {counts.get('ativo', 0)} licitações ({_size_mb(db.db_path):.1f} MB)")
+    for ano, path in db.list_archives():
+        print(f"Arquivo {ano}: {counts.get(ano, 0)} licitações ({_size_mb(path):.1f} MB)")
+
+
+def buscar_historico(termo, limit=20):
+    """Busca o termo no objeto das licitações ativas e arquivadas"""
+    cursor = DatabaseManager().get_history_connection().cursor()
+    cursor.execute('''
+        SELECT COALESCE(arquivo, 'ativo'), id_contratacao_pncp, orgao, data_divulgacao, objeto
+        FROM licitacoes_historico
+        WHERE objeto LIKE ?
+        LIMIT ?
+    ''', (f'%{termo}%', limit))
+    resultados = cursor.fetchall()
+
+    print(f"\nHistórico para '{termo}':")
+    print("="*80)
+    if not resultados:
+        print("Nenhuma licitação encontrada com esse termo.")
+    for origem, pncp, orgao, divulgacao, objeto in resultados:
+        print(f"[{origem}] PNCP: {pncp} | Órgão: {orgao} | Divulgação: {divulgacao}")
+        print(f"Objeto: {(objeto or '')[:150]}...")
+        print("-" * 50)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivamento por ano e compactação do banco de licitações")
+    parser.add_argument('--dias', type=int, help="Dias após o fim das propostas para arquivar")
+    parser.add_argument('--limite', type=int, help="Máximo de licitações arquivadas nesta execução")
+    parser.add_argument('--vacuum', action='store_true', help="Só devolve páginas livres ao disco")
+    parser.add_argument('--listar', action='store_true', help="Mostra o banco ativo e os arquivos")
+    parser.add_argument('--buscar', help="Termo para buscar nas licitações ativas e arquivadas")
+    args = parser.parse_args()
+
+    if args.vacuum:
+        vacuum()
+    elif args.listar:
+        listar()
+    elif args.buscar:
+        buscar_historico(args.buscar)
+    else:
+        arquivar(dias=args.dias, limite=args.limite)
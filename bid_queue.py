@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Fila de prioridade das licitações a processar, ordenada pelo prazo de propostas
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from datetime import datetime
+
+from config import config
+from network_capture import compra_key
+
+# Classes de prioridade pelo tempo restante até o fim das propostas: (nome, limite em horas)
+PRIORITY_CLASSES = (
+    ('urgente', 24),
+    ('semana', 7 * 24),
+    ('normal', None),
+)
+SEM_PRAZO = 'sem_prazo'
+
+
+class BidPriorityQueue:
+    """
+    Fila thread-safe com a mesma interface usada pelo TabScheduler (get_nowait/put/qsize).
+
+    Ordem: prazo de propostas mais próximo, depois prioridade do termo e maior valor estimado.
+    Licitações sem prazo conhecido vão para o fim, na ordem em que foram encontradas.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._enqueued = {}
+        self._waits = {}
+
+    @staticmethod
+    def priority_class(prazo, now=None):
+        """Classe de prioridade pelo tempo restante até o prazo"""
+        if prazo is None:
+            return SEM_PRAZO
+        hours = (prazo - (now or datetime.now())).total_seconds() / 3600
+        for name, limit in PRIORITY_CLASSES:
+            if limit is None or hours <= limit:
+                return name
+        return PRIORITY_CLASSES[-1][0]
+
+    def put(self, url, prazo=None, termo=None, valor=None):
+        """Enfileira a URL com o prazo (datetime), o termo que a encontrou e o valor estimado do card"""
+        prioridade_termo = config.TERM_PRIORITIES.get(termo, 0)
+        key = (
+            prazo is None,
+            prazo.timestamp() if prazo is not None else 0,
+            -prioridade_termo,
+            -(valor or 0),
+            next(self._counter),
+        )
+        classe = self.priority_class(prazo)
+        with self._lock:
+            heapq.heappush(self._heap, (key, url, classe))
+            self._enqueued[url] = time.monotonic()
+
+    def get_nowait(self):
+        """Retira a URL mais prioritária (queue.Empty se a fila estiver vazia)"""
+        with self._lock:
+            if not self._heap:
+                raise queue.Empty
+            _, url, classe = heapq.heappop(self._heap)
+            wait = time.monotonic() - self._enqueued.pop(url, time.monotonic())
+            self._waits.setdefault(classe, []).append(wait)
+        return url
+
+    def qsize(self):
+        with self._lock:
+            return len(self._heap)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def wait_stats(self):
+        """Espera na fila por classe de prioridade: {classe: (quantidade, média, máximo) em segundos}"""
+        with self._lock:
+            return {
+                classe: (len(waits), sum(waits) / len(waits), max(waits))
+                for classe, waits in self._waits.items() if waits
+            }
+
+    def report(self):
+        """Mostra quanto tempo cada classe de prioridade esperou até ser processada"""
+        stats = self.wait_stats()
+        if not stats:
+            return
+        print("\nEspera na fila por prioridade:")
+        for classe in [name for name, _ in PRIORITY_CLASSES] + [SEM_PRAZO]:
+            if classe in stats:
+                count, mean, longest = stats[classe]
+                print(f"  {classe}: {count} licitações | média {mean:.1f}s | máxima {longest:.1f}s")
+
+
+def build_queue(urls, cards=None, termo=None):
+    """Monta a fila a partir dos links da busca e dos cards capturados ({chave da compra: card})"""
+    cards = cards or {}
+    fila = BidPriorityQueue()
+    for url in urls:
+        card = cards.get(compra_key(url)) or {}
+        fila.put(url, prazo=card.get('prazo'), termo=termo, valor=card.get('valor'))
+    return fila
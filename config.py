@@ -17,6 +17,11 @@ class Config:
     THREAD_TIMEOUT = 300  # Timeout em segundos para cada thread
     RETRY_ATTEMPTS = 3  # Número de tentativas em caso de falha
     
+    # Configurações de abas (várias licitações por processo do Chrome)
+    TABS_PER_BROWSER = 4  # Abas simultâneas por navegador (1 = uma licitação por vez)
+    TAB_POLL_INTERVAL = 0.2  # Intervalo entre verificações das abas em carregamento
+    TAB_READY_XPATH = '//strong[contains(.,"Id contratação PNCP:")]'
+    
     # Lista de termos de busca
     SEARCH_TERMS = [
         "Pulverizador",
@@ -31,6 +36,9 @@ class Config:
         "Plantadeira"
     ]
     
+    # Prioridade de cada termo na fila de processamento (maior primeiro, desempata prazos iguais)
+    TERM_PRIORITIES = {}
+    
     # Configurações do Chrome/Selenium
     CHROME_OPTIONS = [
         "--no-sandbox",
@@ -42,6 +50,10 @@ class Config:
         "--disable-plugins",
         "--disable-images",  # Carregar mais rápido
         #"--disable-javascript",  # Opcional: desabilitar JS se não necessário
+        # Mantém as abas em segundo plano carregando na velocidade normal
+        "--disable-background-timer-throttling",
+        "--disable-backgrounding-occluded-windows",
+        "--disable-renderer-backgrounding",
     ]
     
     # Configurações de timeout
@@ -49,6 +61,82 @@ class Config:
     ELEMENT_WAIT_TIMEOUT = 10
     IMPLICIT_WAIT = 5
     
+    # Captura das respostas JSON da API pelo DevTools (dispensa a raspagem do DOM)
+    NETWORK_CAPTURE = True
+    NETWORK_CAPTURE_TIMEOUT = 10  # Segundos aguardando as respostas da SPA
+    NETWORK_CAPTURE_PAGE_SIZE = 1000  # Tamanho de página pedido à API para completar os itens
+    ITEM_PAGE_SHARDS = 4  # Páginas de itens pedidas ao mesmo tempo nas licitações muito grandes
+    ITEM_FLUSH_SIZE = 200  # Itens gravados por transação enquanto as páginas são lidas
+    
+    # Arquivo das páginas de detalhe para re-processamento offline
+    PAGE_ARCHIVE = False
+    PAGE_ARCHIVE_DIR = "database/paginas"
+    
+    # Download dos arquivos de edital
+    EDITAIS_DIR = "database/editais"
+    DOWNLOAD_WORKERS = 8  # Downloads simultâneos (conexões no pool HTTP)
+    DOWNLOAD_CHUNK_SIZE = 256 * 1024  # Bytes gravados por bloco
+    DOWNLOAD_TIMEOUT = 60  # Timeout de conexão/leitura em segundos
+    
+    # Extração e indexação do texto dos editais
+    TEXT_EXTRACTION_WORKERS = None  # Processos de extração (None = um por núcleo)
+    TEXT_CHUNK_SIZE = 2000  # Caracteres por bloco indexado
+    
+    # Agrupamento de descrições de itens quase iguais no catálogo
+    ITEM_CLUSTER_THRESHOLD = 0.8  # Similaridade mínima (Jaccard das palavras) para agrupar
+    ITEM_CLUSTER_MAX_POSTING = 1000  # Palavras mais frequentes que isso não geram candidatos
+    
+    # Análise de preços unitários dos itens
+    PRICE_MIN_SAMPLES = 5  # Grupos com menos itens que isso ficam fora das estatísticas
+    PRICE_LOAD_BATCH = 50000  # Linhas lidas do banco por lote ao carregar os preços
+    
+    # Modo de vigilância contínua (primeira página de cada termo, intervalo adaptativo)
+    WATCH_STATE_FILE = "watch_state.json"
+    WATCH_MIN_INTERVAL = 120  # Segundos mínimos entre consultas do mesmo termo
+    WATCH_MAX_INTERVAL = 6 * 3600  # Termos sem novidades são consultados ao menos nesse intervalo
+    WATCH_INITIAL_INTERVAL = 900  # Intervalo de um termo ainda sem histórico
+    WATCH_TARGET_NEW = 1.0  # Novas licitações esperadas por consulta (define o intervalo pela taxa)
+    WATCH_RATE_SMOOTHING = 0.3  # Peso da última consulta na média móvel da taxa de publicação
+    WATCH_SEEN_MAX = 20000  # URLs já gravadas mantidas em memória (as mais antigas voltam a ser checadas no banco)
+    
+    # Revalidação das licitações abertas já armazenadas
+    REFRESH_BUDGET = 200  # Páginas de detalhe abertas por execução
+    REFRESH_MIN_AGE_HOURS = 12  # Licitação verificada há menos tempo que isso não é reaberta
+    REFRESH_CLOSED_SITUATIONS = ('Revogada', 'Anulada')  # Situações que não mudam mais
+    
+    # Arquivamento das licitações encerradas em bancos por ano (database/arquivo/licitacoes_<ano>.db)
+    ARCHIVE_AFTER_DAYS = 90  # Dias após o fim das propostas para sair do banco ativo
+    ARCHIVE_BATCH_SIZE = 1000  # Licitações movidas por transação
+    ARCHIVE_COMPRESS_MIN_BYTES = 200  # Objetos menores que isso não são comprimidos
+    VACUUM_MAX_PAGES = 5000  # Páginas livres devolvidas ao disco por execução (0 = todas)
+    
+    # API HTTP somente leitura sobre o banco (api_server.py)
+    API_HOST = "127.0.0.1"
+    API_PORT = 8765
+    API_WORKERS = 8  # Threads fixas atendendo requisições, cada uma com sua conexão de leitura
+    API_PAGE_SIZE = 50  # Registros por página quando o cliente não informa o limite
+    API_MAX_PAGE_SIZE = 500
+    
+    # Benchmark da camada de armazenamento (storage_benchmark.py)
+    BENCHMARK_DIR = "benchmarks"  # Bancos sintéticos gerados e resultados em JSON
+    BENCHMARK_SCALES = (10_000, 100_000, 1_000_000)  # Licitações no banco de cada escala
+    BENCHMARK_WRITER_THREADS = (1, 2, 4, 8)  # Threads escritoras comparadas
+    BENCHMARK_WRITES = 500  # Licitações inseridas em cada medição de escrita
+    BENCHMARK_LOOKUPS = 1000  # Consultas em cada medição de leitura
+    
+    # Configurações de timeouts aprendidos por seletor
+    TIMEOUT_STATS_FILE = "timeout_stats.json"
+    TIMEOUT_MARGIN = 2.0  # Multiplicador aplicado ao p99 da latência
+    TIMEOUT_MIN = 1.0  # Timeout mínimo para seletores normalmente presentes
+    TIMEOUT_FAIL_FAST = 0.5  # Timeout para seletores normalmente ausentes
+    TIMEOUT_ABSENT_RATE = 0.2  # Abaixo dessa taxa de presença o seletor falha rápido
+    TIMEOUT_MIN_SAMPLES = 20  # Amostras necessárias antes de aprender o timeout
+    TIMEOUT_MAX_SAMPLES = 200  # Amostras de latência mantidas por seletor
+    TIMEOUT_DECAY = 0.98  # Peso das contagens de presença antigas a cada nova espera (vale a história recente)
+    TIMEOUT_PROBE_EVERY = 25  # A cada N esperas do seletor, uma usa o timeout padrão inteiro (reaprende se ficou lento)
+    # Seletores cuja ausência encerra uma lista (fim dos itens/editais): sempre esperam o timeout padrão
+    TIMEOUT_FULL_KEYS = ('item:descricao', 'item:proxima_pagina', 'edital:tipo')
+    
     # Configurações de busca
     DEFAULT_SEARCH_TERM = "Pulverizador"
     MAX_PAGES_TO_SEARCH = 5  # Máximo de páginas para buscar licitações
@@ -85,7 +173,8 @@ class Config:
         return {
             'max_workers': cls.MAX_WORKERS,
             'timeout': cls.THREAD_TIMEOUT,
-            'retry_attempts': cls.RETRY_ATTEMPTS
+            'retry_attempts': cls.RETRY_ATTEMPTS,
+            'tabs_per_browser': cls.TABS_PER_BROWSER
         }
     
     @classmethod
@@ -105,6 +194,7 @@ class Config:
 class DevelopmentConfig(Config):
     """Configurações para desenvolvimento"""
     MAX_WORKERS = 2
+    TABS_PER_BROWSER = 2
     LOG_LEVEL = "DEBUG"
     CHROME_OPTIONS = [
         "--no-sandbox",
@@ -122,6 +212,7 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Configurações para produção"""
     MAX_WORKERS = 5
+    TABS_PER_BROWSER = 6
     LOG_LEVEL = "WARNING"
     CHROME_OPTIONS = [
         "--no-sandbox",
@@ -133,11 +224,15 @@ class ProductionConfig(Config):
         "--disable-extensions",
         "--disable-plugins",
         "--disable-images",
+        "--disable-background-timer-throttling",
+        "--disable-backgrounding-occluded-windows",
+        "--disable-renderer-backgrounding",
     ]
 
 class TestConfig(Config):
     """Configurações para testes"""
     MAX_WORKERS = 1
+    TABS_PER_BROWSER = 1
     LOG_LEVEL = "DEBUG"
     DATABASE_PATH = "database/test_licitacoes.db"
     MAX_PAGES_TO_SEARCH = 1
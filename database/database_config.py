@@ -1,13 +1,231 @@
 import sqlite3
 import os
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 import threading
 import time
+from urllib.request import pathname2url
+
+# Tipos de registro já criados por (tabela, colunas)
+_RECORD_TYPES = {}
+
+# Item extraído pelo scraper, nas colunas de texto de itens_dados (a licitação não se repete em cada item)
+ItemRecord = namedtuple('ItemRecord', ('descricao', 'quantidade', 'valor_unitario_estimado', 'valor_total_estimado'))
+
+# Converte um valor em texto ("R$ 1.234,56") para número dentro do SQL
+VALOR_SQL = ("CAST(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE({valor}, 'R$', ''), char(160), ''), ' ', ''), "
+             "'.', ''), ',', '.') AS REAL)")
+
+
+def parse_valor(texto):
+    """Converte um valor em texto ("R$ 1.234,56", "1.000") para número; None se não for numérico ou for zero"""
+    if texto is None:
+        return None
+    limpo = str(texto).replace('R$', '').replace('\xa0', '').replace(' ', '').replace('.', '').replace(',', '.')
+    try:
+        valor = float(limpo)
+    except ValueError:
+        return None
+    return valor or None
+
+
+def formatar_numero(valor, casas=2):
+    """Formata um número no padrão brasileiro (1.234,56); None continua None"""
+    if valor is None:
+        return None
+    texto = f"{float(valor):,.{casas}f}"
+    return texto.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def formatar_valor(valor):
+    """Formata um valor monetário como na página do PNCP (R$ 1.234,56); None continua None"""
+    numero = formatar_numero(valor)
+    return f"R$ {numero}" if numero is not None else None
+
+
+def comprimir_texto(texto, min_bytes=0):
+    """Comprime textos longos com zlib para os bancos de arquivo (textos curtos ficam como estão)"""
+    if texto is None:
+        return None
+    dados = texto.encode('utf-8')
+    if len(dados) < min_bytes:
+        return texto
+    return zlib.compress(dados, 9)
+
+
+def descomprimir_texto(valor):
+    """Inverso de comprimir_texto (registrado como a função SQL descomprimir)"""
+    if isinstance(valor, bytes):
+        return zlib.decompress(valor).decode('utf-8')
+    return valor
+
+
+# Grafias de unidades de medida nas descrições de itens e a forma normalizada
+UNIDADES = {
+    'L': ('L', 'LT', 'LTS', 'LITRO', 'LITROS'),
+    'ML': ('ML', 'MILILITRO', 'MILILITROS'),
+    'KG': ('KG', 'KGS', 'QUILO', 'QUILOS', 'KILO', 'KILOS', 'QUILOGRAMA', 'QUILOGRAMAS'),
+    'G': ('G', 'GR', 'GRS', 'GRAMA', 'GRAMAS'),
+    'MG': ('MG', 'MILIGRAMA', 'MILIGRAMAS'),
+    'M': ('M', 'MT', 'MTS', 'METRO', 'METROS'),
+    'CM': ('CM', 'CENTIMETRO', 'CENTIMETROS'),
+    'MM': ('MM', 'MILIMETRO', 'MILIMETROS'),
+    'UN': ('UN', 'UND', 'UNID', 'UNIDADE', 'UNIDADES'),
+    'CX': ('CX', 'CAIXA', 'CAIXAS'),
+    'PCT': ('PCT', 'PACOTE', 'PACOTES'),
+}
+_UNIDADE_NORMALIZADA = {grafia: unidade for unidade, grafias in UNIDADES.items() for grafia in grafias}
+
+
+def normalize_descricao(texto):
+    """
+    Forma canônica da descrição de um item: sem acentos, maiúscula, espaços e unidades normalizados.
+    
+    "Pulverizador costal manual 20 Litros" e "PULVERIZADOR COSTAL MANUAL 20LT" viram
+    "PULVERIZADOR COSTAL MANUAL 20 L".
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).upper()
+    texto = re.sub(r'(?<=\d),(?=\d)', '.', texto)
+    texto = re.sub(r'[^A-Z0-9.%/]+', ' ', texto)
+    texto = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', texto)
+    texto = re.sub(r'(?<=\d)(?=[A-Z])|(?<=[A-Z])(?=\d)', ' ', texto)
+    return ' '.join(_UNIDADE_NORMALIZADA.get(token, token) for token in texto.split())
+
+
+class QueryCache:
+    """
+    Cache LRU de resultados de leitura, válido só enquanto a versão dos dados não muda.
+    
+    Qualquer escrita no banco muda a versão (versao_dados) e descarta o cache inteiro na próxima consulta.
+    """
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versao = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _check_versao(self, versao):
+        if versao != self._versao:
+            self._entries.clear()
+            self._versao = versao
+    
+    def get(self, key, versao):
+        """Valor guardado para a chave na versão informada (None se não houver)"""
+        with self._lock:
+            self._check_versao(versao)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, versao, value):
+        with self._lock:
+            self._check_versao(versao)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versao = None
+
 
 class DatabaseManager:
     _instance = None
     _lock = threading.Lock()
     
+    # Tabelas que podem ser percorridas com iter_rows
+    ITERABLE_TABLES = ('licitacoes', 'itens_licitacao', 'editais')
+    
+    # Operadores aceitos nos filtros de iter_rows
+    FILTER_OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'LIKE')
+    
+    # Linhas lidas por consulta nos iteradores
+    DEFAULT_BATCH_SIZE = 500
+    
+    # Descrições de itens mantidas no cache LRU (texto -> chave)
+    DESCRICAO_CACHE_SIZE = 10000
+    
+    # Resultados de consultas de leitura mantidos no cache LRU (descartados a cada escrita)
+    QUERY_CACHE_SIZE = 1000
+    
+    # data_fim_propostas "dd/mm/aaaa HH:MM" convertida para comparação (sem hora vale o dia todo)
+    FIM_PROPOSTAS_SQL = '''
+        CASE WHEN l.data_fim_propostas GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+             THEN substr(l.data_fim_propostas, 7, 4) || '-' || substr(l.data_fim_propostas, 4, 2) || '-' ||
+                  substr(l.data_fim_propostas, 1, 2) || ' ' ||
+                  COALESCE(NULLIF(substr(l.data_fim_propostas, 12, 5), ''), '23:59')
+        END
+    '''
+    
+    # Ano da licitação (divulgação no PNCP, ou captura): define o banco de arquivo
+    ANO_SQL = '''
+        CASE WHEN l.data_divulgacao GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+             THEN substr(l.data_divulgacao, 7, 4)
+             ELSE strftime('%Y', l.data_captura)
+        END
+    '''
+    
+    # Tabelas copiadas para os bancos de arquivo (dimensões e catálogo ficam no banco ativo)
+    ARCHIVE_TABLES = ('licitacoes_dados', 'itens_dados', 'editais')
+    
+    # Definição da tabela editais (também usada para recriá-la em bancos migrados)
+    EDITAIS_SCHEMA = '''
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_licitacao INTEGER,
+        url_edital TEXT,
+        sha256 TEXT,
+        tamanho_bytes INTEGER,
+        caminho_local TEXT,
+        data_download TIMESTAMP,
+        data_captura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_licitacao) REFERENCES licitacoes_dados (id)
+    '''
+    
+    # Colunas de licitacoes guardadas em tabelas de dimensão: {coluna: tabela}
+    DIMENSIONS = {
+        'local': 'locais',
+        'orgao': 'orgaos',
+        'unidade_compradora': 'unidades_compradoras',
+        'modalidade': 'modalidades',
+        'amparo_legal': 'amparos_legais',
+    }
+    
+    # Agrupamentos mantidos em estatisticas_grupos: {dimensão: chave calculada da linha de licitacoes_dados}
+    STATS_DIMENSIONS = {
+        'orgao': "COALESCE((SELECT nome FROM orgaos WHERE id = {row}.orgao_id), '')",
+        'modalidade': "COALESCE((SELECT nome FROM modalidades WHERE id = {row}.modalidade_id), '')",
+        'dia': "COALESCE(date({row}.data_captura), '')",
+    }
+    
+    # Colunas de dados da tabela licitacoes, na ordem do INSERT
+    LICITACAO_FIELDS = (
+        'id_contratacao_pncp', 'url', 'local', 'orgao', 'unidade_compradora',
+        'modalidade', 'amparo_legal', 'tipo', 'modo_disputa', 'registro_preco',
+        'fonte_orcamentaria', 'data_divulgacao', 'situacao', 'data_inicio_propostas',
+        'data_fim_propostas', 'fonte', 'objeto'
+    )
+    
+    # Colunas correspondentes em licitacoes_dados (dimensões guardadas pela chave inteira)
+    LICITACAO_COLUMNS = (
+        'id_contratacao_pncp', 'url', 'local_id', 'orgao_id', 'unidade_compradora_id',
+        'modalidade_id', 'amparo_legal_id', 'tipo', 'modo_disputa', 'registro_preco',
+        'fonte_orcamentaria', 'data_divulgacao', 'situacao', 'data_inicio_propostas',
+        'data_fim_propostas', 'fonte', 'objeto'
+    )
+    
     def __new__(cls, db_path="database/licitacoes.db"):
         if cls._instance is None:
             with cls._lock:
@@ -19,10 +237,20 @@ class DatabaseManager:
     def __init__(self, db_path="database/licitacoes.db"):
         if not self._initialized:
             self.db_path = db_path
+            self._columns_cache = {}
+            # Cache das chaves das dimensões: {coluna: {nome: id}}
+            self._dimension_ids = {coluna: {} for coluna in self.DIMENSIONS}
+            self._descricao_ids = OrderedDict()
+            # Cache dos resultados de leitura, compartilhado pelas consultas da CLI e da API
+            self.query_cache = QueryCache(self.QUERY_CACHE_SIZE)
             self.ensure_database_directory()
+            # Lock só das escritas: no modo WAL as leituras não esperam o writer
+            self._write_lock = threading.Lock()
+            # Conexões somente leitura, uma por thread
+            self._readers = threading.local()
+            # Bancos de arquivo por ano (licitações encerradas), ao lado do banco ativo
+            self.archive_dir = os.path.join(os.path.dirname(self.db_path), 'arquivo')
             self.create_tables()
-            # Lock para garantir thread-safety
-            self._lock = threading.Lock()
             self._initialized = True
     
     def ensure_database_directory(self):
@@ -31,25 +259,129 @@ class DatabaseManager:
     
     def get_connection(self):
         """Retorna uma conexão com o banco de dados"""
-        return sqlite3.connect(self.db_path, timeout=30.0)
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        # INSERT OR REPLACE também dispara os triggers de DELETE (mantém índices derivados corretos)
+        conn.execute('PRAGMA recursive_triggers = ON')
+        # No WAL cada commit não precisa de fsync; a durabilidade vem no checkpoint
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+    
+    def get_read_connection(self):
+        """
+        Retorna a conexão somente leitura da thread atual (criada na primeira chamada).
+        
+        Não deve ser fechada por quem chama: é reaproveitada pelas próximas leituras da thread.
+        """
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            uri = 'file:' + pathname2url(os.path.abspath(self.db_path)) + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, timeout=30.0)
+            conn.execute('PRAGMA query_only = ON')
+            conn.create_function('descomprimir', 1, descomprimir_texto, deterministic=True)
+            self._readers.conn = conn
+        return conn
+    
+    def list_archives(self):
+        """Bancos de arquivo existentes: [(ano, caminho)] em ordem de ano"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        archives = []
+        for name in os.listdir(self.archive_dir):
+            match = re.fullmatch(r'licitacoes_(\d{4})\.db', name)
+            if match:
+                archives.append((match.group(1), os.path.join(self.archive_dir, name)))
+        return sorted(archives)
+    
+    def get_history_connection(self):
+        """
+        Conexão de leitura da thread com os bancos de arquivo anexados (somente leitura).
+        
+        Além das tabelas do banco ativo, expõe as views temporárias licitacoes_historico,
+        itens_historico e editais_historico (ativo + arquivos, com a coluna arquivo = ano ou NULL).
+        """
+        conn = self.get_read_connection()
+        archives = self.list_archives()
+        if getattr(self._readers, 'archives', None) == archives:
+            return conn
+        
+        # As views temporárias e o ATTACH não alteram os arquivos, mas query_only os bloquearia
+        conn.execute('PRAGMA query_only = OFF')
+        try:
+            for (schema,) in conn.execute("SELECT name FROM pragma_database_list WHERE name LIKE 'arquivo_%'").fetchall():
+                conn.execute(f'DETACH DATABASE {schema}')
+            for ano, path in archives:
+                uri = 'file:' + pathname2url(os.path.abspath(path)) + '?mode=ro'
+                conn.execute(f'ATTACH DATABASE ? AS arquivo_{ano}', (uri,))
+            
+            schemas = [(f'arquivo_{ano}', ano) for ano, _ in archives]
+            editais_columns = 'id, id_licitacao, url_edital, sha256, tamanho_bytes, caminho_local, data_download, data_captura'
+            views = {
+                'licitacoes_historico': ['SELECT *, NULL AS arquivo FROM main.licitacoes'] + [
+                    f"SELECT *, '{ano}' AS arquivo FROM ({self._licitacoes_view_sql(schema)})" for schema, ano in schemas
+                ],
+                'itens_historico': ['SELECT *, NULL AS arquivo FROM main.itens_licitacao'] + [
+                    f"SELECT *, '{ano}' AS arquivo FROM ({self._itens_view_sql(schema)})" for schema, ano in schemas
+                ],
+                'editais_historico': [f'SELECT {editais_columns}, NULL AS arquivo FROM main.editais'] + [
+                    f"SELECT {editais_columns}, '{ano}' AS arquivo FROM {schema}.editais" for schema, ano in schemas
+                ],
+            }
+            for name, selects in views.items():
+                conn.execute(f'DROP VIEW IF EXISTS temp.{name}')
+                conn.execute(f'CREATE TEMP VIEW {name} AS {" UNION ALL ".join(selects)}')
+        finally:
+            conn.execute('PRAGMA query_only = ON')
+        
+        self._readers.archives = archives
+        return conn
+    
+    def close_read_connection(self):
+        """Fecha a conexão de leitura da thread atual (ex.: ao encerrar um worker)"""
+        conn = getattr(self._readers, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._readers.conn = None
+            self._readers.archives = None
+            self._readers.versao = None
     
     def create_tables(self):
         """Cria as tabelas do banco de dados"""
-        with self._lock:
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Tabela de licitações
+            # auto_vacuum incremental: o espaço liberado pelo arquivamento volta ao disco aos poucos
+            cursor.execute('PRAGMA auto_vacuum')
+            converter_vacuum = cursor.fetchone()[0] != 2
+            if converter_vacuum:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute("SELECT count(*) FROM sqlite_master")
+                # Banco novo já nasce incremental; um existente precisa de um VACUUM (feito uma vez)
+                converter_vacuum = cursor.fetchone()[0] > 0
+            
+            # WAL: leitores e o writer trabalham ao mesmo tempo (a configuração fica gravada no arquivo)
+            cursor.execute('PRAGMA journal_mode = WAL')
+            
+            # Tabelas de dimensão: textos repetidos nas licitações, guardados uma vez com chave inteira
+            for tabela in self.DIMENSIONS.values():
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {tabela} (
+                        id INTEGER PRIMARY KEY,
+                        nome TEXT NOT NULL UNIQUE
+                    )
+                ''')
+            
+            # Tabela de licitações (a view licitacoes mostra as dimensões como texto)
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS licitacoes (
+                CREATE TABLE IF NOT EXISTS licitacoes_dados (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     id_contratacao_pncp TEXT UNIQUE,
                     url TEXT,
-                    local TEXT,
-                    orgao TEXT,
-                    unidade_compradora TEXT,
-                    modalidade TEXT,
-                    amparo_legal TEXT,
+                    local_id INTEGER REFERENCES locais (id),
+                    orgao_id INTEGER REFERENCES orgaos (id),
+                    unidade_compradora_id INTEGER REFERENCES unidades_compradoras (id),
+                    modalidade_id INTEGER REFERENCES modalidades (id),
+                    amparo_legal_id INTEGER REFERENCES amparos_legais (id),
                     tipo TEXT,
                     modo_disputa TEXT,
                     registro_preco TEXT,
@@ -64,70 +396,678 @@ class DatabaseManager:
                 )
             ''')
             
-            # Tabela de itens da licitação
+            # Bancos anteriores às dimensões têm licitacoes como tabela com os textos repetidos
+            cursor.execute("SELECT type FROM sqlite_master WHERE name = 'licitacoes'")
+            row = cursor.fetchone()
+            migrated = row is not None and row[0] == 'table'
+            if migrated:
+                self._migrate_licitacoes(cursor)
+            
+            # View com as colunas e a ordem da tabela original (compatível com as consultas existentes)
+            self._create_view(cursor, 'licitacoes', self._licitacoes_view_sql())
+            
+            # Catálogo de descrições de itens: forma normalizada (grupo = representante após o agrupamento)
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS itens_licitacao (
+                CREATE TABLE IF NOT EXISTS catalogo_itens (
+                    id INTEGER PRIMARY KEY,
+                    descricao_normalizada TEXT NOT NULL UNIQUE,
+                    grupo INTEGER REFERENCES catalogo_itens (id)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalogo_itens_grupo ON catalogo_itens (grupo)')
+            
+            # Textos originais das descrições, cada um guardado uma vez e ligado ao catálogo
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS descricoes_itens (
+                    id INTEGER PRIMARY KEY,
+                    texto TEXT NOT NULL UNIQUE,
+                    id_catalogo INTEGER REFERENCES catalogo_itens (id)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_descricoes_itens_catalogo ON descricoes_itens (id_catalogo)')
+            
+            # Tabela de itens da licitação (a view itens_licitacao mostra a descrição como texto)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS itens_dados (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     id_licitacao INTEGER,
-                    descricao TEXT,
+                    descricao_id INTEGER REFERENCES descricoes_itens (id),
                     quantidade TEXT,
                     valor_unitario_estimado TEXT,
                     valor_total_estimado TEXT,
                     data_captura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (id_licitacao) REFERENCES licitacoes (id)
+                    preco_unitario REAL,
+                    quantidade_num REAL,
+                    FOREIGN KEY (id_licitacao) REFERENCES licitacoes_dados (id)
                 )
             ''')
             
+            # Valores numéricos para as análises de preço (bancos antigos são preenchidos a partir do texto)
+            if self._add_missing_columns(cursor, 'itens_dados', {'preco_unitario': 'REAL', 'quantidade_num': 'REAL'}):
+                cursor.execute(f'''
+                    UPDATE itens_dados SET
+                        preco_unitario = {self._numeric_sql('valor_unitario_estimado')},
+                        quantidade_num = {self._numeric_sql('quantidade')}
+                ''')
+            
+            # Bancos anteriores ao catálogo têm itens_licitacao como tabela com a descrição em texto
+            cursor.execute("SELECT type FROM sqlite_master WHERE name = 'itens_licitacao'")
+            row = cursor.fetchone()
+            if row is not None and row[0] == 'table':
+                self._migrate_itens(cursor)
+                migrated = True
+            
+            self._create_view(cursor, 'itens_licitacao', self._itens_view_sql())
+            
             # Tabela de editais
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS editais ({self.EDITAIS_SCHEMA})')
+            
+            # Bancos criados antes do download de editais não têm essas colunas
+            self._add_missing_columns(cursor, 'editais', {
+                'sha256': 'TEXT',
+                'tamanho_bytes': 'INTEGER',
+                'caminho_local': 'TEXT',
+                'data_download': 'TIMESTAMP'
+            })
+            
+            # Bancos migrados para licitacoes_dados ainda têm a chave estrangeira apontando para a view
+            cursor.execute('PRAGMA foreign_key_list(editais)')
+            if any(row[2] == 'licitacoes' for row in cursor.fetchall()):
+                self._rebuild_editais(cursor)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_editais_url ON editais (url_edital)')
+            
+            # Índices da paginação por (data_captura, id) e das consultas por licitação
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_licitacoes_captura ON licitacoes_dados (data_captura, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_licitacoes_orgao ON licitacoes_dados (orgao_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_licitacoes_modalidade ON licitacoes_dados (modalidade_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_licitacoes_url ON licitacoes_dados (url)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_itens_licitacao ON itens_dados (id_licitacao, data_captura, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_itens_captura ON itens_dados (data_captura, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_itens_descricao ON itens_dados (descricao_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_editais_licitacao ON editais (id_licitacao, data_captura, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_editais_captura ON editais (data_captura, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_editais_sha256 ON editais (sha256)')
+            
+            # Índice das capturas de páginas arquivadas (conteúdo em PAGE_ARCHIVE_DIR)
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS editais (
+                CREATE TABLE IF NOT EXISTS paginas_arquivadas (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    id_licitacao INTEGER,
-                    url_edital TEXT,
-                    data_captura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (id_licitacao) REFERENCES licitacoes (id)
+                    id_contratacao_pncp TEXT,
+                    url TEXT,
+                    sha256 TEXT,
+                    data_captura TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_paginas_arquivadas_pncp
+                ON paginas_arquivadas (id_contratacao_pncp, id)
+            ''')
+            
+            # Revalidação das licitações abertas: marcador "Última atualização" da página de detalhe
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS revalidacoes (
+                    id_licitacao INTEGER PRIMARY KEY,
+                    ultima_atualizacao TEXT,
+                    data_verificacao TIMESTAMP,
+                    data_alteracao TIMESTAMP,
+                    FOREIGN KEY (id_licitacao) REFERENCES licitacoes_dados (id)
+                )
+            ''')
+            
+            # Itens já gravados das licitações em processamento (retomada após uma falha no meio dos itens)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS itens_progresso (
+                    id_licitacao INTEGER PRIMARY KEY,
+                    itens INTEGER NOT NULL DEFAULT 0,
+                    data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (id_licitacao) REFERENCES licitacoes_dados (id)
+                )
+            ''')
+            
+            # Texto extraído dos editais baixados (controle incremental por hash)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS editais_texto (
+                    sha256 TEXT PRIMARY KEY,
+                    status TEXT,
+                    paginas INTEGER,
+                    blocos INTEGER,
+                    data_extracao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS editais_fts USING fts5(
+                    texto, sha256 UNINDEXED, pagina UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2'
                 )
             ''')
             
+            # Busca textual no objeto das licitações (índice externo mantido por triggers)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'licitacoes_fts'")
+            rebuild_fts = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS licitacoes_fts USING fts5(
+                    objeto, content = 'licitacoes', content_rowid = 'id',
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            ''')
+            self._create_licitacoes_fts_triggers(cursor)
+            if rebuild_fts:
+                cursor.execute("INSERT INTO licitacoes_fts (licitacoes_fts) VALUES ('rebuild')")
+            
+            # Estatísticas materializadas (totais e por órgão/modalidade/dia), mantidas por triggers
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'estatisticas_totais'")
+            rebuild_stats = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS estatisticas_totais (
+                    tabela TEXT PRIMARY KEY,
+                    total INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS estatisticas_grupos (
+                    dimensao TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    licitacoes INTEGER NOT NULL DEFAULT 0,
+                    itens INTEGER NOT NULL DEFAULT 0,
+                    valor_estimado REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (dimensao, chave)
+                )
+            ''')
+            self._create_estatisticas_triggers(cursor)
+            if rebuild_stats:
+                self._rebuild_estatisticas(cursor)
+            
+            # Versão dos dados: muda a cada escrita, usada como chave dos caches de análises
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS versao_dados (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    versao INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('INSERT OR IGNORE INTO versao_dados (id, versao) VALUES (1, 0)')
+            self._create_versao_triggers(cursor)
+            
             conn.commit()
+            if converter_vacuum and not migrated:
+                print("Convertendo o banco para auto_vacuum incremental (só na primeira vez)...")
+                cursor.execute('VACUUM')
+            if migrated:
+                # Devolve ao disco o espaço dos textos que passaram para as dimensões e o catálogo
+                conn.execute('VACUUM')
             conn.close()
             print("Tabelas criadas com sucesso!")
     
-    def insert_licitacao(self, licitacao_data):
-        """Insere uma licitação no banco de forma thread-safe"""
-        with self._lock:
+    @classmethod
+    def _licitacoes_view_sql(cls, schema=None):
+        """
+        SELECT da view licitacoes: colunas da tabela original, com os nomes das dimensões.
+        
+        schema: banco de arquivo anexado (objeto comprimido; dimensões lidas do banco ativo)
+        """
+        columns = ['l.id'] + [
+            f'{campo}_d.nome AS {campo}' if campo in cls.DIMENSIONS
+            else 'descomprimir(l.objeto) AS objeto' if schema and campo == 'objeto'
+            else f'l.{campo}'
+            for campo in cls.LICITACAO_FIELDS
+        ] + ['l.data_captura']
+        main = 'main.' if schema else ''
+        joins = ' '.join(f'LEFT JOIN {main}{tabela} {campo}_d ON {campo}_d.id = l.{campo}_id'
+                         for campo, tabela in cls.DIMENSIONS.items())
+        dados = f'{schema}.licitacoes_dados' if schema else 'licitacoes_dados'
+        return f'SELECT {", ".join(columns)} FROM {dados} l {joins}'
+    
+    @staticmethod
+    def _itens_view_sql(schema=None):
+        """SELECT da view itens_licitacao (schema: banco de arquivo anexado)"""
+        dados = f'{schema}.itens_dados' if schema else 'itens_dados'
+        descricoes = 'main.descricoes_itens' if schema else 'descricoes_itens'
+        return f'''
+                SELECT i.id, i.id_licitacao, d.texto AS descricao, i.quantidade,
+                       i.valor_unitario_estimado, i.valor_total_estimado, i.data_captura, d.id_catalogo,
+                       i.preco_unitario, i.quantidade_num
+                FROM {dados} i LEFT JOIN {descricoes} d ON d.id = i.descricao_id
+            '''
+    
+    def _migrate_licitacoes(self, cursor):
+        """Move a tabela licitacoes antiga para licitacoes_dados, preenchendo as dimensões"""
+        print("Migrando licitações para as tabelas de dimensão...")
+        
+        self._drop_estatisticas_triggers(cursor)
+        
+        for campo, tabela in self.DIMENSIONS.items():
+            cursor.execute(f'INSERT OR IGNORE INTO {tabela} (nome) SELECT DISTINCT {campo} FROM licitacoes WHERE {campo} IS NOT NULL')
+        
+        select = [
+            f'(SELECT d.id FROM {self.DIMENSIONS[campo]} d WHERE d.nome = l.{campo})' if campo in self.DIMENSIONS else f'l.{campo}'
+            for campo in self.LICITACAO_FIELDS
+        ]
+        cursor.execute(f'''
+            INSERT INTO licitacoes_dados (id, {", ".join(self.LICITACAO_COLUMNS)}, data_captura)
+            SELECT l.id, {", ".join(select)}, l.data_captura FROM licitacoes l
+        ''')
+        
+        self._move_sequence(cursor, 'licitacoes', 'licitacoes_dados')
+        cursor.execute('DROP TABLE licitacoes')
+    
+    def _migrate_itens(self, cursor):
+        """Move a tabela itens_licitacao antiga para itens_dados, preenchendo o catálogo de descrições"""
+        print("Migrando itens para o catálogo de descrições...")
+        self._drop_estatisticas_triggers(cursor)
+        
+        cursor.execute('SELECT DISTINCT descricao FROM itens_licitacao WHERE descricao IS NOT NULL')
+        for (texto,) in cursor.fetchall():
+            self._descricao_id(cursor, texto)
+        
+        cursor.execute(f'''
+            INSERT INTO itens_dados (
+                id, id_licitacao, descricao_id, quantidade,
+                valor_unitario_estimado, valor_total_estimado, data_captura,
+                preco_unitario, quantidade_num
+            )
+            SELECT i.id, i.id_licitacao, d.id, i.quantidade,
+                   i.valor_unitario_estimado, i.valor_total_estimado, i.data_captura,
+                   {self._numeric_sql('i.valor_unitario_estimado')}, {self._numeric_sql('i.quantidade')}
+            FROM itens_licitacao i LEFT JOIN descricoes_itens d ON d.texto = i.descricao
+        ''')
+        
+        self._move_sequence(cursor, 'itens_licitacao', 'itens_dados')
+        cursor.execute('DROP TABLE itens_licitacao')
+    
+    @staticmethod
+    def _create_view(cursor, name, select):
+        """Cria a view, recriando-a se a definição mudou (views não têm ALTER)"""
+        sql = f'CREATE VIEW {name} AS {select}'
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (name,))
+        row = cursor.fetchone()
+        if row and ' '.join(row[0].split()) == ' '.join(sql.split()):
+            return
+        cursor.execute(f'DROP VIEW IF EXISTS {name}')
+        cursor.execute(sql)
+    
+    @staticmethod
+    def _numeric_sql(column):
+        """Expressão SQL que converte a coluna de texto em número (NULL se zero ou inválida), como parse_valor"""
+        return f'NULLIF({VALOR_SQL.format(valor=column)}, 0)'
+    
+    @staticmethod
+    def _create_versao_triggers(cursor, tables=('licitacoes_dados', 'itens_dados', 'catalogo_itens', 'editais',
+                                                'editais_texto')):
+        """Cria os triggers que incrementam versao_dados a cada escrita nas tabelas lidas pelos caches"""
+        for table in tables:
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS versao_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                        UPDATE versao_dados SET versao = versao + 1 WHERE id = 1;
+                    END
+                ''')
+    
+    @staticmethod
+    def _drop_estatisticas_triggers(cursor):
+        """Remove os triggers de estatísticas antes de uma migração (são recriados sobre as novas tabelas)"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'estatisticas_%'")
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER {name}')
+    
+    def _rebuild_editais(self, cursor):
+        """Recria editais com a chave estrangeira em licitacoes_dados, preservando ids e downloads"""
+        columns = 'id, id_licitacao, url_edital, sha256, tamanho_bytes, caminho_local, data_download, data_captura'
+        cursor.execute(f'CREATE TABLE editais_nova ({self.EDITAIS_SCHEMA})')
+        cursor.execute(f'INSERT INTO editais_nova ({columns}) SELECT {columns} FROM editais')
+        self._move_sequence(cursor, 'editais', 'editais_nova')
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'editais'")
+        cursor.execute('DROP TABLE editais')
+        cursor.execute('ALTER TABLE editais_nova RENAME TO editais')
+    
+    @staticmethod
+    def _move_sequence(cursor, old, new):
+        """Preserva o contador do AUTOINCREMENT na migração (ids apagados não voltam a ser usados)"""
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (old,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (new,))
+            cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (new, row[0]))
+    
+    def _dimension_id(self, cursor, coluna, nome):
+        """Retorna a chave inteira de um valor de dimensão, criando-a se preciso (com cache em memória)"""
+        if nome is None:
+            return None
+        cache = self._dimension_ids[coluna]
+        dimension_id = cache.get(nome)
+        if dimension_id is None:
+            tabela = self.DIMENSIONS[coluna]
+            cursor.execute(f'INSERT OR IGNORE INTO {tabela} (nome) VALUES (?)', (nome,))
+            cursor.execute(f'SELECT id FROM {tabela} WHERE nome = ?', (nome,))
+            dimension_id = cursor.fetchone()[0]
+            cache[nome] = dimension_id
+        return dimension_id
+    
+    def _licitacao_values(self, cursor, licitacao_data):
+        """Valores das colunas LICITACAO_COLUMNS, com as dimensões já convertidas em chaves"""
+        return [
+            self._dimension_id(cursor, campo, licitacao_data.get(campo)) if campo in self.DIMENSIONS
+            else licitacao_data.get(campo)
+            for campo in self.LICITACAO_FIELDS
+        ]
+    
+    def _descricao_id(self, cursor, texto):
+        """Retorna a chave do texto de descrição de um item, criando-a (e a entrada do catálogo) se preciso"""
+        if texto is None:
+            return None
+        cache = self._descricao_ids
+        descricao_id = cache.get(texto)
+        if descricao_id is not None:
+            cache.move_to_end(texto)
+            return descricao_id
+        
+        cursor.execute('SELECT id FROM descricoes_itens WHERE texto = ?', (texto,))
+        row = cursor.fetchone()
+        if row:
+            descricao_id = row[0]
+        else:
+            normalizada = normalize_descricao(texto)
+            cursor.execute('INSERT OR IGNORE INTO catalogo_itens (descricao_normalizada) VALUES (?)', (normalizada,))
+            cursor.execute('SELECT id FROM catalogo_itens WHERE descricao_normalizada = ?', (normalizada,))
+            id_catalogo = cursor.fetchone()[0]
+            cursor.execute('INSERT INTO descricoes_itens (texto, id_catalogo) VALUES (?, ?)', (texto, id_catalogo))
+            descricao_id = cursor.lastrowid
+        
+        cache[texto] = descricao_id
+        if len(cache) > self.DESCRICAO_CACHE_SIZE:
+            cache.popitem(last=False)
+        return descricao_id
+    
+    def _item_values(self, cursor, licitacao_id, itens):
+        """Linhas de itens_dados para os itens, com a descrição convertida em chave"""
+        return [
+            (licitacao_id, self._descricao_id(cursor, item.descricao), item.quantidade,
+             item.valor_unitario_estimado, item.valor_total_estimado,
+             parse_valor(item.valor_unitario_estimado), parse_valor(item.quantidade))
+            for item in itens
+        ]
+    
+    def _reset_intern_caches(self):
+        """Esvazia os caches de chaves (chamado após rollback: as chaves novas foram descartadas)"""
+        for cache in self._dimension_ids.values():
+            cache.clear()
+        self._descricao_ids.clear()
+    
+    @staticmethod
+    def _create_licitacoes_fts_triggers(cursor, table='licitacoes_dados'):
+        """Cria os triggers que mantêm licitacoes_fts sincronizado com o objeto das licitações"""
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS licitacoes_fts_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO licitacoes_fts (rowid, objeto) VALUES (new.id, new.objeto);
+            END;
+            CREATE TRIGGER IF NOT EXISTS licitacoes_fts_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO licitacoes_fts (licitacoes_fts, rowid, objeto) VALUES ('delete', old.id, old.objeto);
+            END;
+            CREATE TRIGGER IF NOT EXISTS licitacoes_fts_au AFTER UPDATE OF objeto ON {table} BEGIN
+                INSERT INTO licitacoes_fts (licitacoes_fts, rowid, objeto) VALUES ('delete', old.id, old.objeto);
+                INSERT INTO licitacoes_fts (rowid, objeto) VALUES (new.id, new.objeto);
+            END;
+        ''')
+    
+    @classmethod
+    def _stats_upserts(cls, select):
+        """Comandos que somam em estatisticas_grupos a contribuição de select(dimensao, chave), por dimensão"""
+        return ''.join(f'''
+                INSERT INTO estatisticas_grupos (dimensao, chave, licitacoes, itens, valor_estimado)
+                {select(dimensao, chave)}
+                ON CONFLICT (dimensao, chave) DO UPDATE SET
+                    licitacoes = licitacoes + excluded.licitacoes,
+                    itens = itens + excluded.itens,
+                    valor_estimado = valor_estimado + excluded.valor_estimado;'''
+            for dimensao, chave in cls.STATS_DIMENSIONS.items())
+    
+    @classmethod
+    def _create_estatisticas_triggers(cls, cursor, licitacoes='licitacoes_dados', itens='itens_dados', editais='editais'):
+        """Cria os triggers que mantêm estatisticas_totais e estatisticas_grupos a cada escrita"""
+        for tabela in ('licitacoes', 'itens_licitacao', 'editais'):
+            cursor.execute('INSERT OR IGNORE INTO estatisticas_totais (tabela, total) VALUES (?, 0)', (tabela,))
+        
+        # Licitação inteira: ela mesma mais os itens já gravados (sign=1 soma, sign=-1 subtrai)
+        def licitacao(sign, row):
+            valor = VALOR_SQL.format(valor='i.valor_total_estimado')
+            return cls._stats_upserts(lambda dimensao, chave: f'''
+                SELECT '{dimensao}', {chave.format(row=row)}, {sign}, {sign} * COUNT(i.id),
+                       {sign} * COALESCE(SUM({valor}), 0)
+                FROM {itens} i WHERE i.id_licitacao = {row}.id''')
+        
+        # Um item, no grupo da licitação a que pertence
+        def item(sign, row):
+            valor = VALOR_SQL.format(valor=f'{row}.valor_total_estimado')
+            return cls._stats_upserts(lambda dimensao, chave: f'''
+                SELECT '{dimensao}', {chave.format(row='l')}, 0, {sign}, {sign} * COALESCE({valor}, 0)
+                FROM {licitacoes} l WHERE l.id = {row}.id_licitacao''')
+        
+        cleanup = 'DELETE FROM estatisticas_grupos WHERE licitacoes <= 0 AND itens <= 0;'
+        
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS estatisticas_licitacoes_ai AFTER INSERT ON {licitacoes} BEGIN
+                UPDATE estatisticas_totais SET total = total + 1 WHERE tabela = 'licitacoes';
+                {licitacao(1, 'new')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_licitacoes_ad AFTER DELETE ON {licitacoes} BEGIN
+                UPDATE estatisticas_totais SET total = total - 1 WHERE tabela = 'licitacoes';
+                {licitacao(-1, 'old')}
+                {cleanup}
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_licitacoes_au
+            AFTER UPDATE OF id, orgao_id, modalidade_id, data_captura ON {licitacoes} BEGIN
+                {licitacao(-1, 'old')}
+                {licitacao(1, 'new')}
+                {cleanup}
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_itens_ai AFTER INSERT ON {itens} BEGIN
+                UPDATE estatisticas_totais SET total = total + 1 WHERE tabela = 'itens_licitacao';
+                {item(1, 'new')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_itens_ad AFTER DELETE ON {itens} BEGIN
+                UPDATE estatisticas_totais SET total = total - 1 WHERE tabela = 'itens_licitacao';
+                {item(-1, 'old')}
+                {cleanup}
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_itens_au
+            AFTER UPDATE OF id_licitacao, valor_total_estimado ON {itens} BEGIN
+                {item(-1, 'old')}
+                {item(1, 'new')}
+                {cleanup}
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_editais_ai AFTER INSERT ON {editais} BEGIN
+                UPDATE estatisticas_totais SET total = total + 1 WHERE tabela = 'editais';
+            END;
+            CREATE TRIGGER IF NOT EXISTS estatisticas_editais_ad AFTER DELETE ON {editais} BEGIN
+                UPDATE estatisticas_totais SET total = total - 1 WHERE tabela = 'editais';
+            END;
+        ''')
+    
+    @classmethod
+    def _rebuild_estatisticas(cls, cursor, licitacoes='licitacoes_dados', itens='itens_dados', editais='editais'):
+        """Recalcula as estatísticas materializadas a partir das tabelas (bancos antigos ou correção)"""
+        cursor.execute('DELETE FROM estatisticas_totais')
+        for tabela, origem in (('licitacoes', licitacoes), ('itens_licitacao', itens), ('editais', editais)):
+            cursor.execute(f'INSERT INTO estatisticas_totais (tabela, total) SELECT ?, COUNT(*) FROM {origem}', (tabela,))
+        
+        cursor.execute('DELETE FROM estatisticas_grupos')
+        valor = VALOR_SQL.format(valor='i.valor_total_estimado')
+        for dimensao, chave in cls.STATS_DIMENSIONS.items():
+            cursor.execute(f'''
+                INSERT INTO estatisticas_grupos (dimensao, chave, licitacoes, itens, valor_estimado)
+                SELECT ?, chave, COUNT(*), SUM(itens), SUM(valor)
+                FROM (
+                    SELECT {chave.format(row='l')} AS chave, COUNT(i.id) AS itens,
+                           COALESCE(SUM({valor}), 0) AS valor
+                    FROM {licitacoes} l LEFT JOIN {itens} i ON i.id_licitacao = l.id
+                    GROUP BY l.id
+                )
+                GROUP BY chave
+            ''', (dimensao,))
+    
+    def rebuild_estatisticas(self):
+        """Recalcula as estatísticas materializadas de forma thread-safe"""
+        with self._write_lock:
             conn = self.get_connection()
+            try:
+                cursor = conn.cursor()
+                self._rebuild_estatisticas(cursor)
+                # As estatísticas não têm triggers de versão: invalida os resultados já em cache
+                cursor.execute('UPDATE versao_dados SET versao = versao + 1 WHERE id = 1')
+                conn.commit()
+            except Exception as e:
+                print(f"Erro ao recalcular estatísticas: {e}")
+                conn.rollback()
+            finally:
+                conn.close()
+    
+    def get_licitacoes_para_arquivar(self, dias, situacoes_encerradas=(), limit=None):
+        """
+        Licitações encerradas para mover aos bancos de arquivo: [(id, ano)].
+        
+        Entram as com prazo de propostas vencido há mais de `dias` dias e as em situação encerrada
+        capturadas há mais de `dias` dias.
+        """
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        fim = self.FIM_PROPOSTAS_SQL
+        encerradas = ', '.join('?' for _ in situacoes_encerradas) or "''"
+        query = f'''
+            SELECT l.id, {self.ANO_SQL}
+            FROM licitacoes_dados l
+            WHERE {fim} < datetime('now', 'localtime', ?)
+               OR (COALESCE(l.situacao, '') IN ({encerradas}) AND l.data_captura < datetime('now', ?))
+            ORDER BY l.id
+        '''
+        if limit:
+            query += f' LIMIT {int(limit)}'
+        cursor.execute(query, (f'-{int(dias)} days', *situacoes_encerradas, f'-{int(dias)} days'))
+        results = cursor.fetchall()
+        
+        return results
+    
+    def _create_archive_tables(self, cursor, schema):
+        """Cria no banco de arquivo as tabelas com a mesma definição das do banco ativo"""
+        for table in self.ARCHIVE_TABLES:
+            cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            ddl = re.sub(r'^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?"?\w+"?',
+                         f'CREATE TABLE IF NOT EXISTS {schema}.{table}', cursor.fetchone()[0])
+            cursor.execute(ddl)
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_itens_licitacao ON itens_dados (id_licitacao)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_editais_licitacao ON editais (id_licitacao)')
+    
+    def arquivar_licitacoes(self, ano, ids, compress_min_bytes=0):
+        """
+        Move licitações, itens e editais para o banco de arquivo do ano (objeto comprimido com zlib).
+        
+        A cópia e a remoção do banco ativo são transações separadas e a cópia é idempotente:
+        se o processo parar no meio, basta executar de novo. Retorna o número de licitações movidas.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f'licitacoes_{ano}.db')
+        schema = 'arquivo'
+        
+        with self._write_lock:
+            conn = self.get_connection()
+            conn.create_function('comprimir', 1, lambda texto: comprimir_texto(texto, compress_min_bytes))
             cursor = conn.cursor()
             
             try:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO licitacoes (
-                        id_contratacao_pncp, url, local, orgao, unidade_compradora,
-                        modalidade, amparo_legal, tipo, modo_disputa, registro_preco,
-                        fonte_orcamentaria, data_divulgacao, situacao, data_inicio_propostas,
-                        data_fim_propostas, fonte, objeto
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    licitacao_data.get('id_contratacao_pncp'),
-                    licitacao_data.get('url'),
-                    licitacao_data.get('local'),
-                    licitacao_data.get('orgao'),
-                    licitacao_data.get('unidade_compradora'),
-                    licitacao_data.get('modalidade'),
-                    licitacao_data.get('amparo_legal'),
-                    licitacao_data.get('tipo'),
-                    licitacao_data.get('modo_disputa'),
-                    licitacao_data.get('registro_preco'),
-                    licitacao_data.get('fonte_orcamentaria'),
-                    licitacao_data.get('data_divulgacao'),
-                    licitacao_data.get('situacao'),
-                    licitacao_data.get('data_inicio_propostas'),
-                    licitacao_data.get('data_fim_propostas'),
-                    licitacao_data.get('fonte'),
-                    licitacao_data.get('objeto')
-                ))
+                cursor.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+                cursor.execute(f'PRAGMA {schema}.auto_vacuum = INCREMENTAL')
+                self._create_archive_tables(cursor, schema)
+                cursor.execute('CREATE TEMP TABLE IF NOT EXISTS arquivar_ids (id INTEGER PRIMARY KEY)')
+                cursor.execute('DELETE FROM temp.arquivar_ids')
+                cursor.executemany('INSERT OR IGNORE INTO temp.arquivar_ids (id) VALUES (?)', [(i,) for i in ids])
+                
+                # Versão anterior da mesma licitação já arquivada (com outro id): sai do arquivo
+                antigas = f'''
+                    SELECT a.id FROM {schema}.licitacoes_dados a
+                    JOIN main.licitacoes_dados l ON l.id_contratacao_pncp = a.id_contratacao_pncp
+                    WHERE l.id IN (SELECT id FROM temp.arquivar_ids) AND a.id != l.id
+                '''
+                cursor.execute(f'DELETE FROM {schema}.itens_dados WHERE id_licitacao IN ({antigas})')
+                cursor.execute(f'DELETE FROM {schema}.editais WHERE id_licitacao IN ({antigas})')
+                
+                cursor.execute('PRAGMA main.table_info(licitacoes_dados)')
+                columns = [row[1] for row in cursor.fetchall()]
+                select = ', '.join('comprimir(objeto)' if column == 'objeto' else column for column in columns)
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO {schema}.licitacoes_dados ({", ".join(columns)})
+                    SELECT {select} FROM main.licitacoes_dados WHERE id IN (SELECT id FROM temp.arquivar_ids)
+                ''')
+                for table in ('itens_dados', 'editais'):
+                    cursor.execute(f'PRAGMA main.table_info({table})')
+                    columns = ', '.join(row[1] for row in cursor.fetchall())
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO {schema}.{table} ({columns})
+                        SELECT {columns} FROM main.{table} WHERE id_licitacao IN (SELECT id FROM temp.arquivar_ids)
+                    ''')
+                conn.commit()
+                
+                # Remoção do banco ativo (os triggers atualizam estatísticas, busca textual e versão)
+                for table in ('itens_dados', 'editais', 'revalidacoes', 'itens_progresso'):
+                    cursor.execute(f'DELETE FROM main.{table} WHERE id_licitacao IN (SELECT id FROM temp.arquivar_ids)')
+                cursor.execute('DELETE FROM main.licitacoes_dados WHERE id IN (SELECT id FROM temp.arquivar_ids)')
+                moved = cursor.rowcount
+                conn.commit()
+                return moved
+                
+            except Exception as e:
+                print(f"Erro ao arquivar licitações de {ano}: {e}")
+                conn.rollback()
+                return 0
+            finally:
+                conn.close()
+    
+    def incremental_vacuum(self, max_pages=None):
+        """Devolve ao disco até max_pages páginas livres do banco ativo (todas se None); retorna as liberadas"""
+        with self._write_lock:
+            conn = self.get_connection()
+            try:
+                before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                conn.execute(f'PRAGMA incremental_vacuum({int(max_pages) if max_pages else 0})').fetchall()
+                conn.commit()
+                freed = before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+                # As páginas só saem do arquivo quando o WAL é copiado de volta para o banco
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+                return freed
+            finally:
+                conn.close()
+    
+    @staticmethod
+    def _add_missing_columns(cursor, table, columns):
+        """Adiciona à tabela as colunas que ainda não existem (migração de bancos antigos) e retorna as adicionadas"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        added = []
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+                added.append(name)
+        return added
+    
+    def insert_licitacao(self, licitacao_data, em_progresso=False):
+        """
+        Insere uma licitação no banco de forma thread-safe.
+        
+        em_progresso: marca os itens como pendentes na mesma transação (retomáveis até finish_licitacao)
+        """
+        with self._write_lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            try:
+                values = self._licitacao_values(cursor, licitacao_data)
+                placeholders = ', '.join('?' for _ in self.LICITACAO_COLUMNS)
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO licitacoes_dados ({", ".join(self.LICITACAO_COLUMNS)})
+                    VALUES ({placeholders})
+                ''', values)
                 
                 licitacao_id = cursor.lastrowid
+                if em_progresso:
+                    cursor.execute('INSERT OR REPLACE INTO itens_progresso (id_licitacao, itens) VALUES (?, 0)',
+                                   (licitacao_id,))
                 conn.commit()
                 print(f"Licitação inserida com ID: {licitacao_id}")
                 return licitacao_id
@@ -135,30 +1075,25 @@ class DatabaseManager:
             except Exception as e:
                 print(f"Erro ao inserir licitação: {e}")
                 conn.rollback()
+                self._reset_intern_caches()
                 return None
             finally:
                 conn.close()
     
     def insert_itens(self, licitacao_id, itens):
         """Insere itens de uma licitação de forma thread-safe"""
-        with self._lock:
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
             try:
-                for item in itens:
-                    cursor.execute('''
-                        INSERT INTO itens_licitacao (
-                            id_licitacao, descricao, quantidade, 
-                            valor_unitario_estimado, valor_total_estimado
-                        ) VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        licitacao_id,
-                        item.get('descricao'),
-                        item.get('quantidade'),
-                        item.get('valor_unitario_estimado'),
-                        item.get('valor_total_estimado')
-                    ))
+                cursor.executemany('''
+                    INSERT INTO itens_dados (
+                        id_licitacao, descricao_id, quantidade,
+                        valor_unitario_estimado, valor_total_estimado,
+                        preco_unitario, quantidade_num
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', self._item_values(cursor, licitacao_id, itens))
                 
                 conn.commit()
                 print(f"{len(itens)} itens inseridos para a licitação {licitacao_id}")
@@ -166,12 +1101,80 @@ class DatabaseManager:
             except Exception as e:
                 print(f"Erro ao inserir itens: {e}")
                 conn.rollback()
+                self._reset_intern_caches()
+            finally:
+                conn.close()
+    
+    def insert_itens_parcial(self, licitacao_id, itens, total_gravados):
+        """Grava um lote de itens e o total já gravado da licitação na mesma transação; retorna True se gravou"""
+        with self._write_lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            try:
+                cursor.executemany('''
+                    INSERT INTO itens_dados (
+                        id_licitacao, descricao_id, quantidade,
+                        valor_unitario_estimado, valor_total_estimado,
+                        preco_unitario, quantidade_num
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', self._item_values(cursor, licitacao_id, itens))
+                cursor.execute('''
+                    INSERT INTO itens_progresso (id_licitacao, itens, data_atualizacao)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(id_licitacao) DO UPDATE SET
+                        itens = excluded.itens,
+                        data_atualizacao = excluded.data_atualizacao
+                ''', (licitacao_id, total_gravados))
+                
+                conn.commit()
+                return True
+                
+            except Exception as e:
+                print(f"Erro ao inserir lote de itens: {e}")
+                conn.rollback()
+                self._reset_intern_caches()
+                return False
+            finally:
+                conn.close()
+    
+    def get_progresso_itens(self, pncp_id):
+        """Retorna (id da licitação, itens já gravados) se a licitação ficou com os itens incompletos, senão None"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT p.id_licitacao, p.itens FROM itens_progresso p
+            JOIN licitacoes_dados l ON l.id = p.id_licitacao
+            WHERE l.id_contratacao_pncp = ?
+        ''', (pncp_id,))
+        result = cursor.fetchone()
+        
+        return result
+    
+    def finish_licitacao(self, licitacao_id, editais):
+        """Insere os editais e marca os itens da licitação como completos, na mesma transação"""
+        with self._write_lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            try:
+                cursor.executemany('INSERT INTO editais (id_licitacao, url_edital) VALUES (?, ?)',
+                                   [(licitacao_id, edital.get('edital')) for edital in editais])
+                cursor.execute('DELETE FROM itens_progresso WHERE id_licitacao = ?', (licitacao_id,))
+                conn.commit()
+                return True
+                
+            except Exception as e:
+                print(f"Erro ao concluir licitação: {e}")
+                conn.rollback()
+                return False
             finally:
                 conn.close()
     
     def insert_editais(self, licitacao_id, editais):
         """Insere editais de uma licitação de forma thread-safe"""
-        with self._lock:
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -191,79 +1194,546 @@ class DatabaseManager:
             finally:
                 conn.close()
     
-    def get_licitacao_by_pncp_id(self, pncp_id):
-        """Busca uma licitação pelo ID do PNCP de forma thread-safe"""
-        with self._lock:
+    def insert_pagina_arquivada(self, pncp_id, url, sha256):
+        """Registra uma captura de página arquivada de forma thread-safe"""
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT * FROM licitacoes WHERE id_contratacao_pncp = ?', (pncp_id,))
-            result = cursor.fetchone()
-            
-            conn.close()
-            return result
+            try:
+                cursor.execute('''
+                    INSERT INTO paginas_arquivadas (id_contratacao_pncp, url, sha256)
+                    VALUES (?, ?, ?)
+                ''', (pncp_id, url, sha256))
+                conn.commit()
+                
+            except Exception as e:
+                print(f"Erro ao registrar página arquivada: {e}")
+                conn.rollback()
+            finally:
+                conn.close()
     
-    def get_all_licitacoes(self):
-        """Retorna todas as licitações de forma thread-safe"""
-        with self._lock:
+    def replace_licitacao(self, licitacao_data, itens, editais):
+        """Substitui uma licitação, seus itens e editais em uma única transação (usado no re-processamento)"""
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT * FROM licitacoes ORDER BY data_captura DESC')
-            results = cursor.fetchall()
-            
-            conn.close()
-            return results
+            try:
+                values = self._licitacao_values(cursor, licitacao_data)
+                cursor.execute('SELECT id FROM licitacoes_dados WHERE id_contratacao_pncp = ?',
+                               (licitacao_data.get('id_contratacao_pncp'),))
+                row = cursor.fetchone()
+                
+                if row:
+                    # Mantém o id para não quebrar as referências existentes
+                    licitacao_id = row[0]
+                    assignments = ', '.join(f'{coluna} = ?' for coluna in self.LICITACAO_COLUMNS)
+                    cursor.execute(f'UPDATE licitacoes_dados SET {assignments} WHERE id = ?', values + [licitacao_id])
+                    cursor.execute('DELETE FROM itens_dados WHERE id_licitacao = ?', (licitacao_id,))
+                    cursor.execute('DELETE FROM editais WHERE id_licitacao = ?', (licitacao_id,))
+                else:
+                    placeholders = ', '.join('?' for _ in self.LICITACAO_COLUMNS)
+                    cursor.execute(f'INSERT INTO licitacoes_dados ({", ".join(self.LICITACAO_COLUMNS)}) VALUES ({placeholders})', values)
+                    licitacao_id = cursor.lastrowid
+                
+                cursor.executemany('''
+                    INSERT INTO itens_dados (
+                        id_licitacao, descricao_id, quantidade,
+                        valor_unitario_estimado, valor_total_estimado,
+                        preco_unitario, quantidade_num
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', self._item_values(cursor, licitacao_id, itens))
+                cursor.executemany('INSERT INTO editais (id_licitacao, url_edital) VALUES (?, ?)',
+                                   [(licitacao_id, edital.get('edital')) for edital in editais])
+                
+                conn.commit()
+                return licitacao_id
+                
+            except Exception as e:
+                print(f"Erro ao substituir licitação: {e}")
+                conn.rollback()
+                self._reset_intern_caches()
+                return None
+            finally:
+                conn.close()
     
-    def get_itens_by_licitacao(self, licitacao_id):
-        """Retorna todos os itens de uma licitação de forma thread-safe"""
-        with self._lock:
+    def refresh_licitacao(self, licitacao_id, ultima_atualizacao, licitacao_data=None, itens=None, editais=None):
+        """
+        Registra a revalidação de uma licitação e grava só as seções que mudaram (as demais ficam None).
+        
+        Editais que continuam na página mantêm o registro de download.
+        """
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT * FROM itens_licitacao WHERE id_licitacao = ?', (licitacao_id,))
-            results = cursor.fetchall()
+            try:
+                if licitacao_data is not None:
+                    assignments = ', '.join(f'{coluna} = ?' for coluna in self.LICITACAO_COLUMNS)
+                    values = self._licitacao_values(cursor, licitacao_data)
+                    cursor.execute(f'UPDATE licitacoes_dados SET {assignments} WHERE id = ?', values + [licitacao_id])
+                
+                if itens is not None:
+                    cursor.execute('DELETE FROM itens_dados WHERE id_licitacao = ?', (licitacao_id,))
+                    cursor.executemany('''
+                        INSERT INTO itens_dados (
+                            id_licitacao, descricao_id, quantidade,
+                            valor_unitario_estimado, valor_total_estimado,
+                            preco_unitario, quantidade_num
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', self._item_values(cursor, licitacao_id, itens))
+                
+                if editais is not None:
+                    cursor.execute('SELECT url_edital FROM editais WHERE id_licitacao = ?', (licitacao_id,))
+                    existentes = {row[0] for row in cursor.fetchall()}
+                    urls = [edital.get('edital') for edital in editais]
+                    cursor.executemany('DELETE FROM editais WHERE id_licitacao = ? AND url_edital = ?',
+                                       [(licitacao_id, url) for url in existentes - set(urls)])
+                    cursor.executemany('INSERT INTO editais (id_licitacao, url_edital) VALUES (?, ?)',
+                                       [(licitacao_id, url) for url in dict.fromkeys(urls) if url not in existentes])
+                
+                alterada = any(secao is not None for secao in (licitacao_data, itens, editais))
+                cursor.execute('''
+                    INSERT INTO revalidacoes (id_licitacao, ultima_atualizacao, data_verificacao, data_alteracao)
+                    VALUES (?, ?, CURRENT_TIMESTAMP, CASE WHEN ? THEN CURRENT_TIMESTAMP END)
+                    ON CONFLICT(id_licitacao) DO UPDATE SET
+                        ultima_atualizacao = excluded.ultima_atualizacao,
+                        data_verificacao = excluded.data_verificacao,
+                        data_alteracao = COALESCE(excluded.data_alteracao, revalidacoes.data_alteracao)
+                ''', (licitacao_id, ultima_atualizacao, alterada))
+                
+                conn.commit()
+                return True
+                
+            except Exception as e:
+                print(f"Erro ao atualizar licitação revalidada: {e}")
+                conn.rollback()
+                self._reset_intern_caches()
+                return False
+            finally:
+                conn.close()
+    
+    def update_edital_download(self, url_edital, sha256, tamanho_bytes, caminho_local):
+        """Registra o arquivo baixado em todos os editais com a mesma URL de forma thread-safe"""
+        with self._write_lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
             
-            conn.close()
-            return results
+            try:
+                cursor.execute('''
+                    UPDATE editais
+                    SET sha256 = ?, tamanho_bytes = ?, caminho_local = ?, data_download = CURRENT_TIMESTAMP
+                    WHERE url_edital = ?
+                ''', (sha256, tamanho_bytes, caminho_local, url_edital))
+                conn.commit()
+                
+            except Exception as e:
+                print(f"Erro ao registrar download do edital: {e}")
+                conn.rollback()
+            finally:
+                conn.close()
     
-    def get_editais_by_licitacao(self, licitacao_id):
-        """Retorna todos os editais de uma licitação de forma thread-safe"""
-        with self._lock:
+    def get_licitacoes_abertas(self, limit, min_idade_horas=0, situacoes_encerradas=()):
+        """
+        Licitações ainda recebendo propostas para revalidar: nunca verificadas primeiro, depois pelo prazo.
+        
+        Retorna (id, url, id_contratacao_pncp, ultima_atualizacao) das não verificadas há min_idade_horas.
+        As com itens gravados em parte ficam de fora: quem as completa é a retomada do process_licitacao.
+        """
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        fim = self.FIM_PROPOSTAS_SQL
+        encerradas = ', '.join('?' for _ in situacoes_encerradas) or "''"
+        cursor.execute(f'''
+            SELECT l.id, l.url, l.id_contratacao_pncp, r.ultima_atualizacao
+            FROM licitacoes_dados l
+            LEFT JOIN revalidacoes r ON r.id_licitacao = l.id
+            WHERE ({fim} IS NULL OR {fim} >= datetime('now', 'localtime'))
+              AND COALESCE(l.situacao, '') NOT IN ({encerradas})
+              AND (r.data_verificacao IS NULL OR r.data_verificacao <= datetime('now', ?))
+              AND l.id NOT IN (SELECT id_licitacao FROM itens_progresso)
+            ORDER BY r.data_verificacao IS NOT NULL, {fim} IS NULL, {fim}, l.id
+            LIMIT ?
+        ''', (*situacoes_encerradas, f'-{int(min_idade_horas)} hours', int(limit)))
+        results = cursor.fetchall()
+        
+        return results
+    
+    def get_urls_conhecidas(self, urls):
+        """Retorna, dentre as URLs informadas, as das licitações que já estão no banco (com os itens completos)"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        urls = list(urls)
+        conhecidas = set()
+        for i in range(0, len(urls), 500):
+            lote = urls[i:i + 500]
+            cursor.execute(
+                f"SELECT url FROM licitacoes_dados WHERE url IN ({', '.join('?' * len(lote))}) "
+                "AND id NOT IN (SELECT id_licitacao FROM itens_progresso)",
+                lote
+            )
+            conhecidas.update(row[0] for row in cursor.fetchall())
+        
+        return conhecidas
+    
+    def get_editais_pendentes_download(self, limit=None):
+        """Retorna as URLs distintas de editais ainda não baixados"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        query = '''
+            SELECT DISTINCT url_edital FROM editais
+            WHERE sha256 IS NULL AND url_edital IS NOT NULL
+        '''
+        if limit:
+            query += f' LIMIT {int(limit)}'
+        cursor.execute(query)
+        results = [row[0] for row in cursor.fetchall()]
+        
+        return results
+    
+    def get_editais_pendentes_texto(self, limit=None):
+        """Retorna (sha256, caminho_local) dos arquivos baixados ainda sem texto extraído"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        query = '''
+            SELECT sha256, MIN(caminho_local) FROM editais
+            WHERE sha256 IS NOT NULL
+              AND sha256 NOT IN (SELECT sha256 FROM editais_texto)
+            GROUP BY sha256
+        '''
+        if limit:
+            query += f' LIMIT {int(limit)}'
+        cursor.execute(query)
+        results = cursor.fetchall()
+        
+        return results
+    
+    def insert_texto_edital(self, sha256, status, paginas, blocos):
+        """Indexa os blocos de texto de um edital de forma thread-safe"""
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT * FROM editais WHERE id_licitacao = ?', (licitacao_id,))
+            try:
+                cursor.execute('DELETE FROM editais_fts WHERE sha256 = ?', (sha256,))
+                cursor.executemany(
+                    'INSERT INTO editais_fts (texto, sha256, pagina) VALUES (?, ?, ?)',
+                    [(texto, sha256, pagina) for pagina, _, texto in blocos]
+                )
+                cursor.execute('''
+                    INSERT OR REPLACE INTO editais_texto (sha256, status, paginas, blocos)
+                    VALUES (?, ?, ?, ?)
+                ''', (sha256, status, paginas, len(blocos)))
+                conn.commit()
+                
+            except Exception as e:
+                print(f"Erro ao indexar texto do edital: {e}")
+                conn.rollback()
+            finally:
+                conn.close()
+    
+    def search_text(self, termo, limit=20):
+        """Busca o termo no objeto das licitações e no texto dos editais, por relevância"""
+        # Busca pela frase exata, sem interpretar a sintaxe do FTS5
+        consulta = '"' + termo.replace('"', '""') + '"'
+        return self.cached_query('''
+            SELECT * FROM (
+                SELECT l.id, l.id_contratacao_pncp, 'objeto' AS fonte, NULL AS pagina,
+                       snippet(licitacoes_fts, 0, '[', ']', '...', 16) AS trecho,
+                       bm25(licitacoes_fts) AS relevancia
+                FROM licitacoes_fts
+                JOIN licitacoes l ON l.id = licitacoes_fts.rowid
+                WHERE licitacoes_fts MATCH ?
+                UNION ALL
+                SELECT l.id, l.id_contratacao_pncp, 'edital' AS fonte, f.pagina,
+                       snippet(editais_fts, 0, '[', ']', '...', 16) AS trecho,
+                       bm25(editais_fts) AS relevancia
+                FROM editais_fts f
+                JOIN (SELECT DISTINCT id_licitacao, sha256 FROM editais) e ON e.sha256 = f.sha256
+                JOIN licitacoes l ON l.id = e.id_licitacao
+                WHERE editais_fts MATCH ?
+            )
+            ORDER BY relevancia
+            LIMIT ?
+        ''', (consulta, consulta, limit), sqlite3.Row)
+    
+    def get_versao_dados(self):
+        """Retorna o contador de versão dos dados (muda a cada escrita em licitações, itens, editais ou catálogo)"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        # PRAGMA data_version só muda quando outra conexão grava: sem mudança, vale o contador já lido
+        data_version = cursor.execute('PRAGMA data_version').fetchone()[0]
+        cached = getattr(self._readers, 'versao', None)
+        if cached and cached[0] == data_version:
+            return cached[1]
+        
+        cursor.execute('SELECT versao FROM versao_dados WHERE id = 1')
+        row = cursor.fetchone()
+        versao = row[0] if row else 0
+        self._readers.versao = (data_version, versao)
+        
+        return versao
+    
+    def cached_query(self, sql, params=(), row_factory=None):
+        """
+        Executa a consulta de leitura ou devolve o resultado em cache (chave: SQL, parâmetros e versão dos dados).
+        
+        A lista retornada é compartilhada com as próximas chamadas e não deve ser alterada.
+        Só para resultados pequenos ou com LIMIT: o resultado inteiro fica em memória no cache.
+        """
+        # A versão é lida antes da consulta: uma escrita no meio só faz a próxima chamada consultar de novo
+        versao = self.get_versao_dados()
+        key = (sql, tuple(params), row_factory)
+        results = self.query_cache.get(key, versao)
+        if results is None:
+            cursor = self.get_read_connection().cursor()
+            if row_factory:
+                cursor.row_factory = row_factory
+            cursor.execute(sql, params)
             results = cursor.fetchall()
-            
-            conn.close()
-            return results
+            self.query_cache.put(key, versao, results)
+        return results
     
-    def get_database_stats(self):
-        """Retorna estatísticas do banco de forma thread-safe"""
-        with self._lock:
+    def get_catalogo_itens(self):
+        """Retorna [(id, descricao_normalizada), ...] de todo o catálogo de descrições de itens"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id, descricao_normalizada FROM catalogo_itens ORDER BY id')
+        results = cursor.fetchall()
+        
+        return results
+    
+    def update_grupos_catalogo(self, grupos):
+        """Grava o agrupamento do catálogo: grupos é [(grupo, id), ...] (grupo None para itens sem par)"""
+        with self._write_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Contar licitações
-            cursor.execute('SELECT COUNT(*) FROM licitacoes')
-            total_licitacoes = cursor.fetchone()[0]
-            
-            # Contar itens
-            cursor.execute('SELECT COUNT(*) FROM itens_licitacao')
-            total_itens = cursor.fetchone()[0]
-            
-            # Contar editais
-            cursor.execute('SELECT COUNT(*) FROM editais')
-            total_editais = cursor.fetchone()[0]
-            
-            conn.close()
-            
-            return {
-                'total_licitacoes': total_licitacoes,
-                'total_itens': total_itens,
-                'total_editais': total_editais
-            }
+            try:
+                cursor.executemany('UPDATE catalogo_itens SET grupo = ? WHERE id = ?', grupos)
+                conn.commit()
+                
+            except Exception as e:
+                print(f"Erro ao gravar grupos do catálogo: {e}")
+                conn.rollback()
+            finally:
+                conn.close()
+    
+    def get_itens_por_descricao(self, descricao, similares=True, limit=100):
+        """
+        Retorna os itens de todas as licitações com a mesma descrição normalizada.
+        
+        Com similares=True inclui as descrições agrupadas como quase iguais pelo agrupamento do catálogo.
+        """
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        
+        cursor.execute('SELECT id, COALESCE(grupo, id) FROM catalogo_itens WHERE descricao_normalizada = ?',
+                       (normalize_descricao(descricao),))
+        row = cursor.fetchone()
+        if row is None:
+            return []
+        
+        id_catalogo, grupo = row
+        if similares:
+            catalogo = 'SELECT id FROM catalogo_itens WHERE id = :grupo OR grupo = :grupo'
+        else:
+            catalogo = 'SELECT :id'
+        cursor.execute(f'''
+            SELECT i.*, l.id_contratacao_pncp, l.orgao
+            FROM itens_licitacao i
+            JOIN licitacoes l ON l.id = i.id_licitacao
+            WHERE i.id_catalogo IN ({catalogo})
+            ORDER BY i.data_captura DESC, i.id DESC
+            LIMIT :limit
+        ''', {'id': id_catalogo, 'grupo': grupo, 'limit': limit})
+        results = cursor.fetchall()
+        
+        return results
+    
+    def get_latest_paginas_arquivadas(self):
+        """Retorna o SHA-256 da captura mais recente de cada licitação arquivada"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT sha256 FROM paginas_arquivadas
+            WHERE id IN (SELECT MAX(id) FROM paginas_arquivadas GROUP BY id_contratacao_pncp)
+            ORDER BY id
+        ''')
+        results = [row[0] for row in cursor.fetchall()]
+        
+        return results
+    
+    def get_table_columns(self, table):
+        """Retorna as colunas da tabela na ordem do banco (com cache)"""
+        if table not in self._columns_cache:
+            cursor = self.get_read_connection().execute(f'PRAGMA table_info({table})')
+            self._columns_cache[table] = tuple(row[1] for row in cursor.fetchall())
+        return self._columns_cache[table]
+    
+    @staticmethod
+    def _record_type(table, columns):
+        """Tipo de registro leve (namedtuple) para a projeção pedida"""
+        key = (table, columns)
+        record_type = _RECORD_TYPES.get(key)
+        if record_type is None:
+            record_type = namedtuple(f'{table.title().replace("_", "")}Row', columns)
+            _RECORD_TYPES[key] = record_type
+        return record_type
+    
+    def iter_rows(self, table, columns=None, where=None, batch_size=None, newest_first=True, after=None):
+        """
+        Percorre a tabela com paginação por (data_captura, id), lendo um lote por consulta.
+        
+        columns: colunas retornadas (padrão: todas, na ordem da tabela)
+        where: lista de filtros (coluna, operador, valor) combinados com AND
+        after: (data_captura, id) da última linha já lida, para continuar a partir dela
+        Retorna registros nomeados (namedtuple): licitacao.objeto ou licitacao[17].
+        """
+        if table not in self.ITERABLE_TABLES:
+            raise ValueError(f"Tabela inválida: {table}")
+        
+        available = self.get_table_columns(table)
+        columns = tuple(columns) if columns else available
+        invalid = [column for column in columns if column not in available]
+        if invalid:
+            raise ValueError(f"Colunas inexistentes em {table}: {', '.join(invalid)}")
+        
+        conditions = []
+        params = []
+        for column, operator, value in where or []:
+            operator = operator.upper()
+            if column not in available or operator not in self.FILTER_OPERATORS:
+                raise ValueError(f"Filtro inválido: {column} {operator}")
+            conditions.append(f'{column} {operator} ?')
+            params.append(value)
+        
+        record_type = self._record_type(table, columns)
+        batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        order = 'DESC' if newest_first else 'ASC'
+        comparison = '<' if newest_first else '>'
+        
+        # As chaves da paginação vêm no fim de cada linha e não entram no registro
+        select = f'SELECT {", ".join(columns)}, data_captura, id FROM {table}'
+        order_by = f'ORDER BY data_captura {order}, id {order} LIMIT ?'
+        first_sql = f'{select} {"WHERE " + " AND ".join(conditions) if conditions else ""} {order_by}'
+        next_sql = f'{select} WHERE {" AND ".join(conditions + [f"(data_captura, id) {comparison} (?, ?)"])} {order_by}'
+        
+        width = len(columns)
+        if after:
+            sql, args = next_sql, params + [after[0], after[1], batch_size]
+        else:
+            sql, args = first_sql, params + [batch_size]
+        while True:
+            # Cada lote é uma leitura curta na conexão da thread que consome o iterador
+            rows = self.get_read_connection().execute(sql, args).fetchall()
+            for row in rows:
+                yield record_type._make(row[:width])
+            if len(rows) < batch_size:
+                break
+            last = rows[-1]
+            sql, args = next_sql, params + [last[width], last[width + 1], batch_size]
+    
+    def iter_licitacoes(self, columns=None, where=None, batch_size=None, after=None):
+        """Percorre as licitações, das mais recentes para as mais antigas"""
+        return self.iter_rows('licitacoes', columns, where, batch_size, after=after)
+    
+    def iter_itens_by_licitacao(self, licitacao_id, columns=None, batch_size=None, after=None):
+        """Percorre os itens de uma licitação na ordem de captura"""
+        return self.iter_rows('itens_licitacao', columns, [('id_licitacao', '=', licitacao_id)],
+                              batch_size, newest_first=False, after=after)
+    
+    def iter_editais_by_licitacao(self, licitacao_id, columns=None, batch_size=None, after=None):
+        """Percorre os editais de uma licitação na ordem de captura"""
+        return self.iter_rows('editais', columns, [('id_licitacao', '=', licitacao_id)],
+                              batch_size, newest_first=False, after=after)
+    
+    def get_licitacao_by_pncp_id(self, pncp_id):
+        """Busca uma licitação pelo ID do PNCP de forma thread-safe"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM licitacoes WHERE id_contratacao_pncp = ?', (pncp_id,))
+        result = cursor.fetchone()
+        
+        return result
+    
+    def get_all_licitacoes(self):
+        """Retorna todas as licitações de forma thread-safe"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM licitacoes ORDER BY data_captura DESC')
+        results = cursor.fetchall()
+        
+        return results
+    
+    def get_itens_by_licitacao(self, licitacao_id):
+        """Retorna todos os itens de uma licitação de forma thread-safe"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM itens_licitacao WHERE id_licitacao = ?', (licitacao_id,))
+        results = cursor.fetchall()
+        
+        return results
+    
+    def get_editais_by_licitacao(self, licitacao_id):
+        """Retorna todos os editais de uma licitação de forma thread-safe"""
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM editais WHERE id_licitacao = ?', (licitacao_id,))
+        results = cursor.fetchall()
+        
+        return results
+    
+    def get_database_stats(self):
+        """Retorna os totais do banco (lidos das estatísticas materializadas, em tempo constante)"""
+        totais = dict(self.cached_query('SELECT tabela, total FROM estatisticas_totais'))
+        
+        return {
+            'total_licitacoes': totais.get('licitacoes', 0),
+            'total_itens': totais.get('itens_licitacao', 0),
+            'total_editais': totais.get('editais', 0)
+        }
+    
+    def get_estatisticas_por(self, dimensao, limit=None):
+        """
+        Retorna [(chave, licitacoes, itens, valor_estimado), ...] de uma dimensão: 'orgao', 'modalidade' ou 'dia'.
+        
+        Órgãos e modalidades vêm por número de licitações; dias, do mais recente para o mais antigo.
+        """
+        if dimensao not in self.STATS_DIMENSIONS:
+            raise ValueError(f"Dimensão inválida: {dimensao}")
+        
+        order = 'chave DESC' if dimensao == 'dia' else 'licitacoes DESC, chave'
+        query = f'''
+            SELECT chave, licitacoes, itens, valor_estimado FROM estatisticas_grupos
+            WHERE dimensao = ? AND licitacoes > 0
+            ORDER BY {order}
+        '''
+        if limit:
+            query += f' LIMIT {int(limit)}'
+        
+        return self.cached_query(query, (dimensao,))
+    
+    @classmethod
+    def reset_instance(cls):
+        """Descarta a instância única para abrir outro arquivo de banco (ex.: bancos sintéticos do benchmark)"""
+        with cls._lock:
+            if cls._instance is not None and cls._instance.is_initialized():
+                cls._instance.close_read_connection()
+            cls._instance = None
     
     def is_initialized(self):
         """Verifica se a instância está inicializada"""
@@ -274,5 +1744,5 @@ class DatabaseManager:
         return {
             'initialized': self.is_initialized(),
             'db_path': self.db_path,
-            'has_lock': hasattr(self, '_lock')
+            'has_lock': hasattr(self, '_write_lock')
         } 
\ No newline at end of file
@@ -3,42 +3,39 @@
 Script para consultar e visualizar dados do banco de licitações
 """
 
-from database_config import DatabaseManager
+from database_config import DatabaseManager, formatar_valor
 import sqlite3
 
 def view_all_licitacoes():
     """Mostra todas as licitações no banco"""
     db = DatabaseManager()
-    licitacoes = db.get_all_licitacoes()
+    licitacoes = db.iter_licitacoes(columns=['id', 'id_contratacao_pncp', 'url', 'local', 'orgao', 'objeto', 'data_captura'])
     
     print("="*80)
     print("TODAS AS LICITAÇÕES NO BANCO DE DADOS")
     print("="*80)
     
-    if not licitacoes:
-        print("Nenhuma licitação encontrada no banco.")
-        return
-    
+    encontradas = 0
     for licitacao in licitacoes:
-        print(f"\nID: {licitacao[0]}")
-        print(f"ID PNCP: {licitacao[1]}")
-        print(f"URL: {licitacao[2]}")
-        print(f"Local: {licitacao[3]}")
-        print(f"Órgão: {licitacao[4]}")
-        print(f"Objeto: {licitacao[17]}")
-        print(f"Data de Captura: {licitacao[18]}")
+        encontradas += 1
+        print(f"\nID: {licitacao.id}")
+        print(f"ID PNCP: {licitacao.id_contratacao_pncp}")
+        print(f"URL: {licitacao.url}")
+        print(f"Local: {licitacao.local}")
+        print(f"Órgão: {licitacao.orgao}")
+        print(f"Objeto: {licitacao.objeto}")
+        print(f"Data de Captura: {licitacao.data_captura}")
         print("-" * 50)
+    
+    if not encontradas:
+        print("Nenhuma licitação encontrada no banco.")
 
 def view_licitacao_details(licitacao_id):
     """Mostra detalhes completos de uma licitação específica"""
     db = DatabaseManager()
     
     # Buscar licitação
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM licitacoes WHERE id = ?', (licitacao_id,))
-    licitacao = cursor.fetchone()
+    licitacao = next(db.iter_licitacoes(where=[('id', '=', licitacao_id)]), None)
     
     if not licitacao:
         print(f"Licitação com ID {licitacao_id} não encontrada.")
@@ -48,41 +45,41 @@ def view_licitacao_details(licitacao_id):
     print(f"DETALHES DA LICITAÇÃO {licitacao_id}")
     print("="*80)
     
-    print(f"ID PNCP: {licitacao[1]}")
-    print(f"URL: {licitacao[2]}")
-    print(f"Local: {licitacao[3]}")
-    print(f"Órgão: {licitacao[4]}")
-    print(f"Unidade Compradora: {licitacao[5]}")
-    print(f"Modalidade: {licitacao[6]}")
-    print(f"Amparo Legal: {licitacao[7]}")
-    print(f"Tipo: {licitacao[8]}")
-    print(f"Modo de Disputa: {licitacao[9]}")
-    print(f"Registro de Preço: {licitacao[10]}")
-    print(f"Fonte Orçamentária: {licitacao[11]}")
-    print(f"Data de Divulgação: {licitacao[12]}")
-    print(f"Situação: {licitacao[13]}")
-    print(f"Data Início Propostas: {licitacao[14]}")
-    print(f"Data Fim Propostas: {licitacao[15]}")
-    print(f"Fonte: {licitacao[16]}")
-    print(f"Objeto: {licitacao[17]}")
-    print(f"Data de Captura: {licitacao[18]}")
+    print(f"ID PNCP: {licitacao.id_contratacao_pncp}")
+    print(f"URL: {licitacao.url}")
+    print(f"Local: {licitacao.local}")
+    print(f"Órgão: {licitacao.orgao}")
+    print(f"Unidade Compradora: {licitacao.unidade_compradora}")
+    print(f"Modalidade: {licitacao.modalidade}")
+    print(f"Amparo Legal: {licitacao.amparo_legal}")
+    print(f"Tipo: {licitacao.tipo}")
+    print(f"Modo de Disputa: {licitacao.modo_disputa}")
+    print(f"Registro de Preço: {licitacao.registro_preco}")
+    print(f"Fonte Orçamentária: {licitacao.fonte_orcamentaria}")
+    print(f"Data de Divulgação: {licitacao.data_divulgacao}")
+    print(f"Situação: {licitacao.situacao}")
+    print(f"Data Início Propostas: {licitacao.data_inicio_propostas}")
+    print(f"Data Fim Propostas: {licitacao.data_fim_propostas}")
+    print(f"Fonte: {licitacao.fonte}")
+    print(f"Objeto: {licitacao.objeto}")
+    print(f"Data de Captura: {licitacao.data_captura}")
     
     # Buscar itens
     print("\n" + "="*50)
     print("ITENS DA LICITAÇÃO")
     print("="*50)
     
-    cursor.execute('SELECT * FROM itens_licitacao WHERE id_licitacao = ?', (licitacao_id,))
-    itens = cursor.fetchall()
-    
-    if itens:
-        for i, item in enumerate(itens, 1):
-            print(f"\nItem {i}:")
-            print(f"  Descrição: {item[2]}")
-            print(f"  Quantidade: {item[3]}")
-            print(f"  Valor Unitário: {item[4]}")
-            print(f"  Valor Total: {item[5]}")
-    else:
+    itens = db.iter_itens_by_licitacao(
+        licitacao_id, columns=['descricao', 'quantidade', 'valor_unitario_estimado', 'valor_total_estimado'])
+    
+    i = 0
+    for i, item in enumerate(itens, 1):
+        print(f"\nItem {i}:")
+        print(f"  Descrição: {item.descricao}")
+        print(f"  Quantidade: {item.quantidade}")
+        print(f"  Valor Unitário: {item.valor_unitario_estimado}")
+        print(f"  Valor Total: {item.valor_total_estimado}")
+    if not i:
         print("Nenhum item encontrado para esta licitação.")
     
     # Buscar editais
@@ -90,60 +87,53 @@ def view_licitacao_details(licitacao_id):
     print("EDITAIS DA LICITAÇÃO")
     print("="*50)
     
-    cursor.execute('SELECT * FROM editais WHERE id_licitacao = ?', (licitacao_id,))
-    editais = cursor.fetchall()
+    editais = db.iter_editais_by_licitacao(licitacao_id, columns=['url_edital', 'data_captura'])
     
-    if editais:
-        for i, edital in enumerate(editais, 1):
-            print(f"\nEdital {i}:")
-            print(f"  URL: {edital[2]}")
-            print(f"  Data de Captura: {edital[3]}")
-    else:
+    i = 0
+    for i, edital in enumerate(editais, 1):
+        print(f"\nEdital {i}:")
+        print(f"  URL: {edital.url_edital}")
+        print(f"  Data de Captura: {edital.data_captura}")
+    if not i:
         print("Nenhum edital encontrado para esta licitação.")
-    
-    conn.close()
 
 def get_database_stats():
     """Mostra estatísticas do banco de dados"""
     db = DatabaseManager()
-    conn = db.get_connection()
-    cursor = conn.cursor()
     
     print("="*50)
     print("ESTATÍSTICAS DO BANCO DE DADOS")
     print("="*50)
     
-    # Contar licitações
-    cursor.execute('SELECT COUNT(*) FROM licitacoes')
-    total_licitacoes = cursor.fetchone()[0]
-    print(f"Total de Licitações: {total_licitacoes}")
-    
-    # Contar itens
-    cursor.execute('SELECT COUNT(*) FROM itens_licitacao')
-    total_itens = cursor.fetchone()[0]
-    print(f"Total de Itens: {total_itens}")
-    
-    # Contar editais
-    cursor.execute('SELECT COUNT(*) FROM editais')
-    total_editais = cursor.fetchone()[0]
-    print(f"Total de Editais: {total_editais}")
+    # Totais mantidos pelo banco a cada escrita (sem COUNT(*) nas tabelas)
+    stats = db.get_database_stats()
+    print(f"Total de Licitações: {stats['total_licitacoes']}")
+    print(f"Total de Itens: {stats['total_itens']}")
+    print(f"Total de Editais: {stats['total_editais']}")
     
     # Licitações por órgão
     print("\nLicitações por Órgão:")
-    cursor.execute('SELECT orgao, COUNT(*) FROM licitacoes GROUP BY orgao ORDER BY COUNT(*) DESC')
-    orgaos = cursor.fetchall()
-    
-    for orgao, count in orgaos:
-        print(f"  {orgao}: {count}")
-    
-    conn.close()
+    for orgao, count, itens, valor in db.get_estatisticas_por('orgao'):
+        print(f"  {orgao}: {count} ({itens} itens, {formatar_valor(valor)} estimados)")
+    
+    # Licitações por modalidade
+    print("\nLicitações por Modalidade:")
+    for modalidade, count, itens, valor in db.get_estatisticas_por('modalidade'):
+        print(f"  {modalidade}: {count} ({itens} itens, {formatar_valor(valor)} estimados)")
+    
+    # Licitações capturadas nos últimos dias
+    print("\nLicitações por Dia de Captura:")
+    for dia, count, itens, valor in db.get_estatisticas_por('dia', limit=30):
+        print(f"  {dia}: {count} ({itens} itens, {formatar_valor(valor)} estimados)")
 
 def search_licitacoes(termo):
     """Busca licitações por termo no objeto"""
     db = DatabaseManager()
-    conn = db.get_connection()
+    conn = db.get_read_connection()
     cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
     
+    # Resultado sem limite: fica fora do cache de consultas, que guarda só resultados pequenos
     cursor.execute('''
         SELECT id, id_contratacao_pncp, orgao, objeto, data_captura 
         FROM licitacoes 
@@ -151,22 +141,21 @@ def search_licitacoes(termo):
         ORDER BY data_captura DESC
     ''', (f'%{termo}%', f'%{termo}%'))
     
-    resultados = cursor.fetchall()
-    
     print(f"\nResultados para '{termo}':")
     print("="*80)
     
-    if resultados:
-        for resultado in resultados:
-            print(f"ID: {resultado[0]} | PNCP: {resultado[1]}")
-            print(f"Órgão: {resultado[2]}")
-            print(f"Objeto: {resultado[3]}")
-            print(f"Data: {resultado[4]}")
-            print("-" * 50)
-    else:
-        print("Nenhuma licitação encontrada com esse termo.")
+    # Percorre o cursor sem carregar todos os resultados
+    encontrados = 0
+    for resultado in cursor:
+        encontrados += 1
+        print(f"ID: {resultado['id']} | PNCP: {resultado['id_contratacao_pncp']}")
+        print(f"Órgão: {resultado['orgao']}")
+        print(f"Objeto: {resultado['objeto']}")
+        print(f"Data: {resultado['data_captura']}")
+        print("-" * 50)
     
-    conn.close()
+    if not encontrados:
+        print("Nenhuma licitação encontrada com esse termo.")
 
 if __name__ == "__main__":
     while True:
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Download paralelo dos arquivos de edital com armazenamento endereçado por conteúdo (SHA-256)
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import config
+from database.database_config import DatabaseManager
+
+# Extensões para os tipos de conteúdo mais comuns nos editais
+CONTENT_TYPE_EXTENSIONS = {
+    'application/pdf': '.pdf',
+    'application/zip': '.zip',
+    'application/x-zip-compressed': '.zip',
+    'application/msword': '.doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+    'text/plain': '.txt',
+    'text/html': '.html',
+}
+
+
+class EditalDownloader:
+    """Baixa os editais em paralelo, em streaming, com retomada por Range e deduplicação por hash"""
+
+    def __init__(self, root=None, workers=None, chunk_size=None, timeout=None):
+        self.root = root or config.EDITAIS_DIR
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        self.workers = workers or config.DOWNLOAD_WORKERS
+        self.chunk_size = chunk_size or config.DOWNLOAD_CHUNK_SIZE
+        self.timeout = timeout or config.DOWNLOAD_TIMEOUT
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        # Sessão compartilhada: conexões reaproveitadas entre downloads do mesmo host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def path_for(self, sha256, extension=''):
+        """Caminho final de um arquivo pelo seu hash"""
+        return os.path.join(self.root, sha256[:2], f"{sha256}{extension}")
+
+    @staticmethod
+    def _extension(response, url):
+        """Descobre a extensão pelo nome do arquivo ou pelo tipo de conteúdo"""
+        disposition = response.headers.get('Content-Disposition', '')
+        match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)', disposition)
+        name = match.group(1) if match else url.split('?')[0].rsplit('/', 1)[-1]
+        extension = os.path.splitext(name)[1].lower()
+        if extension and len(extension) <= 5:
+            return extension
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        return CONTENT_TYPE_EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ''
+
+    def _hash_file(self, path):
+        """Calcula o SHA-256 lendo o arquivo em blocos"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(self.chunk_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def download(self, url):
+        """
+        Baixa um arquivo para o armazenamento e retorna (sha256, tamanho, caminho).
+
+        Downloads interrompidos continuam de onde pararam (cabeçalho Range).
+        """
+        part_path = os.path.join(self.tmp_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.part')
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # O arquivo parcial já está completo
+                extension = os.path.splitext(url.split('?')[0])[1].lower()
+            else:
+                response.raise_for_status()
+                extension = self._extension(response, url)
+                # 206: servidor aceitou a retomada; 200: recomeça do zero
+                mode = 'ab' if response.status_code == 206 else 'wb'
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+
+        sha256 = self._hash_file(part_path)
+        size = os.path.getsize(part_path)
+        final_path = self.path_for(sha256, extension)
+
+        if os.path.exists(final_path):
+            # Mesmo conteúdo já baixado por outra licitação
+            os.remove(part_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(part_path, final_path)
+
+        return sha256, size, final_path
+
+    def _download_with_retry(self, url):
+        """Tenta o download algumas vezes antes de desistir"""
+        for attempt in range(1, config.RETRY_ATTEMPTS + 1):
+            try:
+                return self.download(url)
+            except (requests.RequestException, OSError) as e:
+                print(f"Erro ao baixar {url} (tentativa {attempt}/{config.RETRY_ATTEMPTS}): {e}")
+                if attempt < config.RETRY_ATTEMPTS:
+                    time.sleep(config.RETRY_DELAY * attempt)
+        return None
+
+    def run(self, limit=None):
+        """Baixa todos os editais ainda sem arquivo local e registra hash, tamanho e caminho no banco"""
+        db = DatabaseManager()
+        urls = db.get_editais_pendentes_download(limit)
+        print(f"{len(urls)} editais para baixar com {self.workers} conexões")
+
+        started = time.monotonic()
+        downloaded = failed = total_bytes = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._download_with_retry, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                result = future.result()
+                if result is None:
+                    failed += 1
+                    continue
+
+                sha256, size, path = result
+                db.update_edital_download(url, sha256, size, path)
+                downloaded += 1
+                total_bytes += size
+
+        elapsed = time.monotonic() - started
+        rate = total_bytes / elapsed / 1024 / 1024 if elapsed else 0.0
+        print(f"{downloaded} editais baixados, {failed} falhas, {total_bytes / 1024 / 1024:.1f} MB "
+              f"em {elapsed:.1f}s ({rate:.1f} MB/s)")
+        return downloaded
+
+
+if __name__ == "__main__":
+    print("="*60)
+    print("DOWNLOAD DE EDITAIS")
+    print("="*60)
+    EditalDownloader().run()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Extração do texto dos editais baixados e indexação para busca textual (FTS5)
+"""
+
+import argparse
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from html import unescape
+
+from config import config
+from database.database_config import DatabaseManager
+
+
+def _strip_tags(markup):
+    """Remove as tags de HTML/XML mantendo o texto"""
+    return unescape(re.sub(r'<[^>]+>', ' ', markup))
+
+
+def _extract_pdf(path):
+    """Texto de cada página de um PDF"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("pypdf não instalado - execute: pip install pypdf")
+
+    reader = PdfReader(path)
+    return [page.extract_text() or '' for page in reader.pages]
+
+
+def _extract_docx(path):
+    """Texto de um DOCX (um único bloco, o formato não tem páginas fixas)"""
+    with zipfile.ZipFile(path) as docx:
+        xml = docx.read('word/document.xml').decode('utf-8', errors='ignore')
+    return [_strip_tags(xml.replace('</w:p>', '\n'))]
+
+
+def _extract_plain(path):
+    """Texto de arquivos TXT/HTML"""
+    with open(path, 'rb') as f:
+        content = f.read().decode('utf-8', errors='ignore')
+    if path.endswith(('.html', '.htm')):
+        content = _strip_tags(content)
+    return [content]
+
+
+def _detect_kind(path):
+    """Identifica o formato pelo conteúdo (a extensão salva nem sempre é confiável)"""
+    with open(path, 'rb') as f:
+        header = f.read(8)
+    if header.startswith(b'%PDF'):
+        return 'pdf'
+    if header.startswith(b'PK') and path.endswith('.docx'):
+        return 'docx'
+    if path.endswith(('.txt', '.html', '.htm')):
+        return 'texto'
+    return None
+
+
+def chunk_text(text, size):
+    """Divide o texto em blocos de até size caracteres, quebrando em espaços"""
+    text = ' '.join(text.split())
+    chunks = []
+    while text:
+        if len(text) <= size:
+            chunks.append(text)
+            break
+        cut = text.rfind(' ', 0, size)
+        if cut <= 0:
+            cut = size
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    return chunks
+
+
+def extract_document(args):
+    """
+    Tarefa do pool de processos: extrai e divide o texto de um edital.
+
+    Retorna (sha256, status, paginas, [(pagina, bloco, texto), ...]).
+    """
+    sha256, path, chunk_size = args
+    extractors = {'pdf': _extract_pdf, 'docx': _extract_docx, 'texto': _extract_plain}
+
+    try:
+        kind = _detect_kind(path)
+        if kind is None:
+            return sha256, 'nao_suportado', 0, []
+        pages = extractors[kind](path)
+    except Exception as e:
+        return sha256, f'erro: {e}'[:200], 0, []
+
+    chunks = []
+    for page_number, page_text in enumerate(pages, 1):
+        for chunk_number, chunk in enumerate(chunk_text(page_text, chunk_size), 1):
+            chunks.append((page_number, chunk_number, chunk))
+    return sha256, 'ok', len(pages), chunks
+
+
+def index_editais(workers=None, chunk_size=None, limit=None):
+    """Extrai e indexa os editais baixados que ainda não foram processados (incremental por hash)"""
+    db = DatabaseManager()
+    pending = db.get_editais_pendentes_texto(limit)
+    chunk_size = chunk_size or config.TEXT_CHUNK_SIZE
+    print(f"{len(pending)} arquivos de edital para extrair texto")
+
+    started = time.monotonic()
+    total_pages = indexed = 0
+
+    # Extração (CPU) em processos separados; a gravação no banco fica neste processo
+    with ProcessPoolExecutor(max_workers=workers or config.TEXT_EXTRACTION_WORKERS or os.cpu_count()) as pool:
+        tasks = ((sha256, path, chunk_size) for sha256, path in pending)
+        for sha256, status, pages, chunks in pool.map(extract_document, tasks):
+            db.insert_texto_edital(sha256, status, pages, chunks)
+            total_pages += pages
+            if status == 'ok':
+                indexed += 1
+            else:
+                print(f"Edital {sha256[:12]}: {status}")
+
+    elapsed = time.monotonic() - started
+    rate = total_pages / elapsed if elapsed else 0.0
+    print(f"{indexed} editais indexados, {total_pages} páginas em {elapsed:.1f}s ({rate:.1f} páginas/s)")
+    return indexed
+
+
+def search(term, limit=20):
+    """Mostra as licitações cujo objeto ou texto do edital contém o termo"""
+    resultados = DatabaseManager().search_text(term, limit)
+
+    print(f"\nResultados para '{term}':")
+    print("="*80)
+    if not resultados:
+        print("Nenhuma licitação encontrada com esse termo.")
+        return
+
+    for resultado in resultados:
+        print(f"ID: {resultado['id']} | PNCP: {resultado['id_contratacao_pncp']} | Fonte: {resultado['fonte']}")
+        if resultado['pagina']:
+            print(f"Página do edital: {resultado['pagina']}")
+        print(f"Trecho: {resultado['trecho']}")
+        print("-" * 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extração e busca no texto dos editais")
+    parser.add_argument('--buscar', help="Termo para buscar no objeto e no texto dos editais")
+    parser.add_argument('--workers', type=int, help="Processos de extração")
+    args = parser.parse_args()
+
+    if args.buscar:
+        search(args.buscar)
+    else:
+        index_editais(workers=args.workers)
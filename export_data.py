@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Exportação em streaming do banco de licitações para CSV, Parquet ou Excel
+"""
+
+import argparse
+import csv
+import os
+import time
+from itertools import islice
+
+from database.database_config import DatabaseManager
+
+# Tabelas exportáveis
+EXPORT_TABLES = ('licitacoes', 'itens_licitacao', 'editais')
+
+# Filtros aceitos: (coluna, operador) aplicados direto no SQL
+FILTERS = {
+    'desde': ('data_captura', '>='),
+    'ate': ('data_captura', '<='),
+    'orgao': ('orgao', '='),
+    'situacao': ('situacao', '='),
+    'modalidade': ('modalidade', '='),
+    'termo': ('objeto', 'LIKE'),
+    'licitacao': ('id_licitacao', '='),
+}
+
+# Linhas máximas por planilha do Excel (o restante continua em nova aba)
+XLSX_MAX_ROWS = 1_048_575
+
+
+def get_table_columns(cursor, table):
+    """Retorna {coluna: tipo declarado} da tabela"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {row[1]: (row[2] or '').upper() for row in cursor.fetchall()}
+
+
+def build_filters(table, filters, available):
+    """Converte os filtros da linha de comando em condições (coluna, operador, valor) de iter_rows"""
+    where = []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        column, operator = FILTERS[name]
+        if column not in available:
+            raise ValueError(f"Filtro '{name}' não se aplica à tabela {table}")
+        where.append((column, operator, f'%{value}%' if operator == 'LIKE' else value))
+    return where
+
+
+def iter_chunks(rows, chunk_size):
+    """Agrupa o iterador de linhas em lotes, sem carregar a tabela inteira"""
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+class CsvExportWriter:
+    """Escreve os lotes em CSV"""
+
+    def __init__(self, path, columns, types):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    """Escreve cada lote como um row group do Parquet"""
+
+    def __init__(self, path, columns, types):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("pyarrow não instalado - execute: pip install pyarrow")
+
+        self.pa = pa
+        self.columns = columns
+
+        def arrow_type(declared):
+            if 'INT' in declared:
+                return pa.int64()
+            if 'REAL' in declared or 'FLOA' in declared:
+                return pa.float64()
+            return pa.string()
+
+        self.schema = pa.schema([(column, arrow_type(types[column])) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        data = {column: [row[i] for row in rows] for i, column in enumerate(self.columns)}
+        self.writer.write_table(self.pa.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class XlsxExportWriter:
+    """Escreve os lotes em XLSX no modo write-only (linhas vão direto para o disco)"""
+
+    def __init__(self, path, columns, types):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise RuntimeError("openpyxl não instalado - execute: pip install openpyxl")
+
+        self.path = path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_rows = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheet = self.workbook.create_sheet(f"Dados {len(self.workbook.worksheets) + 1}")
+        self.sheet.append(self.columns)
+        self.sheet_rows = 0
+
+    def write(self, rows):
+        for row in rows:
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.sheet_rows += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+WRITERS = {
+    'csv': CsvExportWriter,
+    'parquet': ParquetExportWriter,
+    'xlsx': XlsxExportWriter,
+}
+
+
+def export(table, output, fmt=None, columns=None, chunk_size=5000, **filters):
+    """
+    Exporta a tabela em lotes para o arquivo de saída.
+
+    A memória usada depende só do tamanho do lote, não do tamanho do banco.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Tabela inválida: {table}")
+    fmt = fmt or os.path.splitext(output)[1].lstrip('.').lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato inválido: {fmt} (use {', '.join(WRITERS)})")
+
+    # Data sem hora inclui o dia inteiro
+    if filters.get('ate') and len(filters['ate']) == 10:
+        filters['ate'] += ' 23:59:59'
+
+    db = DatabaseManager()
+    available = get_table_columns(db.get_read_connection().cursor(), table)
+
+    columns = columns or list(available)
+    invalid = [column for column in columns if column not in available]
+    if invalid:
+        raise ValueError(f"Colunas inexistentes em {table}: {', '.join(invalid)}")
+
+    # Paginação por (data_captura, id) feita pelo DatabaseManager, um lote por consulta
+    rows = db.iter_rows(table, columns, build_filters(table, filters, available),
+                        batch_size=chunk_size, newest_first=False)
+    writer = WRITERS[fmt](output, columns, available)
+
+    started = time.monotonic()
+    total = 0
+    try:
+        for chunk in iter_chunks(rows, chunk_size):
+            writer.write(chunk)
+            total += len(chunk)
+    finally:
+        writer.close()
+
+    elapsed = time.monotonic() - started
+    print(f"{total} linhas de {table} exportadas para {output} em {elapsed:.1f}s")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o banco de licitações em streaming")
+    parser.add_argument('saida', help="Arquivo de saída (.csv, .parquet ou .xlsx)")
+    parser.add_argument('--tabela', default='licitacoes', choices=EXPORT_TABLES)
+    parser.add_argument('--formato', choices=list(WRITERS), help="Padrão: extensão do arquivo")
+    parser.add_argument('--colunas', help="Colunas separadas por vírgula (padrão: todas)")
+    parser.add_argument('--lote', type=int, default=5000, help="Linhas lidas por consulta")
+    parser.add_argument('--desde', help="data_captura mínima (AAAA-MM-DD)")
+    parser.add_argument('--ate', help="data_captura máxima (AAAA-MM-DD)")
+    parser.add_argument('--orgao')
+    parser.add_argument('--situacao')
+    parser.add_argument('--modalidade')
+    parser.add_argument('--termo', help="Texto contido no objeto")
+    parser.add_argument('--licitacao', type=int, help="id_licitacao (itens e editais)")
+    args = parser.parse_args()
+
+    export(
+        args.tabela, args.saida, fmt=args.formato,
+        columns=args.colunas.split(',') if args.colunas else None,
+        chunk_size=args.lote,
+        desde=args.desde, ate=args.ate, orgao=args.orgao, situacao=args.situacao,
+        modalidade=args.modalidade, termo=args.termo, licitacao=args.licitacao
+    )
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Agrupamento offline das descrições de itens quase iguais no catálogo
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+from config import config
+from database.database_config import DatabaseManager
+
+
+def _similarity(a, b):
+    """Jaccard entre os conjuntos de palavras de duas descrições"""
+    return len(a & b) / len(a | b)
+
+
+def _measures(tokens):
+    """Números da descrição (medidas, capacidades): precisam coincidir para agrupar"""
+    return frozenset(token for token in tokens if any(c.isdigit() for c in token))
+
+
+def cluster_catalogo(threshold=None, max_posting=None):
+    """
+    Agrupa as descrições normalizadas quase iguais e grava o representante (menor id) de cada grupo.
+    
+    Os candidatos de cada descrição são as que compartilham suas duas palavras mais raras,
+    o que evita comparar todos os pares do catálogo.
+    """
+    threshold = threshold or config.ITEM_CLUSTER_THRESHOLD
+    max_posting = max_posting or config.ITEM_CLUSTER_MAX_POSTING
+    db = DatabaseManager()
+    started = time.monotonic()
+
+    tokens = {id_catalogo: frozenset(descricao.split()) for id_catalogo, descricao in db.get_catalogo_itens()}
+    measures = {id_catalogo: _measures(words) for id_catalogo, words in tokens.items()}
+    postings = defaultdict(list)
+    for id_catalogo, words in tokens.items():
+        for word in words:
+            postings[word].append(id_catalogo)
+
+    parent = {id_catalogo: id_catalogo for id_catalogo in tokens}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    comparisons = 0
+    for id_catalogo, words in tokens.items():
+        rare = sorted((word for word in words if len(postings[word]) <= max_posting),
+                      key=lambda word: len(postings[word]))[:2]
+        for word in rare:
+            for other in postings[word]:
+                if other == id_catalogo or measures[other] != measures[id_catalogo]:
+                    continue
+                root, other_root = find(id_catalogo), find(other)
+                if root == other_root:
+                    continue
+                comparisons += 1
+                if _similarity(words, tokens[other]) >= threshold:
+                    parent[max(root, other_root)] = min(root, other_root)
+
+    grupos = []
+    agrupadas = 0
+    for id_catalogo in tokens:
+        grupo = find(id_catalogo)
+        if grupo != id_catalogo:
+            agrupadas += 1
+        grupos.append((grupo if grupo != id_catalogo else None, id_catalogo))
+    db.update_grupos_catalogo(grupos)
+
+    total_grupos = len({grupo or id_catalogo for grupo, id_catalogo in grupos})
+    elapsed = time.monotonic() - started
+    print(f"{len(tokens)} descrições no catálogo, {agrupadas} agrupadas a outra; "
+          f"{total_grupos} grupos ({comparisons} comparações em {elapsed:.1f}s)")
+    return total_grupos
+
+
+def search(descricao, similares=True):
+    """Mostra os itens de todas as licitações com a mesma descrição (ou do mesmo grupo)"""
+    itens = DatabaseManager().get_itens_por_descricao(descricao, similares)
+
+    print(f"\nItens com descrição '{descricao}':")
+    print("="*80)
+    if not itens:
+        print("Nenhum item encontrado com essa descrição.")
+        return
+
+    for item in itens:
+        print(f"PNCP: {item['id_contratacao_pncp']} | Órgão: {item['orgao']}")
+        print(f"Descrição: {item['descricao']}")
+        print(f"Quantidade: {item['quantidade']} | Valor Unitário: {item['valor_unitario_estimado']}")
+        print("-" * 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catálogo de descrições de itens")
+    parser.add_argument('--buscar', help="Descrição para listar os itens de todas as licitações")
+    parser.add_argument('--exata', action='store_true', help="Na busca, não inclui as descrições agrupadas")
+    parser.add_argument('--limiar', type=float, help="Similaridade mínima para agrupar (0 a 1)")
+    args = parser.parse_args()
+
+    if args.buscar:
+        search(args.buscar, similares=not args.exata)
+    else:
+        cluster_catalogo(threshold=args.limiar)
@@ -7,9 +7,19 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
+import itertools
 import time
 from datetime import datetime
-from database.database_config import DatabaseManager
+from database.database_config import DatabaseManager, ItemRecord
+from config import config
+from tab_scheduler import run_tab_pool
+from bid_queue import build_queue
+from timeout_policy import timeout_policy
+from page_archive import archive_licitacao, CAMPOS_LICITACAO
+from network_capture import (
+    enable_performance_logging, get_network_capture,
+    build_licitacao_record, build_item_records, build_edital_records
+)
 
 def setup_driver():
     """Configura e retorna o driver do Chrome"""
@@ -18,6 +28,12 @@ def setup_driver():
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1920,1080")
+    # Abas em segundo plano continuam carregando no modo multi-abas
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    if config.NETWORK_CAPTURE:
+        enable_performance_logging(chrome_options)
     
     service = Service(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -29,9 +45,8 @@ def scroll_down(driver):
 
 def catch_especifique_information(driver, element_string) -> str:
     """Pega informações específicas da página"""
-    wait = WebDriverWait(driver, 10)
     try:
-        x = wait.until(EC.presence_of_element_located((By.XPATH, f'//strong[contains(.,"{element_string}")]/following-sibling::span'))).text
+        x = timeout_policy.wait_for(driver, element_string, (By.XPATH, f'//strong[contains(.,"{element_string}")]/following-sibling::span'), 10).text
     except (TimeoutException, NoSuchElementException):
         x = f'{element_string.replace(":","")} Não encontrado'
     except Exception as e:
@@ -39,57 +54,101 @@ def catch_especifique_information(driver, element_string) -> str:
         print(f"Erro ao buscar {element_string}: {e}")
     return x
 
-def catch_bid_items(driver, id_licitacao) -> list:
-    """Pega os itens da licitação"""
+def snapshot_tab(driver, tab_index) -> str:
+    """Retorna o HTML renderizado de uma aba da página de detalhe"""
+    tab = driver.find_element(By.XPATH, f'//*[@id="main-content"]/pncp-item-detail/div/pncp-tab-set/div/pncp-tab[{tab_index}]')
+    return driver.execute_script("return arguments[0].outerHTML;", tab)
+
+# Linhas por página da tabela de itens no detalhe
+ITENS_POR_PAGINA = 5
+
+def next_items_page(driver) -> bool:
+    """Vai para a próxima página da tabela de itens; retorna False se não houver próxima (botão ausente ou desabilitado)"""
+    scroll_down(driver)
+    try:
+        button = timeout_policy.wait_for(driver, 'item:proxima_pagina', (By.XPATH, '//button[contains(@aria-label,"Ir para próxima página")]'), 10)
+    except (TimeoutException, NoSuchElementException):
+        return False
+    if not button.is_enabled():
+        return False
+    # Botão habilitado que não fica clicável é erro (TimeoutException), não fim da lista
+    timeout_policy.wait_for(driver, 'item:proxima_pagina_clicavel', button, 10, EC.element_to_be_clickable).click()
+    return True
+
+def iter_bid_items(driver, snapshots=None, pular=0):
+    """
+    Gera os itens da licitação (ItemRecord) à medida que as páginas são lidas.
+
+    pular: itens já gravados numa execução anterior; as páginas inteiras são só avançadas, sem leitura
+    (e o HTML de cada página lida vai para snapshots, se informado)
+    """
     pattern_path = '//*[@id="main-content"]/pncp-item-detail/div/pncp-tab-set/div/pncp-tab[1]/div/div/pncp-table/div/ngx-datatable/div/datatable-body/datatable-selection/datatable-scroller'
-    wait = WebDriverWait(driver, 10)
-    items = []
     linha = 1
 
+    for _ in range(pular // ITENS_POR_PAGINA):
+        time.sleep(0.2)
+        if not next_items_page(driver):
+            print('Acabaram os itens')
+            return
+    pular %= ITENS_POR_PAGINA
+
     while True:
         time.sleep(0.2)
+        # Só a falta da linha ou da próxima página encerra a lista; os demais erros (navegador
+        # fechado, timeout no botão habilitado) sobem para que a licitação não seja dada como completa
         try:
             desc_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[2]/div/span'
-            desc = wait.until(EC.presence_of_element_located((By.XPATH, desc_path))).text
-            
-            quant_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[3]/div/span'
-            quant = wait.until(EC.presence_of_element_located((By.XPATH, quant_path))).text
+            desc = timeout_policy.wait_for(driver, 'item:descricao', (By.XPATH, desc_path), 10).text
+        except (TimeoutException, NoSuchElementException):
+            print('Acabaram os itens')
+            break
+        if snapshots is not None and linha == 1:
+            snapshots.append({'secao': 'itens', 'html': snapshot_tab(driver, 1)})
+        
+        quant_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[3]/div/span'
+        quant = timeout_policy.wait_for(driver, 'item:quantidade', (By.XPATH, quant_path), 10).text
 
-            valor_unit_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[4]/div/span'
-            valor_unit = wait.until(EC.presence_of_element_located((By.XPATH, valor_unit_path))).text
+        valor_unit_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[4]/div/span'
+        valor_unit = timeout_policy.wait_for(driver, 'item:valor_unitario', (By.XPATH, valor_unit_path), 10).text
 
-            valor_est_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[4]/div/span'
-            valor_est = wait.until(EC.presence_of_element_located((By.XPATH, valor_est_path))).text
+        valor_est_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[4]/div/span'
+        valor_est = timeout_policy.wait_for(driver, 'item:valor_total', (By.XPATH, valor_est_path), 10).text
 
-            linha += 1
+        linha += 1
 
-            item_data = {
-                'id_licitacao': id_licitacao,
-                'descricao': desc,
-                'quantidade': quant,
-                'valor_unitario_estimado': valor_unit,
-                'valor_total_estimado': valor_est
-            }
-            items.append(item_data)
+        if pular:
+            pular -= 1
+        else:
+            yield ItemRecord(desc, quant, valor_unit, valor_est)
 
-            if linha == 6:
-                scroll_down(driver)
-                button = wait.until(EC.element_to_be_clickable((By.XPATH, '//button[contains(@aria-label,"Ir para próxima página")]')))
-                button.click()
-                linha = 1
-                
-        except (TimeoutException, NoSuchElementException):
-            print('Acabaram os itens')
-            break
-        except Exception as e:
-            print('Erro ao processar item:', e)
-            break
+        if linha > ITENS_POR_PAGINA:
+            if not next_items_page(driver):
+                print('Acabaram os itens')
+                break
+            linha = 1
+
+def catch_bid_items(driver, snapshots=None) -> list:
+    """Pega todos os itens da licitação (e guarda o HTML de cada página em snapshots, se informado)"""
+    return list(iter_bid_items(driver, snapshots))
 
-    return items
+def save_items(db, licitacao_id, itens, gravados=0):
+    """Grava os itens em lotes de ITEM_FLUSH_SIZE à medida que chegam; retorna o total gravado da licitação"""
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= config.ITEM_FLUSH_SIZE:
+            if not db.insert_itens_parcial(licitacao_id, lote, gravados + len(lote)):
+                return None
+            gravados += len(lote)
+            lote = []
+    if lote:
+        if not db.insert_itens_parcial(licitacao_id, lote, gravados + len(lote)):
+            return None
+        gravados += len(lote)
+    return gravados
 
-def catch_bid_archs(driver, id_licitacao) -> list:
-    """Pega os editais da licitação"""
-    wait = WebDriverWait(driver, 10)
+def catch_bid_archs(driver, id_licitacao, snapshots=None) -> list:
+    """Pega os editais da licitação (e guarda o HTML de cada página em snapshots, se informado)"""
     pattern_path = '//*[@id="main-content"]/pncp-item-detail/div/pncp-tab-set/div/pncp-tab[2]/div/div/pncp-table/div/ngx-datatable/div/datatable-body/datatable-selection/datatable-scroller'
     linha = 1
     editais = []
@@ -99,14 +158,16 @@ def catch_bid_archs(driver, id_licitacao) -> list:
         time.sleep(0.5)
         try:
             tipo_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[3]/div/span'
-            tipo = wait.until(EC.presence_of_element_located((By.XPATH, tipo_path))).get_attribute('title')
+            tipo = timeout_policy.wait_for(driver, 'edital:tipo', (By.XPATH, tipo_path), 10).get_attribute('title')
+            if snapshots is not None and linha == 1:
+                snapshots.append({'secao': 'editais', 'html': snapshot_tab(driver, 2)})
             
             if tipo != 'Edital':
                 linha += 1
                 continue
             else:
                 edital_path = f'{pattern_path}/datatable-row-wrapper[{linha}]/datatable-body-row/div[2]/datatable-body-cell[4]/div/div/a'
-                edital_element = wait.until(EC.presence_of_element_located((By.XPATH, edital_path)))
+                edital_element = timeout_policy.wait_for(driver, 'edital:link', (By.XPATH, edital_path), 10)
                 edital = edital_element.get_attribute('href')
                 
                 if edital:
@@ -138,16 +199,31 @@ def catch_bid_archs(driver, id_licitacao) -> list:
     
     return editais
 
-def catch_bids_links(driver, termo) -> list:
-    """Busca links de licitações"""
+def open_search(driver, termo):
+    """Abre a busca de editais recebendo propostas com o termo informado"""
     driver.get("https://pncp.gov.br/app/editais?q=&status=recebendo_proposta&pagina=1")
     
-    input_camp = WebDriverWait(driver, 5).until(
-        EC.presence_of_element_located((By.XPATH, '//*[@id="keyword"]'))
-    )
+    input_camp = timeout_policy.wait_for(driver, 'busca:campo', (By.XPATH, '//*[@id="keyword"]'), 5)
     input_camp.send_keys(termo)
     input_camp.send_keys(Keys.ENTER)
 
+def catch_first_page_links(driver, termo) -> list:
+    """Retorna os links da primeira página de resultados do termo (as licitações mais recentes)"""
+    open_search(driver, termo)
+    results_path = '//*[@id="main-content"]/pncp-list/pncp-results-panel/pncp-tab-set/div/pncp-tab[1]/div/div[2]/div/div[2]/pncp-items-list/div/div'
+    
+    try:
+        timeout_policy.wait_for(driver, 'busca:resultado', (By.XPATH, f'{results_path}[1]/a'), 5)
+    except (TimeoutException, NoSuchElementException):
+        return []
+    
+    links = [a.get_attribute('href') for a in driver.find_elements(By.XPATH, f'{results_path}/a')]
+    return [link for link in links if link]
+
+def catch_bids_links(driver, termo) -> list:
+    """Busca links de licitações"""
+    open_search(driver, termo)
+
     licitacoes_extraidas = []
     pagina = 1
     i = 1
@@ -158,13 +234,9 @@ def catch_bids_links(driver, termo) -> list:
         data_hoje = datetime.today().strftime('%d/%m/%Y')
         
         try:
-            licitacao_a = WebDriverWait(driver, 5).until(          
-                EC.presence_of_element_located((By.XPATH, pattern_path))
-            )   
+            licitacao_a = timeout_policy.wait_for(driver, 'busca:resultado', (By.XPATH, pattern_path), 5)
             try: 
-                data_licitacao = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, data_licitacao_path))
-                ).text
+                data_licitacao = timeout_policy.wait_for(driver, 'busca:data', (By.XPATH, data_licitacao_path), 5).text
                 data_licitacao = data_licitacao.split(' ')[-1]
                 
                 if data_hoje == data_licitacao:
@@ -183,9 +255,7 @@ def catch_bids_links(driver, termo) -> list:
             print("Acabaram as licitações da página")
             try: 
                 scroll_down(driver)
-                button_page = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, f'//button[text()=" {pagina + 1} "]'))
-                )
+                button_page = timeout_policy.wait_for(driver, 'busca:pagina', (By.XPATH, f'//button[text()=" {pagina + 1} "]'), 5, EC.element_to_be_clickable)
                 button_page.click()
                 pagina += 1
                 i = 1
@@ -205,68 +275,78 @@ def catch_bids_links(driver, termo) -> list:
             
     return licitacoes_extraidas
 
-def process_licitacao(driver, url):
-    """Processa uma licitação completa"""
-    driver.get(url)
-    wait = WebDriverWait(driver, 10)
+def catch_header_information(driver, url, compra=None) -> dict:
+    """Monta os dados da licitação, usando o JSON da API quando capturado e o DOM para o que faltar"""
+    licitacao_data = build_licitacao_record(url, compra) if compra else {'url': url}
+
+    for campo, rotulo in CAMPOS_LICITACAO:
+        if not licitacao_data.get(campo):
+            licitacao_data[campo] = catch_especifique_information(driver, rotulo)
+
+    if not licitacao_data.get('objeto'):
+        licitacao_data['objeto'] = timeout_policy.wait_for(driver, 'Objeto:', (By.XPATH, "//strong[contains(., 'Objeto:')]/following::span[1]"), 10).text
+
+    return licitacao_data
+
+def process_licitacao(driver, url, navigate=True):
+    """Processa uma licitação completa (navigate=False quando a aba já está na URL)"""
+    if navigate:
+        driver.get(url)
     db = DatabaseManager()
 
+    # Respostas JSON da SPA capturadas pelo DevTools (vazio se a captura estiver desligada)
+    capture = get_network_capture(driver) if config.NETWORK_CAPTURE else None
+    api_data = capture.collect(url) if capture else {}
+
     # Informações da licitação
-    local = catch_especifique_information(driver, 'Local:')
-    orgao = catch_especifique_information(driver, 'Órgão:')
-    un_compradora = catch_especifique_information(driver, 'Unidade compradora:')
-    modalidade = catch_especifique_information(driver, 'Modalidade da contratação:')
-    amparo_legal = catch_especifique_information(driver, 'Amparo legal:')
-    tipo = catch_especifique_information(driver, 'Tipo:')
-    modo_disputa = catch_especifique_information(driver, 'Modo de disputa:')
-    registro_preco = catch_especifique_information(driver, 'Registro de preço:')
-    fonte_orc = catch_especifique_information(driver, 'Fonte orçamentária:')
-    data_divulg = catch_especifique_information(driver, 'Data de divulgação no PNCP:')
-    situacao = catch_especifique_information(driver, 'Situação:')
-    data_inicio_propostas = catch_especifique_information(driver, 'Data de início de recebimento de propostas:')
-    data_fim_propostas = catch_especifique_information(driver, 'Data fim de recebimento de propostas:')
-    id_contratacao_pncp = catch_especifique_information(driver, 'Id contratação PNCP:')
-    fonte = catch_especifique_information(driver, 'Fonte:')
-    objeto = wait.until(EC.presence_of_element_located((By.XPATH, "//strong[contains(., 'Objeto:')]/following::span[1]"))).text
-
-    # Preparar dados da licitação
-    licitacao_data = {
-        'id_contratacao_pncp': id_contratacao_pncp,
-        'url': url,
-        'local': local,
-        'orgao': orgao,
-        'unidade_compradora': un_compradora,
-        'modalidade': modalidade,
-        'amparo_legal': amparo_legal,
-        'tipo': tipo,
-        'modo_disputa': modo_disputa,
-        'registro_preco': registro_preco,
-        'fonte_orcamentaria': fonte_orc,
-        'data_divulgacao': data_divulg,
-        'situacao': situacao,
-        'data_inicio_propostas': data_inicio_propostas,
-        'data_fim_propostas': data_fim_propostas,
-        'fonte': fonte,
-        'objeto': objeto
-    }
-
-    # Inserir licitação no banco
-    licitacao_id = db.insert_licitacao(licitacao_data)
+    licitacao_data = catch_header_information(driver, url, api_data.get('compra'))
+    id_contratacao_pncp = licitacao_data['id_contratacao_pncp']
+
+    # HTML renderizado para o arquivo de páginas (re-processamento offline)
+    snapshots = [{'secao': 'detalhe', 'html': driver.page_source}] if config.PAGE_ARCHIVE else None
+
+    # Inserir licitação no banco, ou retomar uma que ficou com os itens pela metade
+    progresso = db.get_progresso_itens(id_contratacao_pncp)
+    if progresso:
+        licitacao_id, gravados = progresso
+        print(f"Retomando a licitação {id_contratacao_pncp} após {gravados} itens já gravados")
+    else:
+        licitacao_id, gravados = db.insert_licitacao(licitacao_data, em_progresso=True), 0
     
     if licitacao_id:
-        # Itens da licitação
-        itens = catch_bid_items(driver, id_contratacao_pncp)
-        print(f"Itens encontrados: {len(itens)}")
+        # Itens da licitação (da API quando a lista completa está disponível, senão pelo paginador),
+        # gravados em lotes enquanto são lidos
+        itens_api = capture.complete_items(api_data) if capture else None
+        if itens_api is not None:
+            itens = itertools.islice(build_item_records(itens_api), gravados, None)
+            api_data['itens'] = itens_api
+        else:
+            itens = iter_bid_items(driver, snapshots, pular=gravados)
+            api_data.pop('itens', None)
         
-        if itens:
-            db.insert_itens(licitacao_id, itens)
+        try:
+            total = save_items(db, licitacao_id, itens, gravados)
+        except Exception:
+            # Sem finish_licitacao: a linha de progresso fica e a próxima execução retoma
+            print(f"Leitura dos itens da licitação {id_contratacao_pncp} interrompida; a próxima execução retoma")
+            raise
+        if total is None:
+            print(f"Itens da licitação {id_contratacao_pncp} gravados em parte; a próxima execução retoma")
+            return
+        print(f"Itens encontrados: {total}")
         
         # Buscar editais
-        arquivos = catch_bid_archs(driver, id_contratacao_pncp)
+        if 'arquivos' in api_data:
+            arquivos = build_edital_records(id_contratacao_pncp, api_data['arquivos'])
+        else:
+            arquivos = catch_bid_archs(driver, id_contratacao_pncp, snapshots)
         print(f"Editais encontrados: {len(arquivos)}")
         
-        if arquivos:
-            db.insert_editais(licitacao_id, arquivos)
+        # Editais e fim do processamento dos itens na mesma transação
+        db.finish_licitacao(licitacao_id, arquivos)
+        
+        if snapshots is not None:
+            archive_licitacao(url, id_contratacao_pncp, api_data, snapshots)
         
         print(f"Licitação {id_contratacao_pncp} salva com sucesso!")
     else:
@@ -294,14 +374,30 @@ if __name__ == "__main__":
         else:
             print(f"Encontradas {len(licitacoes)} licitações")
             
-            # Processar cada licitação
-            for i, url in enumerate(licitacoes, 1):
-                try:
-                    print(f"\nProcessando licitação {i}/{len(licitacoes)}")
-                    process_licitacao(driver, url)
-                except Exception as e:
-                    print(f"Erro ao processar {url}: {e}")
-                    continue
+            # Fila ordenada pelo prazo de propostas dos cards da busca (os mais urgentes primeiro)
+            cards = get_network_capture(driver).collect_search() if config.NETWORK_CAPTURE else {}
+            fila = build_queue(licitacoes, cards, termo)
+            
+            if config.TABS_PER_BROWSER > 1:
+                # Vários navegadores, cada um com várias abas carregando em paralelo
+                processadas = run_tab_pool(
+                    fila,
+                    setup_driver,
+                    lambda tab_driver, url: process_licitacao(tab_driver, url, navigate=False)
+                )
+                print(f"{processadas}/{len(licitacoes)} licitações processadas em modo multi-abas")
+            else:
+                # Processar cada licitação
+                for i in range(1, len(licitacoes) + 1):
+                    url = fila.get_nowait()
+                    try:
+                        print(f"\nProcessando licitação {i}/{len(licitacoes)}")
+                        process_licitacao(driver, url)
+                    except Exception as e:
+                        print(f"Erro ao processar {url}: {e}")
+                        continue
+            
+            fila.report()
         
         print("\nProcessamento concluído!")
         
@@ -310,4 +406,5 @@ if __name__ == "__main__":
         import traceback
         traceback.print_exc()
     finally:
+        timeout_policy.save_stats()
         driver.quit()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Captura das respostas JSON da API do PNCP pelo log de performance do Chrome (DevTools)
+"""
+
+import json
+import math
+import re
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from selenium.common.exceptions import WebDriverException
+
+from config import config
+from database.database_config import ItemRecord, formatar_numero, formatar_valor
+
+# URL da página de detalhe: /app/editais/<cnpj>/<ano>/<sequencial>
+PAGE_URL_PATTERN = re.compile(r'/editais/(\d{14})/(\d{4})/(\d+)')
+
+# Endpoints da API chamados pela SPA ao abrir o detalhe
+API_URL_PATTERN = re.compile(r'/orgaos/(\d{14})/compras/(\d{4})/(\d+)(/itens|/arquivos)?(?:\?|$)')
+
+# Busca de editais chamada pela SPA a cada página de resultados e o link de cada card
+SEARCH_URL_PATTERN = re.compile(r'/api/search/')
+SEARCH_ITEM_PATTERN = re.compile(r'/compras/(\d{14})/(\d{4})/(\d+)')
+
+NOT_FOUND = 'Não encontrado'
+
+
+def compra_key(url):
+    """Retorna a chave (cnpj, ano, sequencial) de uma URL de página ou da API"""
+    match = PAGE_URL_PATTERN.search(url) or API_URL_PATTERN.search(url) or SEARCH_ITEM_PATTERN.search(url)
+    if not match:
+        return None
+    cnpj, ano, sequencial = match.group(1), match.group(2), match.group(3)
+    return cnpj, ano, str(int(sequencial))
+
+
+def enable_performance_logging(chrome_options):
+    """Habilita o log de performance (eventos de rede do DevTools) nas opções do Chrome"""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return chrome_options
+
+
+def _parse_datetime(value):
+    """Converte datas ISO da API para datetime sem fuso (com offset, vira o horário local); ValueError se inválida"""
+    parsed = datetime.fromisoformat(value.replace('Z', ''))
+    if parsed.tzinfo is not None:
+        # Comparável com datetime.now() na fila de prioridade e formatado no horário local
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _format_date(value, with_time=True):
+    """Converte datas ISO da API para o formato exibido na página (dd/mm/aaaa HH:MM)"""
+    if not value:
+        return None
+    try:
+        parsed = _parse_datetime(value)
+    except ValueError:
+        return value
+    return parsed.strftime('%d/%m/%Y %H:%M' if with_time else '%d/%m/%Y')
+
+
+def _format_quantity(value):
+    """Formata quantidades sem fixar as casas decimais (10, 2,5, 1.000,125)"""
+    number = formatar_numero(value, casas=4)
+    return number.rstrip('0').rstrip(',') if number is not None else None
+
+
+class NetworkCapture:
+    """Coleta os corpos das respostas JSON de cabeçalho, itens e arquivos de cada licitação"""
+
+    def __init__(self, driver, timeout=None):
+        self.driver = driver
+        self.timeout = timeout or config.NETWORK_CAPTURE_TIMEOUT
+        # Requisições vistas no log, por licitação: {key: {request_id: (tipo, url)}}
+        self.pending = {}
+        self.finished = set()
+        # Respostas já lidas, por licitação: {key: {'compra': {...}, 'itens': [...], 'arquivos': [...]}}
+        self.responses = {}
+
+    def drain(self):
+        """Lê os eventos de rede acumulados no log de performance"""
+        try:
+            entries = self.driver.get_log('performance')
+        except WebDriverException as e:
+            print(f"Erro ao ler log de performance: {e}")
+            return
+
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                if 'json' not in response.get('mimeType', ''):
+                    continue
+                url = response.get('url', '')
+                if SEARCH_URL_PATTERN.search(url):
+                    self.pending.setdefault('busca', {})[params['requestId']] = ('busca', url)
+                    continue
+                match = API_URL_PATTERN.search(url)
+                if not match:
+                    continue
+                kind = {'/itens': 'itens', '/arquivos': 'arquivos'}.get(match.group(4), 'compra')
+                self.pending.setdefault(compra_key(url), {})[params['requestId']] = (kind, url)
+
+            elif method == 'Network.loadingFinished':
+                # Só as respostas da API aguardadas; scripts, imagens e CSS da sessão não são guardados
+                request_id = params.get('requestId')
+                if any(request_id in requests for requests in self.pending.values()):
+                    self.finished.add(request_id)
+
+    def _forget(self, key):
+        """Descarta as requisições ainda pendentes da licitação e as marcas de concluída delas"""
+        self.finished.difference_update(self.pending.pop(key, {}))
+
+    def _read_bodies(self, key):
+        """Lê os corpos das respostas concluídas da licitação"""
+        pending = self.pending.get(key, {})
+        data = self.responses.setdefault(key, {})
+
+        for request_id, (kind, url) in list(pending.items()):
+            if request_id not in self.finished:
+                continue
+            try:
+                body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                payload = json.loads(body.get('body') or 'null')
+            except (WebDriverException, ValueError):
+                # Resposta de outra aba ou já descartada pelo navegador
+                continue
+            finally:
+                self.finished.discard(request_id)
+                pending.pop(request_id, None)
+
+            if kind == 'itens' and isinstance(payload, list):
+                data['itens_url'] = url
+                data.setdefault('itens', []).extend(payload)
+            elif kind == 'arquivos' and isinstance(payload, list):
+                data['arquivos'] = payload
+            elif kind == 'compra' and isinstance(payload, dict):
+                data['compra'] = payload
+            elif kind == 'busca' and isinstance(payload, dict):
+                data.setdefault('busca', []).extend(payload.get('items') or [])
+
+        return data
+
+    def collect(self, url):
+        """
+        Aguarda as respostas da API da licitação aberta na aba atual.
+
+        Retorna um dict com as chaves 'compra', 'itens' e 'arquivos' que chegaram a tempo.
+        """
+        key = compra_key(url)
+        if key is None:
+            return {}
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            self.drain()
+            data = self._read_bodies(key)
+            if {'compra', 'itens', 'arquivos'} <= data.keys() or time.monotonic() > deadline:
+                break
+            time.sleep(0.2)
+
+        self._forget(key)
+        return self.responses.pop(key, {})
+
+    def discard(self, url):
+        """Descarta as respostas da licitação quando elas não serão usadas"""
+        key = compra_key(url)
+        self.drain()
+        self._forget(key)
+        self.responses.pop(key, None)
+
+    def collect_search(self):
+        """
+        Dados dos cards das buscas feitas até agora na aba atual.
+
+        Retorna {chave da compra: {'prazo': datetime ou None, 'valor': float ou None}}.
+        """
+        self.drain()
+        self._read_bodies('busca')
+
+        cards = {}
+        for item in self.responses.pop('busca', {}).get('busca', []):
+            key = compra_key(item.get('item_url') or '')
+            if key is None:
+                continue
+            prazo = item.get('data_fim_vigencia')
+            try:
+                prazo = _parse_datetime(prazo) if prazo else None
+            except ValueError:
+                prazo = None
+            valor = item.get('valor_global')
+            cards[key] = {'prazo': prazo, 'valor': float(valor) if valor is not None else None}
+        return cards
+
+    def fetch_json(self, api_url):
+        """Busca um endpoint da API no contexto da página (mesma origem e cookies da SPA)"""
+        script = """
+            const done = arguments[arguments.length - 1];
+            fetch(arguments[0], {headers: {'Accept': 'application/json'}})
+                .then(r => r.ok ? r.json() : null)
+                .then(done)
+                .catch(() => done(null));
+        """
+        try:
+            return self.driver.execute_async_script(script, api_url)
+        except WebDriverException as e:
+            print(f"Erro ao buscar {api_url}: {e}")
+            return None
+
+    def fetch_json_many(self, api_urls):
+        """Busca vários endpoints ao mesmo tempo no contexto da página; respostas na mesma ordem (None nas falhas)"""
+        script = """
+            const done = arguments[arguments.length - 1];
+            Promise.all(arguments[0].map(url =>
+                fetch(url, {headers: {'Accept': 'application/json'}})
+                    .then(r => r.ok ? r.json() : null)
+                    .catch(() => null)
+            )).then(done);
+        """
+        try:
+            return self.driver.execute_async_script(script, list(api_urls))
+        except WebDriverException as e:
+            print(f"Erro ao buscar {len(api_urls)} endpoints: {e}")
+            return [None] * len(api_urls)
+
+    def fetch_item_pages(self, itens_url, total=None):
+        """
+        Busca todas as páginas de itens da API, várias ao mesmo tempo, e junta na ordem das páginas.
+
+        Com o total de itens conhecido, as páginas são divididas de antemão; sem ele, são pedidas em
+        levas de ITEM_PAGE_SHARDS até vir uma página incompleta. Retorna None se alguma página falhar.
+        """
+        page_size = config.NETWORK_CAPTURE_PAGE_SIZE
+        shards = max(1, config.ITEM_PAGE_SHARDS)
+        page_url = re.sub(r'tamanhoPagina=\d+', f'tamanhoPagina={page_size}', itens_url)
+        pages = math.ceil(total / page_size) if total else None
+
+        itens = []
+        pagina = 1
+        while pages is None or pagina <= pages:
+            last = pagina + shards - 1 if pages is None else min(pages, pagina + shards - 1)
+            urls = [re.sub(r'pagina=\d+', f'pagina={n}', page_url) for n in range(pagina, last + 1)]
+            payloads = self.fetch_json_many(urls)
+            for payload in payloads:
+                if not isinstance(payload, list):
+                    return None
+                itens.extend(payload)
+            if pages is None and any(len(payload) < page_size for payload in payloads):
+                break
+            pagina = last + 1
+
+        if total is not None and len(itens) != total:
+            print(f"Itens da API incompletos: {len(itens)} de {total}")
+            return None
+        return itens
+
+    def complete_items(self, data):
+        """
+        Garante a lista completa de itens: se a SPA trouxe só a primeira página, busca as demais na API.
+
+        O total de itens (/itens/quantidade) define quantas páginas pedir; licitações com milhares de itens
+        são baixadas em páginas paralelas em vez de percorrer o paginador da tela.
+        Retorna None se não for possível obter a lista completa (o chamador usa o DOM).
+        """
+        itens = data.get('itens')
+        itens_url = data.get('itens_url')
+        if itens is None or not itens_url:
+            return None
+
+        page_size = re.search(r'tamanhoPagina=(\d+)', itens_url)
+        if page_size is None or len(itens) < int(page_size.group(1)):
+            return itens
+
+        total = self.fetch_json(re.sub(r'/itens(\?.*)?$', '/itens/quantidade', itens_url))
+        if not isinstance(total, int) or isinstance(total, bool):
+            total = None
+        elif total <= len(itens):
+            return itens
+        return self.fetch_item_pages(itens_url, total)
+
+
+def build_licitacao_record(url, compra):
+    """Monta o registro da tabela licitacoes a partir do JSON da compra (campos ausentes ficam None)"""
+    unidade = compra.get('unidadeOrgao') or {}
+    orgao = compra.get('orgaoEntidade') or {}
+    amparo = compra.get('amparoLegal') or {}
+    fontes = compra.get('fontesOrcamentarias') or []
+    local = None
+    if unidade.get('municipioNome'):
+        local = f"{unidade['municipioNome']}/{unidade.get('ufSigla', '')}".rstrip('/')
+    srp = compra.get('srp')
+
+    return {
+        'id_contratacao_pncp': compra.get('numeroControlePNCP'),
+        'url': url,
+        'local': local,
+        'orgao': orgao.get('razaoSocial'),
+        'unidade_compradora': unidade.get('nomeUnidade'),
+        'modalidade': compra.get('modalidadeNome'),
+        'amparo_legal': amparo.get('nome'),
+        'tipo': compra.get('tipoInstrumentoConvocatorioNome'),
+        'modo_disputa': compra.get('modoDisputaNome'),
+        'registro_preco': None if srp is None else ('Sim' if srp else 'Não'),
+        'fonte_orcamentaria': ', '.join(f.get('nome', '') for f in fontes) or None,
+        'data_divulgacao': _format_date(compra.get('dataPublicacaoPncp'), with_time=False),
+        'situacao': compra.get('situacaoCompraNome'),
+        'data_inicio_propostas': _format_date(compra.get('dataAberturaProposta')),
+        'data_fim_propostas': _format_date(compra.get('dataEncerramentoProposta')),
+        'fonte': compra.get('usuarioNome'),
+        'objeto': compra.get('objetoCompra')
+    }
+
+
+def build_item_records(itens):
+    """Gera os registros de itens (ItemRecord) no mesmo formato de iter_bid_items, um a um"""
+    for item in itens:
+        yield ItemRecord(
+            item.get('descricao'),
+            _format_quantity(item.get('quantidade')),
+            formatar_valor(item.get('valorUnitarioEstimado')),
+            formatar_valor(item.get('valorTotal'))
+        )
+
+
+def build_edital_records(id_licitacao, arquivos):
+    """Monta os registros de editais no mesmo formato de catch_bid_archs"""
+    editais = []
+    for arquivo in arquivos:
+        tipo = arquivo.get('tipoDocumentoNome') or arquivo.get('tipoDocumentoDescricao')
+        link = arquivo.get('url') or arquivo.get('uri')
+        if tipo == 'Edital' and link:
+            editais.append({'id_licitacao': id_licitacao, 'edital': link})
+    return editais
+
+
+_captures = weakref.WeakKeyDictionary()
+_captures_lock = threading.Lock()
+
+
+def get_network_capture(driver):
+    """Retorna o coletor associado ao driver (um por navegador, compartilhado pelas abas)"""
+    with _captures_lock:
+        capture = _captures.get(driver)
+        if capture is None:
+            capture = NetworkCapture(driver)
+            _captures[driver] = capture
+        return capture
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Arquivo das páginas de detalhe capturadas e re-processamento offline das licitações
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from html.parser import HTMLParser
+
+from config import config
+from database.database_config import DatabaseManager, ItemRecord
+
+# Elementos HTML sem tag de fechamento
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# Campos do cabeçalho da licitação e seus rótulos na página de detalhe (lidos também por catch_header_information)
+CAMPOS_LICITACAO = [
+    ('local', 'Local:'),
+    ('orgao', 'Órgão:'),
+    ('unidade_compradora', 'Unidade compradora:'),
+    ('modalidade', 'Modalidade da contratação:'),
+    ('amparo_legal', 'Amparo legal:'),
+    ('tipo', 'Tipo:'),
+    ('modo_disputa', 'Modo de disputa:'),
+    ('registro_preco', 'Registro de preço:'),
+    ('fonte_orcamentaria', 'Fonte orçamentária:'),
+    ('data_divulgacao', 'Data de divulgação no PNCP:'),
+    ('situacao', 'Situação:'),
+    ('data_inicio_propostas', 'Data de início de recebimento de propostas:'),
+    ('data_fim_propostas', 'Data fim de recebimento de propostas:'),
+    ('id_contratacao_pncp', 'Id contratação PNCP:'),
+    ('fonte', 'Fonte:'),
+]
+
+# Colunas (base 0) das tabelas de detalhe, as mesmas lidas por catch_bid_items e catch_bid_archs
+ITEM_COLUMNS = {
+    'descricao': 1,
+    'quantidade': 2,
+    'valor_unitario_estimado': 3,
+    'valor_total_estimado': 3,
+}
+EDITAL_TYPE_COLUMN = 2
+EDITAL_LINK_COLUMN = 3
+
+
+class PageArchive:
+    """Armazena capturas de páginas comprimidas e endereçadas pelo SHA-256 do conteúdo"""
+
+    def __init__(self, root=None):
+        self.root = root or config.PAGE_ARCHIVE_DIR
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, sha256):
+        """Caminho do arquivo de uma captura"""
+        return os.path.join(self.root, sha256[:2], f"{sha256}.json.gz")
+
+    def store(self, payload):
+        """Grava a captura (se ainda não existir) e retorna seu SHA-256"""
+        content = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.path_for(sha256)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        return sha256
+
+    def load(self, sha256):
+        """Lê uma captura do arquivo"""
+        with gzip.open(self.path_for(sha256), 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+
+def archive_licitacao(url, id_contratacao_pncp, api_data, snapshots):
+    """Arquiva o JSON capturado e os snapshots HTML de uma licitação e registra no banco"""
+    payload = {
+        'url': url,
+        'id_contratacao_pncp': id_contratacao_pncp,
+        'capturado_em': datetime.now().isoformat(),
+        'json': api_data or {},
+        'html': snapshots
+    }
+    try:
+        sha256 = PageArchive().store(payload)
+        DatabaseManager().insert_pagina_arquivada(id_contratacao_pncp, url, sha256)
+        return sha256
+    except Exception as e:
+        print(f"Erro ao arquivar página de {url}: {e}")
+        return None
+
+
+class _Node:
+    """Elemento mínimo da árvore HTML"""
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def iter(self, tag=None):
+        """Percorre os descendentes em ordem de documento"""
+        for child in self.children:
+            if isinstance(child, _Node):
+                if tag is None or child.tag == tag:
+                    yield child
+                yield from child.iter(tag)
+
+    def text(self):
+        """Texto do elemento com espaços normalizados (como o .text do Selenium)"""
+        return ' '.join(''.join(self._texts()).split())
+
+    def _texts(self):
+        for child in self.children:
+            if isinstance(child, _Node):
+                yield from child._texts()
+            else:
+                yield child
+
+
+class _TreeBuilder(HTMLParser):
+    """Constrói uma árvore simples a partir do HTML renderizado"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node('#document', {}, None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, dict(attrs), self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(_Node(tag, dict(attrs), self.current))
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_html(html):
+    """Retorna a raiz da árvore do HTML"""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def _field_value(root, label):
+    """Equivalente a //strong[contains(., label)]/following-sibling::span"""
+    for strong in root.iter('strong'):
+        if label in strong.text():
+            siblings = strong.parent.children
+            for sibling in siblings[siblings.index(strong) + 1:]:
+                if isinstance(sibling, _Node) and sibling.tag == 'span':
+                    return sibling.text()
+            return None
+    return None
+
+
+def _following_span(root, label):
+    """Equivalente a //strong[contains(., label)]/following::span[1]"""
+    found = None
+    for node in root.iter():
+        if found is None:
+            if node.tag == 'strong' and label in node.text():
+                found = node
+        elif node.tag == 'span' and not _is_descendant(node, found):
+            return node.text()
+    return None
+
+
+def _is_descendant(node, ancestor):
+    while node is not None:
+        if node is ancestor:
+            return True
+        node = node.parent
+    return False
+
+
+def _table_rows(root):
+    """Retorna as linhas de ngx-datatable como listas de células"""
+    return [list(row.iter('datatable-body-cell')) for row in root.iter('datatable-body-row')]
+
+
+def _cell_span(cell):
+    return next(cell.iter('span'), None)
+
+
+def parse_header(html, url):
+    """Extrai o cabeçalho da licitação do HTML da página de detalhe"""
+    root = parse_html(html)
+    licitacao_data = {'url': url}
+    for campo, rotulo in CAMPOS_LICITACAO:
+        value = _field_value(root, rotulo)
+        licitacao_data[campo] = value if value is not None else f"{rotulo.replace(':', '')} Não encontrado"
+    licitacao_data['objeto'] = _following_span(root, 'Objeto:')
+    return licitacao_data
+
+
+def parse_items(html):
+    """Extrai os itens (ItemRecord) de um snapshot da aba de itens"""
+    items = []
+    for cells in _table_rows(parse_html(html)):
+        if len(cells) <= max(ITEM_COLUMNS.values()):
+            continue
+        item = {}
+        for campo, coluna in ITEM_COLUMNS.items():
+            span = _cell_span(cells[coluna])
+            item[campo] = span.text() if span is not None else cells[coluna].text()
+        items.append(ItemRecord(**item))
+    return items
+
+
+def parse_editais(html, id_licitacao):
+    """Extrai os links de edital de um snapshot da aba de arquivos"""
+    editais = []
+    for cells in _table_rows(parse_html(html)):
+        if len(cells) <= EDITAL_LINK_COLUMN:
+            continue
+        span = _cell_span(cells[EDITAL_TYPE_COLUMN])
+        if span is None or span.attrs.get('title') != 'Edital':
+            continue
+        link = next(cells[EDITAL_LINK_COLUMN].iter('a'), None)
+        if link is not None and link.attrs.get('href'):
+            editais.append({'id_licitacao': id_licitacao, 'edital': link.attrs['href']})
+    return editais
+
+
+def parse_capture(payload):
+    """Reconstrói (licitacao_data, itens, editais) de uma captura, com a mesma prioridade do scraper"""
+    from network_capture import build_licitacao_record, build_item_records, build_edital_records
+
+    url = payload['url']
+    api_data = payload.get('json') or {}
+    snapshots = payload.get('html') or []
+    detalhe = next((s['html'] for s in snapshots if s['secao'] == 'detalhe'), None)
+
+    licitacao_data = build_licitacao_record(url, api_data['compra']) if api_data.get('compra') else {'url': url}
+    if detalhe is not None:
+        for campo, value in parse_header(detalhe, url).items():
+            if not licitacao_data.get(campo):
+                licitacao_data[campo] = value
+
+    id_contratacao_pncp = licitacao_data.get('id_contratacao_pncp')
+
+    if api_data.get('itens') is not None:
+        itens = list(build_item_records(api_data['itens']))
+    else:
+        itens = [item for s in snapshots if s['secao'] == 'itens' for item in parse_items(s['html'])]
+
+    if 'arquivos' in api_data:
+        editais = build_edital_records(id_contratacao_pncp, api_data['arquivos'])
+    else:
+        editais = [edital for s in snapshots if s['secao'] == 'editais'
+                   for edital in parse_editais(s['html'], id_contratacao_pncp)]
+
+    return licitacao_data, itens, editais
+
+
+def _parse_archived(args):
+    """Tarefa do pool de processos: lê e interpreta uma captura"""
+    root, sha256 = args
+    try:
+        return sha256, parse_capture(PageArchive(root).load(sha256)), None
+    except Exception as e:
+        return sha256, None, str(e)
+
+
+def reparse_archive(workers=None, root=None, chunksize=16):
+    """
+    Reconstrói licitacoes, itens_licitacao e editais a partir do arquivo, sem acessar a rede.
+
+    A interpretação roda em um pool de processos; a gravação fica no processo principal.
+    """
+    db = DatabaseManager()
+    archive = PageArchive(root)
+    shas = db.get_latest_paginas_arquivadas()
+    total = len(shas)
+    print(f"Re-processando {total} capturas arquivadas")
+
+    started = time.monotonic()
+    saved = failed = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        tasks = ((archive.root, sha256) for sha256 in shas)
+        for sha256, records, error in pool.map(_parse_archived, tasks, chunksize=chunksize):
+            if records is None:
+                failed += 1
+                print(f"Erro ao interpretar captura {sha256}: {error}")
+                continue
+            if db.replace_licitacao(*records):
+                saved += 1
+            else:
+                failed += 1
+
+    elapsed = time.monotonic() - started
+    rate = saved / elapsed if elapsed else 0.0
+    print(f"{saved}/{total} licitações reconstruídas ({failed} falhas) em {elapsed:.1f}s - {rate:.1f}/s")
+    return saved
+
+
+if __name__ == "__main__":
+    print("="*60)
+    print("RE-PROCESSAMENTO OFFLINE DO ARQUIVO DE PÁGINAS")
+    print("="*60)
+    reparse_archive()
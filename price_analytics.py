@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Análise vetorizada dos preços unitários dos itens: mediana, quartis, outliers e tendência por grupo
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from config import config
+from database.database_config import DatabaseManager, formatar_valor, normalize_descricao
+
+# Agrupamentos além do próprio item (catálogo, com descrições agrupadas)
+DIMENSOES = ('item', 'uf', 'orgao')
+
+# Estatísticas de um grupo (item ou item + UF/órgão)
+EstatisticaPreco = namedtuple('EstatisticaPreco', [
+    'item', 'descricao', 'grupo', 'amostras', 'minimo', 'p25', 'mediana', 'p75', 'maximo',
+    'outliers', 'tendencia_mensal'
+])
+
+# Uma linha por item com preço: (item do catálogo, preço, órgão, local, mês)
+PRECOS_SQL = '''
+    SELECT COALESCE(c.grupo, c.id), i.preco_unitario, COALESCE(l.orgao_id, 0), COALESCE(l.local_id, 0),
+           CASE WHEN l.data_divulgacao GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+                THEN substr(l.data_divulgacao, 7, 4) * 12 + substr(l.data_divulgacao, 4, 2) - 1
+                ELSE strftime('%Y', i.data_captura) * 12 + strftime('%m', i.data_captura) - 1
+           END
+    FROM itens_dados i
+    JOIN descricoes_itens d ON d.id = i.descricao_id
+    JOIN catalogo_itens c ON c.id = d.id_catalogo
+    LEFT JOIN licitacoes_dados l ON l.id = i.id_licitacao
+    WHERE i.preco_unitario > 0
+'''
+
+
+def _percentile(sorted_values, starts, counts, q):
+    """Percentil q (interpolação linear, como np.percentile) de cada grupo já ordenado por preço"""
+    position = starts + q * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def compute_stats(keys, precos, meses, min_amostras=1):
+    """
+    Estatísticas de preço por chave de grupo, todas calculadas com operações vetorizadas.
+
+    Retorna um dict de arrays alinhados: chave, amostras, minimo, p25, mediana, p75, maximo,
+    outliers (fora de 1,5 IQR) e tendencia_mensal (inclinação da reta preço x mês, em % da mediana).
+    """
+    if len(keys) == 0:
+        return {name: np.empty(0) for name in ('chave', 'amostras', 'minimo', 'p25', 'mediana', 'p75',
+                                               'maximo', 'outliers', 'tendencia_mensal')}
+
+    # Ordena por preço e depois, de forma estável, por grupo: cada grupo vira uma fatia contígua e ordenada
+    order = np.argsort(precos)
+    order = order[np.argsort(keys[order], kind='stable')]
+    keys, precos, meses = keys[order], precos[order], meses[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+
+    p25 = _percentile(precos, starts, counts, 0.25)
+    mediana = _percentile(precos, starts, counts, 0.5)
+    p75 = _percentile(precos, starts, counts, 0.75)
+    iqr = p75 - p25
+    fora = (precos < np.repeat(p25 - 1.5 * iqr, counts)) | (precos > np.repeat(p75 + 1.5 * iqr, counts))
+
+    # Mínimos quadrados por grupo a partir das somas acumuladas
+    x = meses - meses.min()
+    sum_x = np.add.reduceat(x, starts)
+    sum_y = np.add.reduceat(precos, starts)
+    sum_xy = np.add.reduceat(x * precos, starts)
+    sum_xx = np.add.reduceat(x * x, starts)
+    denominador = counts * sum_xx - sum_x * sum_x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inclinacao = np.where(denominador > 0, (counts * sum_xy - sum_x * sum_y) / denominador, 0.0)
+        tendencia = np.where(mediana > 0, inclinacao / mediana * 100, 0.0)
+
+    ends = starts + counts - 1
+    selecionados = counts >= min_amostras
+    stats = {
+        'chave': keys[starts],
+        'amostras': counts,
+        'minimo': precos[starts],
+        'p25': p25,
+        'mediana': mediana,
+        'p75': p75,
+        'maximo': precos[ends],
+        'outliers': np.add.reduceat(fora.astype(np.int64), starts),
+        'tendencia_mensal': tendencia,
+    }
+    return {name: values[selecionados] for name, values in stats.items()}
+
+
+def compute_stats_naive(keys, precos, meses, min_amostras=1):
+    """Mesmas estatísticas de compute_stats com laços em Python (referência do benchmark)"""
+    grupos = defaultdict(list)
+    for key, preco, mes in zip(keys, precos, meses):
+        grupos[key].append((preco, mes))
+
+    def percentile(values, q):
+        position = q * (len(values) - 1)
+        low, high = int(position), min(int(position) + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (position - low)
+
+    base = min(meses) if len(meses) else 0
+    resultado = {}
+    for key, linhas in grupos.items():
+        if len(linhas) < min_amostras:
+            continue
+        valores = sorted(preco for preco, _ in linhas)
+        p25, mediana, p75 = percentile(valores, 0.25), percentile(valores, 0.5), percentile(valores, 0.75)
+        iqr = p75 - p25
+        outliers = sum(1 for v in valores if v < p25 - 1.5 * iqr or v > p75 + 1.5 * iqr)
+
+        n = len(linhas)
+        sum_x = sum_y = sum_xy = sum_xx = 0.0
+        for preco, mes in linhas:
+            x = mes - base
+            sum_x += x
+            sum_y += preco
+            sum_xy += x * preco
+            sum_xx += x * x
+        denominador = n * sum_xx - sum_x * sum_x
+        inclinacao = (n * sum_xy - sum_x * sum_y) / denominador if denominador > 0 else 0.0
+        tendencia = inclinacao / mediana * 100 if mediana > 0 else 0.0
+
+        resultado[key] = (n, valores[0], p25, mediana, p75, valores[-1], outliers, tendencia)
+    return resultado
+
+
+class PriceAnalytics:
+    """Carrega os preços tipados do banco em arrays e calcula estatísticas por item, UF ou órgão"""
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+        self._versao = None
+        self._arrays = None
+        self._cache = {}
+
+    def _load(self):
+        """Arrays de preços da versão atual dos dados (recarregados só quando o banco muda)"""
+        versao = self.db.get_versao_dados()
+        if versao == self._versao:
+            return self._arrays
+
+        started = time.monotonic()
+        cursor = self.db.get_read_connection().cursor()
+        cursor.execute(PRECOS_SQL)
+        lotes = []
+        while True:
+            rows = cursor.fetchmany(config.PRICE_LOAD_BATCH)
+            if not rows:
+                break
+            lotes.append(np.array(rows, dtype=np.float64))
+        dados = np.concatenate(lotes) if lotes else np.empty((0, 5))
+
+        # UF de cada local ("Cidade/UF"), como índice para agrupar
+        cursor.execute('SELECT id, nome FROM locais')
+        locais = cursor.fetchall()
+        ufs = sorted({nome.rsplit('/', 1)[-1].strip() for _, nome in locais if '/' in nome})
+        uf_index = {uf: i + 1 for i, uf in enumerate(ufs)}
+        uf_por_local = np.zeros(max((local_id for local_id, _ in locais), default=0) + 1, dtype=np.int64)
+        for local_id, nome in locais:
+            if '/' in nome:
+                uf_por_local[local_id] = uf_index[nome.rsplit('/', 1)[-1].strip()]
+
+        self._arrays = {
+            'item': dados[:, 0].astype(np.int64),
+            'preco': dados[:, 1],
+            'orgao': dados[:, 2].astype(np.int64),
+            'uf': uf_por_local[dados[:, 3].astype(np.int64)],
+            'mes': dados[:, 4],
+            'nomes_uf': [''] + ufs,
+        }
+        self._versao = versao
+        self._cache.clear()
+        print(f"{len(dados)} preços carregados em {time.monotonic() - started:.2f}s (versão {versao})")
+        return self._arrays
+
+    def _group_names(self, por):
+        """Nome de cada código da dimensão de agrupamento"""
+        if por == 'uf':
+            return dict(enumerate(self._arrays['nomes_uf']))
+        if por == 'orgao':
+            cursor = self.db.get_read_connection().cursor()
+            cursor.execute('SELECT id, nome FROM orgaos')
+            return dict(cursor.fetchall())
+        return {}
+
+    def _descricoes(self, itens):
+        """Descrição normalizada dos itens do catálogo"""
+        cursor = self.db.get_read_connection().cursor()
+        nomes = {}
+        itens = [int(item) for item in itens]
+        for i in range(0, len(itens), 500):
+            lote = itens[i:i + 500]
+            cursor.execute(
+                f"SELECT id, descricao_normalizada FROM catalogo_itens WHERE id IN ({', '.join('?' * len(lote))})",
+                lote
+            )
+            nomes.update(cursor.fetchall())
+        return nomes
+
+    def estatisticas(self, por='item', item=None, min_amostras=None):
+        """
+        Estatísticas de preço unitário por item do catálogo, ou por item e UF/órgão.
+
+        Args:
+            por: 'item', 'uf' ou 'orgao'
+            item: id do catálogo (representante do grupo) para limitar a um item
+            min_amostras: mínimo de preços no grupo (padrão: config.PRICE_MIN_SAMPLES)
+
+        Returns:
+            Lista de EstatisticaPreco ordenada pelo número de amostras
+        """
+        if por not in DIMENSOES:
+            raise ValueError(f"Agrupamento inválido: {por} (use {', '.join(DIMENSOES)})")
+        min_amostras = config.PRICE_MIN_SAMPLES if min_amostras is None else min_amostras
+
+        arrays = self._load()
+        cache_key = (self._versao, por, item, min_amostras)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        mask = arrays['item'] == item if item is not None else slice(None)
+        itens = arrays['item'][mask]
+        segundo = arrays[por][mask] if por != 'item' else np.zeros_like(itens)
+        fator = int(segundo.max()) + 1 if len(segundo) else 1
+        stats = compute_stats(itens * fator + segundo, arrays['preco'][mask], arrays['mes'][mask], min_amostras)
+
+        ordem = np.argsort(-stats['amostras'], kind='stable')
+        chaves = stats['chave'][ordem].astype(np.int64)
+        descricoes = self._descricoes(np.unique(chaves // fator))
+        nomes = self._group_names(por)
+
+        resultado = [
+            EstatisticaPreco(
+                item=int(chave // fator),
+                descricao=descricoes.get(int(chave // fator), ''),
+                grupo=nomes.get(int(chave % fator), '') if por != 'item' else '',
+                amostras=int(stats['amostras'][i]),
+                minimo=float(stats['minimo'][i]),
+                p25=float(stats['p25'][i]),
+                mediana=float(stats['mediana'][i]),
+                p75=float(stats['p75'][i]),
+                maximo=float(stats['maximo'][i]),
+                outliers=int(stats['outliers'][i]),
+                tendencia_mensal=float(stats['tendencia_mensal'][i]),
+            )
+            for chave, i in zip(chaves, ordem)
+        ]
+        self._cache[cache_key] = resultado
+        return resultado
+
+    def item_do_catalogo(self, descricao):
+        """Id do catálogo (representante do grupo) de uma descrição, ou None"""
+        cursor = self.db.get_read_connection().cursor()
+        cursor.execute(
+            'SELECT COALESCE(grupo, id) FROM catalogo_itens WHERE descricao_normalizada = ?',
+            (normalize_descricao(descricao),)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def _print_stats(resultado, limit=20):
+    """Mostra as estatísticas em formato de tabela"""
+    for stat in resultado[:limit]:
+        titulo = f"{stat.descricao} | {stat.grupo}" if stat.grupo else stat.descricao
+        print(titulo)
+        print(f"  {stat.amostras} preços | mediana {formatar_valor(stat.mediana)} "
+              f"(p25 {formatar_valor(stat.p25)}, p75 {formatar_valor(stat.p75)}) | "
+              f"faixa {formatar_valor(stat.minimo)} a {formatar_valor(stat.maximo)}")
+        print(f"  {stat.outliers} outliers | tendência {stat.tendencia_mensal:+.1f}% ao mês")
+        print("-" * 50)
+
+
+def report(descricao=None, por='item', min_amostras=None, limit=20):
+    """Mostra as estatísticas de preço de uma descrição de item, ou dos itens com mais preços"""
+    analytics = PriceAnalytics()
+    item = None
+    if descricao:
+        item = analytics.item_do_catalogo(descricao)
+        if item is None:
+            print(f"Descrição '{descricao}' não encontrada no catálogo.")
+            return []
+        min_amostras = 1 if min_amostras is None else min_amostras
+
+    resultado = analytics.estatisticas(por, item=item, min_amostras=min_amostras)
+    print(f"\nPreços unitários por {por}:")
+    print("="*80)
+    if not resultado:
+        print("Nenhum grupo com preços suficientes.")
+    _print_stats(resultado, limit)
+    return resultado
+
+
+def benchmark(rows=1_000_000, itens=20_000, seed=42):
+    """Compara compute_stats com a versão em laços de Python sobre dados sintéticos"""
+    print(f"Benchmark com {rows} preços de {itens} itens")
+    rng = np.random.default_rng(seed)
+    keys = rng.integers(0, itens, rows)
+    precos = np.round(rng.lognormal(4, 1, rows), 2)
+    meses = rng.integers(2023 * 12, 2026 * 12, rows).astype(np.float64)
+
+    # O laço recebe listas de Python, como viria de um cursor
+    keys_list, precos_list, meses_list = keys.tolist(), precos.tolist(), meses.tolist()
+    started = time.monotonic()
+    naive = compute_stats_naive(keys_list, precos_list, meses_list)
+    naive_elapsed = time.monotonic() - started
+
+    started = time.monotonic()
+    stats = compute_stats(keys, precos, meses)
+    vector_elapsed = time.monotonic() - started
+
+    # Confere que os dois caminhos chegam aos mesmos números
+    amostra = random.Random(seed).sample(range(len(stats['chave'])), min(1000, len(stats['chave'])))
+    for i in amostra:
+        esperado = naive[int(stats['chave'][i])]
+        obtido = (stats['amostras'][i], stats['minimo'][i], stats['p25'][i], stats['mediana'][i],
+                  stats['p75'][i], stats['maximo'][i], stats['outliers'][i], stats['tendencia_mensal'][i])
+        if not np.allclose(esperado, obtido):
+            raise AssertionError(f"Divergência no grupo {stats['chave'][i]}: {esperado} != {obtido}")
+
+    print(f"Laço Python: {naive_elapsed:.2f}s")
+    print(f"Vetorizado:  {vector_elapsed:.2f}s ({naive_elapsed / vector_elapsed:.1f}x mais rápido)")
+    return naive_elapsed, vector_elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estatísticas de preço unitário dos itens")
+    parser.add_argument('--buscar', help="Descrição do item para analisar")
+    parser.add_argument('--por', default='item', choices=DIMENSOES, help="Agrupamento além do item")
+    parser.add_argument('--minimo', type=int, help="Mínimo de preços por grupo")
+    parser.add_argument('--limite', type=int, default=20, help="Grupos mostrados")
+    parser.add_argument('--benchmark', type=int, metavar='LINHAS', help="Compara com laços Python em dados sintéticos")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        report(args.buscar, por=args.por, min_amostras=args.minimo, limit=args.limite)
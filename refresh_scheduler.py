@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Revalidação incremental das licitações abertas pelo marcador de última atualização da página
+"""
+
+import argparse
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+from config import config
+from database.database_config import DatabaseManager, ItemRecord
+from main import setup_driver, catch_header_information, catch_bid_items, catch_bid_archs
+from network_capture import get_network_capture, build_item_records, build_edital_records
+from timeout_policy import timeout_policy
+
+# Campos comparados para decidir se cada seção mudou
+ITEM_FIELDS = ItemRecord._fields
+
+
+def read_update_marker(driver):
+    """Texto de "Última atualização" da página de detalhe (o mesmo lido por EditalPNCPExtractor)"""
+    try:
+        element = timeout_policy.wait_for(driver, 'detalhe:atualizacao', (By.CLASS_NAME, 'dtAtualizacao'), 10)
+    except (TimeoutException, NoSuchElementException):
+        return None
+    return element.text.replace("Última atualização ", "").strip() or None
+
+
+def _normalize(value):
+    return '' if value is None else str(value).strip()
+
+
+class RefreshScheduler:
+    """Revisita as licitações abertas dentro de um orçamento de páginas por execução"""
+
+    def __init__(self, budget=None, min_age_hours=None):
+        self.budget = budget or config.REFRESH_BUDGET
+        self.min_age_hours = config.REFRESH_MIN_AGE_HOURS if min_age_hours is None else min_age_hours
+        self.db = DatabaseManager()
+        self.counts = {'inalterada': 0, 'licitacao_data': 0, 'itens': 0, 'editais': 0, 'sem_mudanca': 0, 'erro': 0}
+
+    def _stored_sections(self, licitacao_id):
+        """Cabeçalho, itens e editais gravados, no mesmo formato dos dados extraídos"""
+        fields = [campo for campo in self.db.LICITACAO_FIELDS if campo != 'url']
+        licitacao = next(self.db.iter_rows('licitacoes', fields, [('id', '=', licitacao_id)]), None)
+        itens = [tuple(_normalize(value) for value in item)
+                 for item in self.db.iter_itens_by_licitacao(licitacao_id, ITEM_FIELDS)]
+        editais = {edital.url_edital for edital in self.db.iter_editais_by_licitacao(licitacao_id, ['url_edital'])}
+        header = {campo: _normalize(getattr(licitacao, campo)) for campo in fields} if licitacao else {}
+        return header, itens, editais
+
+    def refresh_one(self, driver, licitacao_id, url, ultima_atualizacao):
+        """
+        Revalida uma licitação e retorna as seções gravadas (vazio se nada mudou).
+
+        Se o marcador de última atualização é o mesmo da verificação anterior, nada além dele é lido.
+        """
+        driver.get(url)
+        capture = get_network_capture(driver) if config.NETWORK_CAPTURE else None
+        marcador = read_update_marker(driver)
+
+        if marcador is not None and marcador == ultima_atualizacao:
+            if capture:
+                capture.discard(url)
+            self.db.refresh_licitacao(licitacao_id, marcador)
+            self.counts['inalterada'] += 1
+            return []
+
+        # Marcador mudou (ou primeira verificação): compara cada seção com o que está no banco
+        api_data = capture.collect(url) if capture else {}
+        header, itens, editais = self._stored_sections(licitacao_id)
+        changes = {}
+
+        licitacao_data = catch_header_information(driver, url, api_data.get('compra'))
+        if {campo: _normalize(licitacao_data.get(campo)) for campo in header} != header:
+            changes['licitacao_data'] = licitacao_data
+        id_contratacao_pncp = licitacao_data.get('id_contratacao_pncp')
+
+        # Itens e arquivos vêm do JSON da API quando capturados; o DOM paginado só como alternativa
+        itens_api = capture.complete_items(api_data) if capture else None
+        novos_itens = (list(build_item_records(itens_api)) if itens_api is not None
+                       else catch_bid_items(driver))
+        if [tuple(_normalize(value) for value in item) for item in novos_itens] != itens:
+            changes['itens'] = novos_itens
+
+        novos_editais = (build_edital_records(id_contratacao_pncp, api_data['arquivos']) if 'arquivos' in api_data
+                         else catch_bid_archs(driver, id_contratacao_pncp))
+        if {edital.get('edital') for edital in novos_editais} != editais:
+            changes['editais'] = novos_editais
+
+        if not self.db.refresh_licitacao(licitacao_id, marcador, **changes):
+            self.counts['erro'] += 1
+            return []
+
+        for secao in changes:
+            self.counts[secao] += 1
+        if not changes:
+            self.counts['sem_mudanca'] += 1
+        return list(changes)
+
+    def run(self):
+        """Revalida as licitações abertas mais urgentes até esgotar o orçamento"""
+        candidates = self.db.get_licitacoes_abertas(self.budget, self.min_age_hours, config.REFRESH_CLOSED_SITUATIONS)
+        print(f"{len(candidates)} licitações abertas para revalidar (orçamento {self.budget})")
+        if not candidates:
+            return self.counts
+
+        started = time.monotonic()
+        driver = setup_driver()
+        try:
+            for i, (licitacao_id, url, id_contratacao_pncp, ultima_atualizacao) in enumerate(candidates, 1):
+                try:
+                    secoes = self.refresh_one(driver, licitacao_id, url, ultima_atualizacao)
+                    if secoes:
+                        print(f"[{i}/{len(candidates)}] {id_contratacao_pncp}: atualizada ({', '.join(secoes)})")
+                except Exception as e:
+                    self.counts['erro'] += 1
+                    print(f"Erro ao revalidar {url}: {e}")
+        finally:
+            timeout_policy.save_stats()
+            driver.quit()
+
+        elapsed = time.monotonic() - started
+        print(f"Revalidação em {elapsed:.1f}s: {self.counts['inalterada']} sem nova atualização, "
+              f"{self.counts['sem_mudanca']} atualizadas sem mudança nos dados, "
+              f"{self.counts['licitacao_data']} cabeçalhos, {self.counts['itens']} listas de itens e "
+              f"{self.counts['editais']} listas de editais regravadas, {self.counts['erro']} erros")
+        return self.counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revalida as licitações abertas já armazenadas")
+    parser.add_argument('--orcamento', type=int, help="Máximo de páginas de detalhe abertas nesta execução")
+    parser.add_argument('--idade', type=int, help="Horas mínimas desde a última verificação")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("REVALIDAÇÃO DE LICITAÇÕES ABERTAS")
+    print("="*60)
+    RefreshScheduler(budget=args.orcamento, min_age_hours=args.idade).run()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Benchmark da camada de armazenamento (DatabaseManager) com dados sintéticos em várias escalas
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import config
+from database.database_config import DatabaseManager, ItemRecord, formatar_valor
+
+# Vocabulário dos dados sintéticos
+PRODUTOS = [
+    'PULVERIZADOR COSTAL', 'TRATOR AGRICOLA', 'ROCADEIRA', 'MOTOSSERRA', 'FERTILIZANTE NPK',
+    'SEMENTE DE MILHO', 'CALCARIO DOLOMITICO', 'MANGUEIRA DE IRRIGACAO', 'ASPERSOR', 'ENXADA',
+    'CARRETA AGRICOLA', 'GRADE ARADORA', 'PLANTADEIRA', 'ADUBO ORGANICO', 'HERBICIDA',
+    'PAPEL A4', 'CANETA ESFEROGRAFICA', 'COMPUTADOR', 'CADEIRA', 'PNEU', 'OLEO DIESEL',
+    'CIMENTO', 'TINTA ACRILICA', 'LUVA DE PROCEDIMENTO', 'DIPIRONA', 'ARROZ', 'FEIJAO',
+]
+DETALHES = ['MANUAL', 'MOTORIZADO', 'ELETRICO', 'REFORCADO', 'INDUSTRIAL', 'PREMIUM', 'NACIONAL', 'IMPORTADO']
+MEDIDAS = ['20 LITROS', '5 KG', '50 KG', '1 L', '100 UN', '2 M', '500 ML', '10 UN', '25 KG', '1 TON']
+UFS = ['RS', 'SC', 'PR', 'SP', 'MG', 'GO', 'MT', 'MS', 'BA', 'PE', 'CE', 'PA', 'TO', 'RO', 'ES', 'RJ']
+MODALIDADES = ['Pregão - Eletrônico', 'Dispensa', 'Concorrência - Eletrônica', 'Inexigibilidade', 'Pregão - Presencial']
+SITUACOES = ['Divulgada no PNCP'] * 8 + ['Suspensa', 'Revogada']
+FONTES = ['Compras.gov.br', 'BLL Compras', 'Licitanet', 'ECustomize Consultoria em Software S.A']
+
+
+class DataGenerator:
+    """
+    Gera licitações, itens e editais no mesmo formato extraído pelo scraper.
+
+    A licitação de número n é sempre a mesma para a mesma semente, em qualquer ordem de geração.
+    """
+
+    def __init__(self, seed=42, max_itens=2000, orgaos=5000):
+        self.seed = seed
+        self.max_itens = max_itens
+        rng = random.Random(seed)
+        self.orgaos = [
+            (f"{rng.randrange(10**13, 10**14):014d}", f"MUNICIPIO {i}", f"Cidade {i}/{rng.choice(UFS)}")
+            for i in range(orgaos)
+        ]
+        self.descricoes = [
+            f"{produto} {detalhe} {medida}"
+            for produto in PRODUTOS for detalhe in DETALHES for medida in MEDIDAS
+        ]
+
+    def n_itens(self, rng):
+        """Número de itens: quase sempre poucos, às vezes milhares (mediana 10, máximo max_itens)"""
+        return max(1, min(self.max_itens, int(rng.lognormvariate(2.3, 1.1))))
+
+    def registro(self, n):
+        """Retorna (licitacao_data, itens, editais) da licitação de número n"""
+        rng = random.Random(self.seed * 1_000_003 + n)
+        cnpj, orgao, local = rng.choice(self.orgaos)
+        divulgacao = datetime(2023, 1, 1) + timedelta(days=rng.randrange(1000))
+        ano = divulgacao.year
+        inicio = divulgacao + timedelta(days=1, hours=rng.randrange(8, 18))
+        fim = inicio + timedelta(days=rng.randrange(5, 30))
+        produtos = rng.sample(PRODUTOS, 2)
+
+        licitacao_data = {
+            'id_contratacao_pncp': f"{cnpj}-1-{n:06d}/{ano}",
+            'url': f"https://pncp.gov.br/app/editais/{cnpj}/{ano}/{n}",
+            'local': local,
+            'orgao': orgao,
+            'unidade_compradora': f"{rng.randrange(1, 20)} - SECRETARIA MUNICIPAL {rng.randrange(1, 10)}",
+            'modalidade': rng.choice(MODALIDADES),
+            'amparo_legal': 'Lei 14.133/2021, Art. 28, I',
+            'tipo': 'Edital',
+            'modo_disputa': 'Aberto',
+            'registro_preco': rng.choice(['Sim', 'Não']),
+            'fonte_orcamentaria': 'Não informada',
+            'data_divulgacao': divulgacao.strftime('%d/%m/%Y'),
+            'situacao': rng.choice(SITUACOES),
+            'data_inicio_propostas': inicio.strftime('%d/%m/%Y %H:%M') + ' (horário de Brasília)',
+            'data_fim_propostas': fim.strftime('%d/%m/%Y %H:%M') + ' (horário de Brasília)',
+            'fonte': rng.choice(FONTES),
+            'objeto': f"REGISTRO DE PREÇOS PARA FUTURA E EVENTUAL AQUISIÇÃO DE {produtos[0]} E {produtos[1]} "
+                      f"PARA ATENDER AS SECRETARIAS DO {orgao}",
+        }
+
+        itens = []
+        for _ in range(self.n_itens(rng)):
+            quantidade = rng.randrange(1, 500)
+            unitario = round(rng.lognormvariate(4, 1.2), 2)
+            itens.append(ItemRecord(
+                rng.choice(self.descricoes),
+                str(quantidade),
+                formatar_valor(unitario),
+                formatar_valor(unitario * quantidade),
+            ))
+
+        editais = [
+            {'id_licitacao': licitacao_data['id_contratacao_pncp'],
+             'edital': f"https://pncp.gov.br/pncp-api/v1/orgaos/{cnpj}/compras/{ano}/{n}/arquivos/{arquivo}"}
+            for arquivo in range(1, rng.randrange(1, 4) + 1)
+        ]
+        return licitacao_data, itens, editais
+
+
+@contextlib.contextmanager
+def _silencioso():
+    """Cala os prints de cada inserção do DatabaseManager durante as medições"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _latencias(amostras):
+    """Resumo das latências em milissegundos"""
+    ordenadas = sorted(amostras)
+
+    def percentil(p):
+        return ordenadas[min(len(ordenadas) - 1, int(p / 100 * len(ordenadas)))] * 1000
+
+    return {
+        'n': len(ordenadas),
+        'media_ms': sum(ordenadas) / len(ordenadas) * 1000,
+        'p50_ms': percentil(50),
+        'p95_ms': percentil(95),
+        'p99_ms': percentil(99),
+        'max_ms': ordenadas[-1] * 1000,
+    }
+
+
+def _size_mb(path):
+    total = sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+    return total / 1024 / 1024
+
+
+def _open_database(path):
+    """DatabaseManager apontando para o arquivo indicado (a instância única é recriada)"""
+    DatabaseManager.reset_instance()
+    with _silencioso():
+        return DatabaseManager(path)
+
+
+def _checkpoint(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        conn.close()
+
+
+def preparar_base(escala, gerador, diretorio):
+    """
+    Gera (ou reaproveita) o banco sintético com `escala` licitações e retorna (caminho, métricas da carga).
+
+    A carga usa replace_licitacao, uma transação por licitação com itens e editais.
+    """
+    base_dir = os.path.join(diretorio, f"base_{escala}_{gerador.seed}")
+    path = os.path.join(base_dir, 'licitacoes.db')
+    pronto = os.path.join(base_dir, 'carga.json')
+    if os.path.exists(pronto):
+        with open(pronto, 'r', encoding='utf-8') as f:
+            return path, json.load(f)
+
+    shutil.rmtree(base_dir, ignore_errors=True)
+    db = _open_database(path)
+    print(f"Gerando banco sintético com {escala} licitações em {base_dir}...")
+    started = time.monotonic()
+    itens = 0
+    for n in range(escala):
+        licitacao_data, itens_licitacao, editais = gerador.registro(n)
+        db.replace_licitacao(licitacao_data, itens_licitacao, editais)
+        itens += len(itens_licitacao)
+        if (n + 1) % 10000 == 0:
+            elapsed = time.monotonic() - started
+            print(f"  {n + 1}/{escala} licitações ({(n + 1) / elapsed:.0f}/s)")
+    elapsed = time.monotonic() - started
+
+    DatabaseManager.reset_instance()
+    _checkpoint(path)
+    carga = {
+        'licitacoes': escala,
+        'itens': itens,
+        'segundos': elapsed,
+        'licitacoes_por_s': escala / elapsed,
+        'itens_por_s': itens / elapsed,
+        'tamanho_mb': _size_mb(path),
+    }
+    with open(pronto, 'w', encoding='utf-8') as f:
+        json.dump(carga, f, indent=2)
+    return path, carga
+
+
+def medir_escrita(db, threads, registros):
+    """Insere os registros com `threads` escritoras pelo caminho do scraper (licitação, itens, editais)"""
+    latencias = []
+    latencias_lock = threading.Lock()
+
+    def escritora(parte):
+        locais = []
+        for licitacao_data, itens, editais in parte:
+            started = time.perf_counter()
+            licitacao_id = db.insert_licitacao(licitacao_data)
+            db.insert_itens(licitacao_id, itens)
+            db.insert_editais(licitacao_id, editais)
+            locais.append(time.perf_counter() - started)
+        with latencias_lock:
+            latencias.extend(locais)
+
+    partes = [registros[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=escritora, args=(parte,)) for parte in partes]
+    with _silencioso():
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+
+    itens = sum(len(itens) for _, itens, _ in registros)
+    return {
+        'threads': threads,
+        'licitacoes': len(registros),
+        'segundos': elapsed,
+        'licitacoes_por_s': len(registros) / elapsed,
+        'itens_por_s': itens / elapsed,
+        'latencia_licitacao': _latencias(latencias),
+    }
+
+
+def _medir(funcao, argumentos):
+    """Chama a função com cada argumento e retorna as latências"""
+    amostras = []
+    for argumento in argumentos:
+        started = time.perf_counter()
+        funcao(argumento)
+        amostras.append(time.perf_counter() - started)
+    return _latencias(amostras)
+
+
+def medir_leitura(db, consultas, rng):
+    """Latência das consultas por ID do PNCP, dos itens, da busca textual e das estatísticas"""
+    cursor = db.get_read_connection().cursor()
+    cursor.execute('SELECT MAX(id) FROM licitacoes_dados')
+    max_id = cursor.fetchone()[0] or 0
+    ids = [rng.randint(1, max_id) for _ in range(consultas)]
+    cursor.execute(f'SELECT id_contratacao_pncp FROM licitacoes_dados WHERE id IN ({",".join("?" * len(set(ids)))})',
+                   list(set(ids)))
+    pncp_ids = [row[0] for row in cursor.fetchall()]
+    pncp_ids = [rng.choice(pncp_ids) for _ in range(consultas)]
+    termos = [rng.choice(PRODUTOS).split()[0].lower() for _ in range(max(1, consultas // 10))]
+
+    return {
+        'get_licitacao_by_pncp_id': _medir(db.get_licitacao_by_pncp_id, pncp_ids),
+        'get_itens_by_licitacao': _medir(db.get_itens_by_licitacao, ids),
+        'search_text': _medir(db.search_text, termos),
+        'get_database_stats': _medir(lambda _: db.get_database_stats(), range(consultas)),
+        'get_estatisticas_por': _medir(lambda dimensao: db.get_estatisticas_por(dimensao, limit=10),
+                                       [('orgao', 'modalidade', 'dia')[i % 3] for i in range(consultas)]),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(escalas=None, threads=None, escritas=None, consultas=None, seed=42, max_itens=2000, diretorio=None):
+    """Executa o benchmark em cada escala e grava os resultados em JSON; retorna o caminho do arquivo"""
+    escalas = escalas or config.BENCHMARK_SCALES
+    threads = threads or config.BENCHMARK_WRITER_THREADS
+    escritas = escritas or config.BENCHMARK_WRITES
+    consultas = consultas or config.BENCHMARK_LOOKUPS
+    diretorio = diretorio or config.BENCHMARK_DIR
+    gerador = DataGenerator(seed, max_itens)
+
+    resultados = {
+        'data': datetime.now().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'seed': seed,
+        'max_itens': max_itens,
+        'escalas': {},
+    }
+
+    for escala in escalas:
+        base, carga = preparar_base(escala, gerador, diretorio)
+
+        # Cada execução trabalha numa cópia: as escritas medidas não alteram a base reaproveitada
+        work_dir = os.path.join(diretorio, 'execucao')
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        path = os.path.join(work_dir, 'licitacoes.db')
+        shutil.copyfile(base, path)
+        db = _open_database(path)
+        print(f"\nEscala {escala}: {carga['itens']} itens, {carga['tamanho_mb']:.1f} MB "
+              f"(carga a {carga['licitacoes_por_s']:.0f} licitações/s)")
+
+        escrita = []
+        proximo = escala
+        for n_threads in threads:
+            registros = [gerador.registro(n) for n in range(proximo, proximo + escritas)]
+            proximo += escritas
+            medida = medir_escrita(db, n_threads, registros)
+            escrita.append(medida)
+            print(f"  Escrita, {n_threads} threads: {medida['licitacoes_por_s']:.0f} licitações/s, "
+                  f"{medida['itens_por_s']:.0f} itens/s, p95 {medida['latencia_licitacao']['p95_ms']:.1f} ms")
+
+        leitura = medir_leitura(db, consultas, random.Random(seed))
+        for nome, medida in leitura.items():
+            print(f"  {nome}: p50 {medida['p50_ms']:.2f} ms | p95 {medida['p95_ms']:.2f} ms | "
+                  f"p99 {medida['p99_ms']:.2f} ms")
+
+        resultados['escalas'][str(escala)] = {'carga': carga, 'escrita': escrita, 'leitura': leitura}
+        DatabaseManager.reset_instance()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.join(diretorio, 'resultados'), exist_ok=True)
+    arquivo = os.path.join(diretorio, 'resultados', f"storage_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {arquivo}")
+    return arquivo
+
+
+def _metricas(resultados):
+    """Achata os resultados em {nome da métrica: (valor, maior é melhor)}"""
+    metricas = {}
+    for escala, dados in resultados['escalas'].items():
+        for medida in dados['escrita']:
+            metricas[f"{escala} escrita {medida['threads']} threads (licitações/s)"] = (medida['licitacoes_por_s'], True)
+        for nome, medida in dados['leitura'].items():
+            metricas[f"{escala} {nome} p95 (ms)"] = (medida['p95_ms'], False)
+    return metricas
+
+
+def comparar(anterior, atual):
+    """Compara dois arquivos de resultados, métrica a métrica"""
+    with open(anterior, 'r', encoding='utf-8') as f:
+        antes = _metricas(json.load(f))
+    with open(atual, 'r', encoding='utf-8') as f:
+        depois = _metricas(json.load(f))
+
+    print(f"\n{anterior} -> {atual}")
+    print("="*80)
+    for nome, (valor, maior_melhor) in depois.items():
+        if nome not in antes or not antes[nome][0]:
+            continue
+        razao = valor / antes[nome][0]
+        melhorou = razao > 1 if maior_melhor else razao < 1
+        print(f"{nome}: {antes[nome][0]:.2f} -> {valor:.2f} ({razao:.2f}x, {'melhor' if melhorou else 'pior'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do DatabaseManager com dados sintéticos")
+    parser.add_argument('--escalas', help="Licitações por banco, separadas por vírgula (padrão: BENCHMARK_SCALES)")
+    parser.add_argument('--threads', help="Threads escritoras, separadas por vírgula")
+    parser.add_argument('--escritas', type=int, help="Licitações inseridas em cada medição de escrita")
+    parser.add_argument('--consultas', type=int, help="Consultas em cada medição de leitura")
+    parser.add_argument('--seed', type=int, default=42, help="Semente dos dados sintéticos")
+    parser.add_argument('--max-itens', type=int, default=2000, help="Máximo de itens por licitação")
+    parser.add_argument('--comparar', metavar='ANTERIOR', help="Compara o resultado desta execução com um anterior")
+    args = parser.parse_args()
+
+    arquivo = run(
+        escalas=[int(e) for e in args.escalas.split(',')] if args.escalas else None,
+        threads=[int(t) for t in args.threads.split(',')] if args.threads else None,
+        escritas=args.escritas,
+        consultas=args.consultas,
+        seed=args.seed,
+        max_itens=args.max_itens,
+    )
+    if args.comparar:
+        comparar(args.comparar, arquivo)
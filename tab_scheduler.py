@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Escalonador de abas para processar várias licitações em um único processo do Chrome
+"""
+
+import queue
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+from config import config
+
+
+class TabScheduler:
+    """Distribui URLs entre várias abas de um mesmo driver, sobrepondo os carregamentos"""
+
+    def __init__(self, driver, tabs=None, ready_xpath=None, poll_interval=None, load_timeout=None):
+        self.driver = driver
+        self.tabs = tabs or config.TABS_PER_BROWSER
+        self.ready_xpath = ready_xpath or config.TAB_READY_XPATH
+        self.poll_interval = poll_interval or config.TAB_POLL_INTERVAL
+        self.load_timeout = load_timeout or config.PAGE_LOAD_TIMEOUT
+        self.processed = 0
+        self.failed = 0
+
+    def _open_tabs(self):
+        """Abre as abas de trabalho e retorna seus handles"""
+        handles = [self.driver.current_window_handle]
+        while len(handles) < self.tabs:
+            self.driver.switch_to.new_window('tab')
+            handles.append(self.driver.current_window_handle)
+        return handles
+
+    def _close_tabs(self, handles):
+        """Fecha as abas extras e volta para a aba original"""
+        for handle in handles[1:]:
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except WebDriverException:
+                pass
+        self.driver.switch_to.window(handles[0])
+
+    def _start_load(self, handle, url):
+        """Inicia o carregamento da URL na aba sem esperar o fim da navegação"""
+        self.driver.switch_to.window(handle)
+        self.driver.execute_script("window.location.href = arguments[0];", url)
+
+    def _is_ready(self, handle):
+        """Verifica se a página da aba já renderizou o conteúdo esperado"""
+        self.driver.switch_to.window(handle)
+        if self.driver.execute_script("return document.readyState") != 'complete':
+            return False
+        return bool(self.driver.find_elements(By.XPATH, self.ready_xpath))
+
+    @staticmethod
+    def _next_url(urls):
+        """Retira a próxima URL da fila sem bloquear"""
+        try:
+            return urls.get_nowait()
+        except queue.Empty:
+            return None
+
+    def run(self, urls, handler):
+        """
+        Processa as URLs da fila chamando handler(driver, url) na aba já carregada.
+
+        Enquanto uma aba é processada, as demais continuam carregando em segundo plano.
+        """
+        handles = self._open_tabs()
+        slots = {handle: None for handle in handles}
+
+        try:
+            while True:
+                # Preenche as abas livres com novas URLs
+                for handle, slot in slots.items():
+                    if slot is None:
+                        url = self._next_url(urls)
+                        if url is not None:
+                            self._start_load(handle, url)
+                            slots[handle] = (url, time.monotonic())
+
+                if all(slot is None for slot in slots.values()):
+                    break
+
+                progressed = False
+                for handle, slot in slots.items():
+                    if slot is None:
+                        continue
+
+                    url, started = slot
+                    expired = time.monotonic() - started > self.load_timeout
+                    try:
+                        ready = self._is_ready(handle)
+                    except WebDriverException:
+                        ready = False
+
+                    if not ready and not expired:
+                        continue
+
+                    if expired and not ready:
+                        print(f"Timeout de carregamento na aba, processando mesmo assim: {url}")
+
+                    try:
+                        handler(self.driver, url)
+                        self.processed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"Erro ao processar {url}: {e}")
+
+                    # Reaproveita a aba imediatamente para a próxima URL
+                    slots[handle] = None
+                    url = self._next_url(urls)
+                    if url is not None:
+                        self._start_load(handle, url)
+                        slots[handle] = (url, time.monotonic())
+                    progressed = True
+
+                if not progressed:
+                    time.sleep(self.poll_interval)
+        finally:
+            self._close_tabs(handles)
+
+        return self.processed
+
+
+def run_tab_pool(urls, driver_factory, handler, browsers=None, tabs_per_browser=None):
+    """
+    Processa as URLs (lista ou fila) com vários navegadores, cada um controlando várias abas.
+
+    Retorna o total de licitações processadas com sucesso.
+    """
+    browsers = browsers or config.MAX_WORKERS
+    if hasattr(urls, 'get_nowait'):
+        # Fila já montada (ex.: BidPriorityQueue), consumida na ordem dela
+        url_queue = urls
+    else:
+        url_queue = queue.Queue()
+        for url in urls:
+            url_queue.put(url)
+
+    browsers = max(1, min(browsers, url_queue.qsize()))
+    results = []
+    results_lock = threading.Lock()
+
+    def worker():
+        driver = driver_factory()
+        try:
+            scheduler = TabScheduler(driver, tabs=tabs_per_browser)
+            processed = scheduler.run(url_queue, handler)
+            with results_lock:
+                results.append(processed)
+        finally:
+            driver.quit()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(browsers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sum(results)
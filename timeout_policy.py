@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Política de timeouts aprendidos por seletor para as esperas do scraper
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+from config import config
+
+
+class TimeoutPolicy:
+    """Registra latência e presença de cada seletor e calcula o timeout de cada espera"""
+
+    def __init__(self, stats_file=None, margin=None, min_samples=None, min_timeout=None,
+                 fail_fast_timeout=None, absent_rate=None, max_samples=None, decay=None,
+                 probe_every=None, full_keys=None):
+        self.stats_file = stats_file or config.TIMEOUT_STATS_FILE
+        self.margin = margin or config.TIMEOUT_MARGIN
+        self.min_samples = min_samples or config.TIMEOUT_MIN_SAMPLES
+        self.min_timeout = min_timeout or config.TIMEOUT_MIN
+        self.fail_fast_timeout = fail_fast_timeout or config.TIMEOUT_FAIL_FAST
+        self.absent_rate = absent_rate if absent_rate is not None else config.TIMEOUT_ABSENT_RATE
+        self.max_samples = max_samples or config.TIMEOUT_MAX_SAMPLES
+        self.decay = decay or config.TIMEOUT_DECAY
+        self.probe_every = probe_every or config.TIMEOUT_PROBE_EVERY
+        self.full_keys = set(full_keys if full_keys is not None else config.TIMEOUT_FULL_KEYS)
+        self._lock = threading.Lock()
+        self.stats = self.load_stats()
+
+    def load_stats(self):
+        """Carrega as estatísticas persistidas de execuções anteriores"""
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('selectors', {})
+            except Exception as e:
+                print(f"Erro ao carregar estatísticas de timeout: {e}")
+        return {}
+
+    def save_stats(self):
+        """Salva as estatísticas para as próximas execuções"""
+        with self._lock:
+            data = {
+                'selectors': self.stats,
+                'last_updated': datetime.now().isoformat()
+            }
+        try:
+            with open(self.stats_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"Erro ao salvar estatísticas de timeout: {e}")
+
+    def record(self, key, elapsed, found, cut_short=False):
+        """
+        Registra o resultado de uma espera.
+
+        cut_short: a espera usou um timeout menor que o padrão; sem o elemento, não dá para saber se ele
+        estava ausente ou só atrasado, então o timeout entra também como amostra de latência
+        (e o p99 pode voltar a subir).
+        """
+        with self._lock:
+            entry = self.stats.setdefault(key, {'found': 0, 'missing': 0, 'latencies': []})
+            # Contagens com decaimento: seletores que mudaram de comportamento saem do falha-rápido
+            entry['found'] *= self.decay
+            entry['missing'] *= self.decay
+            if found:
+                entry['found'] += 1
+            else:
+                entry['missing'] += 1
+            if found or cut_short:
+                entry['latencies'].append(round(elapsed, 3))
+                # Mantém apenas as amostras mais recentes
+                del entry['latencies'][:-self.max_samples]
+            entry['waits'] = entry.get('waits', 0) + 1
+
+    def presence_rate(self, key):
+        """Fração das esperas em que o seletor foi encontrado (None sem amostras suficientes)"""
+        entry = self.stats.get(key)
+        if not entry:
+            return None
+        total = entry['found'] + entry['missing']
+        if total < self.min_samples:
+            return None
+        return entry['found'] / total
+
+    def get_timeout(self, key, default):
+        """Retorna o timeout aprendido para o seletor, limitado ao default"""
+        if key in self.full_keys:
+            return default
+        with self._lock:
+            entry = self.stats.get(key)
+            rate = self.presence_rate(key)
+            if entry is None or rate is None:
+                return default
+
+            # Campo quase sempre ausente: falha rápido
+            if rate < self.absent_rate:
+                return min(default, self.fail_fast_timeout)
+
+            latencies = sorted(entry['latencies'])
+            if not latencies:
+                return default
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            return min(default, max(self.min_timeout, p99 * self.margin))
+
+    def _probe_due(self, key):
+        """A cada probe_every esperas o seletor usa o timeout inteiro, para medir de novo se ficou lento"""
+        with self._lock:
+            entry = self.stats.get(key)
+            return entry is not None and entry.get('waits', 0) % self.probe_every == self.probe_every - 1
+
+    def wait_for(self, driver, key, locator, default, condition=EC.presence_of_element_located):
+        """
+        Espera o elemento com o timeout aprendido para a chave e registra o resultado.
+
+        Levanta TimeoutException como o WebDriverWait, para manter o tratamento dos chamadores.
+        """
+        timeout = default if self._probe_due(key) else self.get_timeout(key, default)
+        started = time.monotonic()
+        try:
+            element = WebDriverWait(driver, timeout).until(condition(locator))
+        except TimeoutException:
+            self.record(key, time.monotonic() - started, False, cut_short=timeout < default)
+            raise
+        self.record(key, time.monotonic() - started, True)
+        return element
+
+    def report(self):
+        """Mostra os timeouts aprendidos por seletor"""
+        print(f"\nTimeouts aprendidos ({len(self.stats)} seletores):")
+        for key in sorted(self.stats):
+            entry = self.stats[key]
+            rate = self.presence_rate(key)
+            rate_text = f"{rate:.0%}" if rate is not None else "sem amostras"
+            print(f"  {key}: presença {rate_text}, timeout {self.get_timeout(key, config.ELEMENT_WAIT_TIMEOUT):.2f}s "
+                  f"({entry['found']:.0f} encontrados, {entry['missing']:.0f} ausentes nas esperas recentes)")
+
+
+# Instância global compartilhada pelas funções do scraper
+timeout_policy = TimeoutPolicy()
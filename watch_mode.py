@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Modo de vigilância contínua: consulta a primeira página de cada termo com intervalo adaptativo
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from selenium.common.exceptions import WebDriverException
+
+from bid_queue import build_queue
+from config import config
+from database.database_config import DatabaseManager
+from main import setup_driver, catch_first_page_links, process_licitacao
+from network_capture import get_network_capture
+from search_terms_manager import SearchTermsManager
+from tab_scheduler import TabScheduler
+from timeout_policy import timeout_policy
+
+
+class WatchMode:
+    """Vigia os termos de busca e processa só as licitações ainda não vistas"""
+
+    def __init__(self, terms=None, state_file=None, min_interval=None, max_interval=None,
+                 initial_interval=None, target_new=None, smoothing=None, seen_max=None):
+        self.terms = terms or SearchTermsManager().get_terms()
+        self.state_file = state_file or config.WATCH_STATE_FILE
+        self.min_interval = min_interval or config.WATCH_MIN_INTERVAL
+        self.max_interval = max_interval or config.WATCH_MAX_INTERVAL
+        self.initial_interval = initial_interval or config.WATCH_INITIAL_INTERVAL
+        self.target_new = target_new or config.WATCH_TARGET_NEW
+        self.smoothing = smoothing or config.WATCH_RATE_SMOOTHING
+        self.seen_max = seen_max or config.WATCH_SEEN_MAX
+        self.db = DatabaseManager()
+        # URLs já gravadas no banco (LRU limitado), dispensadas da consulta ao banco nas próximas consultas
+        self.seen = OrderedDict()
+        self.state = self.load_state()
+
+        now = time.time()
+        for term in self.terms:
+            self.state.setdefault(term, {'rate': None, 'last_poll': None, 'next_poll': now, 'polls': 0, 'new': 0})
+
+    def load_state(self):
+        """Carrega as taxas de publicação aprendidas em execuções anteriores"""
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('terms', {})
+            except Exception as e:
+                print(f"Erro ao carregar estado da vigilância: {e}")
+        return {}
+
+    def save_state(self):
+        """Salva as taxas e os horários das próximas consultas"""
+        data = {
+            'terms': self.state,
+            'last_updated': datetime.now().isoformat()
+        }
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"Erro ao salvar estado da vigilância: {e}")
+
+    def next_interval(self, entry):
+        """Intervalo até a próxima consulta: o tempo esperado para surgirem target_new licitações"""
+        if entry['rate'] is None:
+            return self.initial_interval
+        if entry['rate'] <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_new / entry['rate']))
+
+    def record_poll(self, term, found, new, now=None):
+        """Atualiza a taxa de publicação do termo (licitações novas por segundo) e agenda a próxima consulta"""
+        now = now or time.time()
+        entry = self.state[term]
+
+        # A primeira consulta só traz o acumulado anterior à vigilância, não mede a taxa
+        if entry['last_poll'] is not None:
+            observed = new / max(now - entry['last_poll'], 1.0)
+            # Sem histórico, parte da taxa que corresponde ao intervalo inicial (evita saltar para os extremos)
+            previous = entry['rate'] if entry['rate'] is not None else self.target_new / self.initial_interval
+            entry['rate'] = self.smoothing * observed + (1 - self.smoothing) * previous
+
+        interval = self.next_interval(entry)
+        if entry['last_poll'] is not None and found and new == found:
+            # Primeira página inteira é nova: pode haver mais além dela, volta logo
+            print(f"Termo '{term}': primeira página toda nova, consultando de novo no intervalo mínimo")
+            interval = self.min_interval
+
+        entry['last_poll'] = now
+        entry['next_poll'] = now + interval
+        entry['polls'] += 1
+        entry['new'] += new
+        return interval
+
+    def is_seen(self, link):
+        """Indica se a URL já foi vista gravada no banco (e a marca como usada recentemente)"""
+        if link not in self.seen:
+            return False
+        self.seen.move_to_end(link)
+        return True
+
+    def mark_seen(self, links):
+        """Guarda as URLs já gravadas, descartando as menos recentes além de seen_max"""
+        for link in links:
+            self.seen[link] = None
+            self.seen.move_to_end(link)
+        while len(self.seen) > self.seen_max:
+            self.seen.popitem(last=False)
+
+    def poll(self, driver, term):
+        """Consulta a primeira página do termo e retorna as URLs ainda não vistas e os cards da busca"""
+        links = catch_first_page_links(driver, term)
+        cards = get_network_capture(driver).collect_search() if config.NETWORK_CAPTURE else {}
+        candidates = [link for link in dict.fromkeys(links) if not self.is_seen(link)]
+        conhecidas = self.db.get_urls_conhecidas(candidates)
+        novas = [link for link in candidates if link not in conhecidas]
+        # Só as já gravadas entram em seen: as que falharem são tentadas de novo na próxima consulta
+        self.mark_seen(link for link in candidates if link in conhecidas)
+
+        interval = self.record_poll(term, len(links), len(novas))
+        print(f"[{datetime.now():%H:%M:%S}] '{term}': {len(links)} resultados, {len(novas)} novas, "
+              f"próxima consulta em {interval / 60:.0f} min")
+        return novas, cards
+
+    def process(self, driver, urls, term=None, cards=None):
+        """Processa as licitações novas, as de prazo mais próximo primeiro (em várias abas quando há mais de uma)"""
+        fila = build_queue(urls, cards, term)
+
+        if len(urls) > 1 and config.TABS_PER_BROWSER > 1:
+            scheduler = TabScheduler(driver, tabs=min(config.TABS_PER_BROWSER, len(urls)))
+            processadas = scheduler.run(fila, lambda tab_driver, url: process_licitacao(tab_driver, url, navigate=False))
+            fila.report()
+            return processadas
+
+        processadas = 0
+        while not fila.empty():
+            url = fila.get_nowait()
+            try:
+                process_licitacao(driver, url)
+                processadas += 1
+            except Exception as e:
+                print(f"Erro ao processar {url}: {e}")
+        return processadas
+
+    def run(self, max_polls=None):
+        """Laço principal: consulta o termo com a consulta mais atrasada até ser interrompido"""
+        print(f"Vigiando {len(self.terms)} termos (Ctrl+C para parar)")
+        driver = setup_driver()
+        polls = 0
+
+        try:
+            while max_polls is None or polls < max_polls:
+                term = min(self.terms, key=lambda t: self.state[t]['next_poll'])
+                wait = self.state[term]['next_poll'] - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+
+                try:
+                    novas, cards = self.poll(driver, term)
+                    if novas:
+                        self.process(driver, novas, term, cards)
+                except WebDriverException as e:
+                    # Navegador travado ou fechado: recria e tenta o termo de novo em breve
+                    print(f"Erro no navegador ao vigiar '{term}': {e}")
+                    self.state[term]['next_poll'] = time.time() + self.min_interval
+                    try:
+                        driver.quit()
+                    except WebDriverException:
+                        pass
+                    driver = setup_driver()
+
+                polls += 1
+                self.save_state()
+        except KeyboardInterrupt:
+            print("\nVigilância interrompida")
+        finally:
+            self.save_state()
+            timeout_policy.save_stats()
+            driver.quit()
+
+        return polls
+
+    def show_state(self):
+        """Mostra a taxa aprendida e a próxima consulta de cada termo"""
+        print(f"\nTermos vigiados ({len(self.terms)}):")
+        for term in sorted(self.terms, key=lambda t: self.state[t]['next_poll']):
+            entry = self.state[term]
+            rate = f"{entry['rate'] * 86400:.1f}/dia" if entry['rate'] is not None else "sem histórico"
+            proxima = datetime.fromtimestamp(entry['next_poll']).strftime('%d/%m %H:%M')
+            print(f"  {term}: {rate} | {entry['new']} novas em {entry['polls']} consultas | próxima {proxima}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vigilância contínua das licitações dos termos de busca")
+    parser.add_argument('--termos', help="Termos separados por vírgula (padrão: SearchTermsManager)")
+    parser.add_argument('--consultas', type=int, help="Para após esse número de consultas")
+    parser.add_argument('--estado', action='store_true', help="Mostra as taxas aprendidas e sai")
+    args = parser.parse_args()
+
+    watch = WatchMode(terms=[t.strip() for t in args.termos.split(',')] if args.termos else None)
+    if args.estado:
+        watch.show_state()
+    else:
+        print("="*60)
+        print("VIGILÂNCIA DE LICITAÇÕES")
+        print("="*60)
+        watch.run(max_polls=args.consultas)